@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+로컬 works 카탈로그 (SQLite, 크롤러 + scripts 공용)
+
+- works     : 정규화된 work(OpenAlex ID, DOI, 제목, 연도, 인용수, 유형), 신뢰도와 항목별 점수,
+              복원된 초록, 추출된 PDF 본문, 볼트 노트 파일명, 원본 JSON(역색인 초록 제외)
+- mentions  : work별 등장 근육 (근육 → work 색인). 신뢰도/인용수/연도를 함께 두어
+              "근육 + 신뢰도 하한 + 연도 하한" 검색이 works 행을 읽기 전에 색인 안에서 끝난다
+- rule_hits : work별 자동 학습 규칙 근육쌍 동시출현 수
+- queries   : work별 일치한 쿼리 세트 이름 (크롤러 허브의 쿼리별 섹션)
+- 크롤러 허브(보상작용.md)의 노트 목록/쿼리별 섹션은 여기서 읽는다(notes, notes_by_query)
+- 색인: OpenAlex ID, DOI, 연도, 신뢰도, 근육, 근육쌍
+- WAL 모드 + executemany 일괄 upsert (한 트랜잭션)
+
+예) 신뢰도 40 이상, 2018년 이후, serratus anterior 언급 논문:
+  python catalog.py --muscle "serratus anterior" --min-trust 40 --since 2018
+
+옵션(환경변수):
+  CATALOG=0                           카탈로그 끄기
+  CATALOG_PATH=.cache/catalog.sqlite
+"""
+import os, sys, json, time, sqlite3, threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+from crawl_state import work_key
+from dedup import norm_doi
+
+CATALOG_PATH = Path(os.getenv("CATALOG_PATH", ".cache/catalog.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    key TEXT PRIMARY KEY,
+    openalex_id TEXT,
+    doi TEXT,
+    title TEXT,
+    year INTEGER,
+    cited INTEGER,
+    venue_type TEXT,
+    type TEXT,
+    updated TEXT,
+    trust INTEGER,
+    trust_parts TEXT,
+    abstract TEXT,
+    pdf_url TEXT,
+    pdf_text TEXT,
+    note TEXT,
+    raw TEXT,
+    stored_at REAL
+);
+CREATE INDEX IF NOT EXISTS works_openalex ON works(openalex_id);
+CREATE INDEX IF NOT EXISTS works_doi ON works(doi);
+CREATE INDEX IF NOT EXISTS works_year ON works(year);
+CREATE INDEX IF NOT EXISTS works_trust ON works(trust);
+CREATE TABLE IF NOT EXISTS mentions (muscle TEXT, key TEXT, trust INTEGER, cited INTEGER, year INTEGER,
+                                     PRIMARY KEY (muscle, key)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS mentions_key ON mentions(key);
+CREATE INDEX IF NOT EXISTS mentions_rank ON mentions(muscle, trust DESC, cited DESC, year, key);
+CREATE TABLE IF NOT EXISTS rule_hits (weak TEXT, strong TEXT, key TEXT, n INTEGER,
+                                      PRIMARY KEY (weak, strong, key)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rule_hits_key ON rule_hits(key);
+CREATE INDEX IF NOT EXISTS rule_hits_strong ON rule_hits(strong, key);
+CREATE TABLE IF NOT EXISTS queries (name TEXT, key TEXT, PRIMARY KEY (name, key)) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO works (key, openalex_id, doi, title, year, cited, venue_type, type, updated, trust, trust_parts,
+                   abstract, pdf_url, note, raw, stored_at)
+VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+ON CONFLICT(key) DO UPDATE SET
+    openalex_id=excluded.openalex_id, doi=excluded.doi, title=excluded.title, year=excluded.year,
+    cited=excluded.cited, venue_type=excluded.venue_type, type=excluded.type, updated=excluded.updated,
+    trust=COALESCE(excluded.trust, works.trust), trust_parts=COALESCE(excluded.trust_parts, works.trust_parts),
+    abstract=COALESCE(excluded.abstract, works.abstract),
+    pdf_url=excluded.pdf_url, note=COALESCE(excluded.note, works.note), raw=excluded.raw,
+    stored_at=excluded.stored_at,
+    pdf_text=CASE WHEN works.updated IS excluded.updated THEN works.pdf_text END
+"""
+
+
+def pdf_url_of(w: Dict) -> Optional[str]:
+    """best_oa_location → primary_location → OA locations 순으로 PDF 주소"""
+    for key in ("best_oa_location", "primary_location"):
+        loc = w.get(key) or {}
+        if loc.get("pdf_url"):
+            return loc["pdf_url"]
+    for loc in (w.get("locations") or []):
+        if loc.get("is_oa") and loc.get("pdf_url"):
+            return loc["pdf_url"]
+    return None
+
+
+class Catalog:
+    def __init__(self, path: Path = CATALOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    # ---------- 쓰기 ----------
+    def upsert_many(self, rows: Iterable[Dict]) -> int:
+        """
+        rows: {"work": OpenAlex work, "trust": 점수, "trust_parts": dict, "abstract": str,
+               "note": 파일명, "muscles": [근육], "rule_hits": {"weak|strong": n}}
+        work 외에는 모두 선택(빠진 값은 기존 값 유지). 한 트랜잭션으로 일괄 반영하고 반영 건수 반환.
+        """
+        now = time.time()
+        works, keys, mentions, hits = [], [], [], []
+        for r in rows:
+            w = r["work"]
+            key = work_key(w)
+            raw = {k: v for k, v in w.items() if k != "abstract_inverted_index"}
+            works.append((
+                key, w.get("id"), norm_doi(w.get("doi")), w.get("display_name"),
+                int(w["publication_year"]) if w.get("publication_year") else None,
+                int(w.get("cited_by_count") or 0), ((w.get("host_venue") or {}).get("type") or None),
+                w.get("type"), w.get("updated_date"), r.get("trust"),
+                json.dumps(r["trust_parts"]) if r.get("trust_parts") is not None else None,
+                r.get("abstract"), pdf_url_of(w), r.get("note"),
+                json.dumps(raw, ensure_ascii=False), now,
+            ))
+            keys.append((key, "muscles" in r or "rule_hits" in r))
+            mentions += [(m, key) for m in r.get("muscles", ())]
+            hits += [(*pair.split("|", 1), key, n) for pair, n in (r.get("rule_hits") or {}).items()]
+        if not works:
+            return 0
+        replaced = [(k,) for k, has in keys if has]
+        with self._lock, self._db:
+            self._db.executemany(UPSERT, works)
+            self._db.executemany("DELETE FROM mentions WHERE key=?", replaced)
+            self._db.executemany("DELETE FROM rule_hits WHERE key=?", replaced)
+            # 근육 색인의 순위 열은 works에서 복사 (근육 목록 없이 갱신된 work도 맞춰 둔다)
+            self._db.executemany(
+                "UPDATE mentions SET (trust, cited, year) = (SELECT trust, cited, year FROM works WHERE key=?)"
+                " WHERE key=?", [(k, k) for k, _ in keys])
+            self._db.executemany(
+                "INSERT OR IGNORE INTO mentions SELECT ?, key, trust, cited, year FROM works WHERE key=?", mentions)
+            self._db.executemany("INSERT OR REPLACE INTO rule_hits VALUES (?,?,?,?)", hits)
+        return len(works)
+
+    def set_pdf_text(self, key: str, text: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("UPDATE works SET pdf_text=? WHERE key=?", (text, key))
+
+    def tag(self, key: str, names: Iterable[str]) -> None:
+        """work에 일치한 쿼리 이름 추가"""
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO queries VALUES (?,?)", [(n, key) for n in names])
+
+    # ---------- 읽기 ----------
+    def get(self, key: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute("SELECT * FROM works WHERE key=?", (key,)).fetchone()
+
+    def pdf_text(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT pdf_text FROM works WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, muscle: Optional[str] = None, min_trust: Optional[int] = None, since: Optional[int] = None,
+              weak: Optional[str] = None, strong: Optional[str] = None, limit: Optional[int] = None,
+              order: str = "trust") -> List[sqlite3.Row]:
+        """근육 언급/신뢰도 하한/연도 하한/규칙 근육쌍 조건으로 work 검색 (신뢰도 또는 인용수 내림차순)"""
+        sql, args, where, t = ["SELECT w.* FROM works w"], [], [], "w"
+        if muscle:
+            sql = ["SELECT w.* FROM mentions m JOIN works w ON w.key = m.key"]
+            where.append("m.muscle = ?"); args.append(muscle.lower())
+            t = "m"  # 필터/정렬을 mentions_rank 색인으로
+        if weak or strong:
+            pair = [(col, v) for col, v in (("weak", weak), ("strong", strong)) if v]
+            where.append("w.key IN (SELECT key FROM rule_hits WHERE "
+                         + " AND ".join(f"{col} = ?" for col, _ in pair) + ")")
+            args += [v for _, v in pair]
+        if min_trust is not None:
+            where.append(f"{t}.trust >= ?"); args.append(min_trust)
+        if since is not None:
+            where.append(f"{t}.year >= ?"); args.append(since)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append(f"ORDER BY {t}.cited DESC" if order == "cited" else f"ORDER BY {t}.trust DESC, {t}.cited DESC")
+        if limit:
+            sql.append("LIMIT ?"); args.append(limit)
+        with self._lock:
+            return self._db.execute(" ".join(sql), args).fetchall()
+
+    def notes(self) -> List[str]:
+        """노트 파일명 (인용수 내림차순, 같으면 먼저 저장된 순)"""
+        with self._lock:
+            return [r[0] for r in self._db.execute(
+                "SELECT note FROM works WHERE note IS NOT NULL GROUP BY note ORDER BY MAX(cited) DESC, MIN(rowid)")]
+
+    def notes_by_query(self) -> Dict[str, List[str]]:
+        """쿼리 이름 → 노트 파일명 (notes와 같은 순서)"""
+        out: Dict[str, List[str]] = {}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT q.name, w.note FROM queries q JOIN works w ON w.key = q.key WHERE w.note IS NOT NULL"
+                " GROUP BY q.name, w.note ORDER BY MAX(w.cited) DESC, MIN(w.rowid)").fetchall()
+        for name, note in rows:
+            out.setdefault(name, []).append(note)
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.execute("PRAGMA optimize")  # 쿼리 계획용 통계 갱신
+            self._db.close()
+
+
+_SHARED: Optional[Catalog] = None
+
+
+def shared() -> Optional[Catalog]:
+    """프로세스 공용 카탈로그 (CATALOG=0이면 None)"""
+    global _SHARED
+    if os.getenv("CATALOG", "1") == "0":
+        return None
+    if _SHARED is None:
+        _SHARED = Catalog()
+    return _SHARED
+
+
+def store_works(works: List[Dict]) -> None:
+    """수집한 work를 복원된 초록과 함께 일괄 upsert (scripts 공용, CATALOG=0이면 생략)"""
+    cat = shared()
+    if cat is None or not works:
+        return
+    import parsed_doc
+    with metrics.stage("catalog"):
+        cat.upsert_many({"work": w, "abstract": parsed_doc.shared().for_work(w).text or None} for w in works)
+
+
+def lookup_pdf_text(w: Dict) -> Optional[str]:
+    """카탈로그에 저장된 PDF 본문 (없거나 CATALOG=0이면 None)"""
+    cat = shared()
+    if cat is None:
+        return None
+    text = cat.pdf_text(work_key(w))
+    if text is not None:
+        metrics.count("pdf_catalog_hit")
+    return text
+
+
+def save_pdf_text(w: Dict, text: str) -> None:
+    """새로 추출한 PDF 본문 저장 (work가 아직 없으면 메타데이터부터)"""
+    cat = shared()
+    if cat is None:
+        return
+    key = work_key(w)
+    if cat.get(key) is None:
+        cat.upsert_many([{"work": w}])
+    cat.set_pdf_text(key, text)
+
+
+def main() -> None:
+    import argparse
+    ap = argparse.ArgumentParser(description="works 카탈로그 검색")
+    ap.add_argument("--muscle")
+    ap.add_argument("--min-trust", type=int)
+    ap.add_argument("--since", type=int)
+    ap.add_argument("--weak")
+    ap.add_argument("--strong")
+    ap.add_argument("--limit", type=int, default=50)
+    a = ap.parse_args()
+    t = time.perf_counter()
+    cat = shared()
+    if cat is None:
+        sys.exit("catalog disabled (CATALOG=0)")
+    rows = cat.query(a.muscle, a.min_trust, a.since, a.weak, a.strong, a.limit)
+    ms = (time.perf_counter() - t) * 1000
+    for r in rows:
+        print(f"{r['trust']:>3}  {r['year'] or '----'}  {r['cited']:>6}  {r['title']}")
+    print(f"{len(rows)} works ({ms:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+안정적인 논문 클러스터 번호 (summarize_cluster + fetch_and_link 공용)
+
+- 실행마다 문서 ID → 클러스터 번호와 전체 학습 때의 설명력(1 - 군집 내 거리/전체 거리, 기준)을 .cache/clusters/<이름>.json에 저장
+- 전체 학습(KMeans n_init=10) 뒤에는 지난 번호와 구성원이 가장 많이 겹치도록 번호를 다시 매긴다(헝가리안 매칭)
+  → 클러스터 번호와 cluster-N.md 페이지가 실행마다 뒤섞이지 않음
+- CLUSTER_MODE=incremental: 지난 구성원의 현재 TF-IDF 평균을 초기 중심으로 MiniBatchKMeans를 한 배치만 갱신
+  (배치 = 중심 자신을 구성원 수만큼 가중한 점 + 새 문서 → 중심이 기존 평균과 새 문서의 누적 평균이 된다)
+  기존 문서는 번호 유지, 새 문서는 가장 가까운 중심에 배정
+  → 설명력이 기준보다 CLUSTER_DRIFT(비율) 넘게 떨어지거나 k가 바뀌면 전체 학습으로 돌아간다
+  (TF-IDF 열이 실행마다 바뀌므로 중심 벡터 대신 구성원을 저장해 중심을 다시 만든다)
+
+옵션(환경변수):
+  CLUSTER_MODE=full                full | incremental
+  CLUSTER_DRIFT=0.2                설명력 하락 허용 비율(incremental)
+  CLUSTER_DIR=.cache/clusters
+"""
+import os, json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+import metrics
+
+CLUSTER_MODE = os.getenv("CLUSTER_MODE", "full")
+CLUSTER_DRIFT = float(os.getenv("CLUSTER_DRIFT", "0.2"))
+CLUSTER_DIR = Path(os.getenv("CLUSTER_DIR", ".cache/clusters"))
+
+
+def _mean_sq_dist(X, centers: np.ndarray, labels: np.ndarray) -> float:
+    """각 문서와 배정된 중심 사이 제곱 거리의 평균"""
+    x2 = np.asarray(X.multiply(X).sum(axis=1)).ravel() if hasattr(X, "multiply") else (X * X).sum(axis=1)
+    xc = np.asarray(X @ centers.T)[np.arange(X.shape[0]), labels]
+    c2 = (centers * centers).sum(axis=1)[labels]
+    return float(np.maximum(x2 - 2 * xc + c2, 0).mean())
+
+
+def _quality(X, centers: np.ndarray, labels: np.ndarray) -> float:
+    """1 - 군집 내 평균 제곱 거리 / 전체 평균까지의 평균 제곱 거리 (차원·규모와 무관한 군집 설명력)"""
+    mean = np.asarray(X.mean(axis=0)).reshape(1, -1)
+    total = _mean_sq_dist(X, mean, np.zeros(X.shape[0], dtype=np.int64))
+    return 1 - _mean_sq_dist(X, centers, labels) / total if total else 0.0
+
+
+def match_labels(new: np.ndarray, ids: List[str], old: Dict[str, int], k: int) -> np.ndarray:
+    """새 번호를 지난 번호와 구성원이 가장 많이 겹치도록 0..k-1 안에서 다시 매긴다"""
+    overlap = np.zeros((k, k), dtype=np.int64)
+    for i, lab in zip(ids, new):
+        prev = old.get(i)
+        if prev is not None and prev < k:
+            overlap[lab, prev] += 1
+    rows, cols = linear_sum_assignment(-overlap)
+    remap = np.empty(k, dtype=np.int64)
+    remap[rows] = cols
+    return remap[new]
+
+
+def _full(X, k: int):
+    km = KMeans(n_clusters=k, n_init=10, random_state=42).fit(X)
+    metrics.count("cluster_full_fit")
+    return km.labels_, _quality(X, km.cluster_centers_, km.labels_)
+
+
+def _incremental(X, ids: List[str], k: int, old: Dict[str, int], ref: float) -> Optional[np.ndarray]:
+    """지난 구성원으로 만든 중심에서 한 배치 갱신. 전체 학습이 필요하면 None"""
+    labels = np.array([old.get(i, -1) for i in ids], dtype=np.int64)
+    known = np.flatnonzero(labels >= 0)
+    if len(np.unique(labels[known])) != k or labels[known].max() >= k:
+        return None  # 비어 버린 클러스터가 있거나 k가 바뀜
+    init = np.vstack([np.asarray(X[known[labels[known] == c]].mean(axis=0)).ravel() for c in range(k)])
+    sizes = np.bincount(labels[known], minlength=k).astype(np.float64)
+    fresh = np.flatnonzero(labels < 0)
+    # partial_fit은 누적 개수 0에서 시작하므로, 중심을 구성원 수만큼 가중한 점으로 넣어 기존 평균을 유지
+    batch = sp.vstack([sp.csr_matrix(init), X[fresh]], format="csr") if sp.issparse(X) else np.vstack([init, X[fresh]])
+    weight = np.concatenate([sizes, np.ones(len(fresh))])
+    mbk = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, random_state=42, reassignment_ratio=0.0,
+                          compute_labels=False)
+    mbk.partial_fit(batch, sample_weight=weight)
+    if len(fresh):
+        labels[fresh] = mbk.predict(X[fresh])
+    drift = 1 - _quality(X, mbk.cluster_centers_, labels) / ref if ref > 0 else 0.0
+    metrics.gauge("cluster_drift", drift)
+    if drift > CLUSTER_DRIFT:
+        return None
+    metrics.count("cluster_assigned", len(fresh))
+    return labels
+
+
+def cluster_labels(X, ids: List[str], k: int, name: Optional[str] = None, mode: str = CLUSTER_MODE) -> np.ndarray:
+    """
+    문서별 클러스터 번호(0..k-1). name이 없으면 지금까지처럼 매번 KMeans 전체 학습만.
+    name이 있으면 지난 번호를 이어받는다(full: 번호 매칭, incremental: 미니배치 갱신 + 새 문서 배정).
+    """
+    if mode not in ("full", "incremental"):
+        raise ValueError(f"CLUSTER_MODE must be full or incremental: {mode!r}")
+    if name is None:
+        return _full(X, k)[0]
+    path = CLUSTER_DIR / f"{name}.json"
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = {}
+    old, ref = state.get("labels") or {}, state.get("ref", 0.0)
+
+    labels = None
+    if mode == "incremental" and old and state.get("k") == k and X.shape[0] >= k:
+        labels = _incremental(X, ids, k, old, ref)
+    if labels is None:
+        labels, ref = _full(X, k)
+        if old:
+            labels = match_labels(labels, ids, old, k)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"k": k, "ref": ref, "labels": dict(zip(ids, map(int, labels)))}), encoding="utf-8")
+    os.replace(tmp, path)
+    return labels
@@ -6,23 +6,71 @@
 실행:
   pip install requests unidecode
   python compensation_crawler_bot.py
-옵션(자가 갱신):
+옵션(자가 갱신, 소수 시간 가능, 0 이하는 오류, 하한 SCHED_CRAWL_MIN=900초; 여러 작업을 함께 돌리려면 scheduler.py):
   AUTO_LOOP_HOURS=6 python compensation_crawler_bot.py
+옵션(수집 동시성/속도, oa_client.py 참고):
+  OA_CONCURRENCY=4 OA_RATE=5 python compensation_crawler_bot.py
+옵션(증분 크롤, crawl_state.py 참고):
+  DELTA_CRAWL=0 FULL_REFRESH_HOURS=168 python compensation_crawler_bot.py
+옵션(병렬 노트 렌더링, 0=CPU 수):
+  RENDER_WORKERS=0 python compensation_crawler_bot.py
+옵션(스트리밍: 페이지 도착 즉시 노트 생성, 중단 시 마지막 cursor부터 재개):
+  STREAM_CRAWL=1 CHECKPOINT_SECS=30 python compensation_crawler_bot.py
+옵션(규칙 증분 학습: 근육쌍별 예시 문장 저장소 샘플 크기, 변경은 changelog.md / rules_history/):
+  RULE_EVIDENCE_RESERVOIR=8 python compensation_crawler_bot.py
+옵션(품질 필터: 최소 신뢰도, preprint/짧은 제목 제외, 상위 k건; 배치 점수는 numpy 설치 시 벡터화):
+  MIN_TRUST=20 TRUST_TOP_K=0 QUALITY_FILTER=1 python compensation_crawler_bot.py
+옵션(로컬 works 카탈로그: 정규화 work/신뢰도/초록/근육/학습 규칙 SQLite, catalog.py 참고):
+  CATALOG=0 CATALOG_PATH=.cache/catalog.sqlite python compensation_crawler_bot.py
+옵션(쿼리 세트: 여러 검색어/개념 필터를 동시 수집해 병합, 쿼리별 limit과 허브 섹션, query_set.py 참고):
+  QUERY_SET_FILE=queries.json python compensation_crawler_bot.py
+옵션(단계별 계측: 볼트 logs/ 에 JSON 실행 로그 + Prometheus 파일, metrics.py 참고):
+  METRICS=0 METRICS_TRACEMALLOC=1 METRICS_PROFILE=1 python compensation_crawler_bot.py
 """
-import os, re, math, json, time
+import os, re, math, json, time, random
+from bisect import bisect_left
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Iterable, Iterator, Tuple, Optional
 
 import requests
 from unidecode import unidecode
 
+import catalog, http_cache, parsed_doc, metrics
+from crawl_state import CrawlState, work_key
+from dedup import DedupIndex
+from vault_writer import VaultWriter, write_file
+from oa_client import AccessLimited
+from textmatch import AhoCorasick
+import query_set
+from query_set import QuerySpec
+
+try:
+    import numpy as np  # 선택: 배치 신뢰도 점수 벡터화 (없으면 work별 계산)
+except ImportError:
+    np = None
+
 # ------------------ 설정 ------------------
 QUERY = "compensation biomechanics rehabilitation"
 LIMIT = 80
 SINCE = 2010
+QUERY_SET_FILE = os.environ.get("QUERY_SET_FILE")                       # 여러 쿼리 동시 수집 (없으면 QUERY 하나)
 VAULT_DIR = Path("./ObsidianVault/Compensation")
 VAULT_DIR.mkdir(parents=True, exist_ok=True)
+STATE_PATH = VAULT_DIR / ".crawl_state.json"
+RULES_STATE_PATH = VAULT_DIR / ".rules_state.json"
+DEDUP_PATH = VAULT_DIR / ".dedup_index.json"
+DELTA_CRAWL = os.environ.get("DELTA_CRAWL", "1") != "0"            # 워터마크 이후 갱신분만 수집
+FULL_REFRESH_HOURS = float(os.environ.get("FULL_REFRESH_HOURS", "168"))  # 전체 갱신 주기
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "1"))              # 노트 렌더링 프로세스 수 (0=CPU 수)
+STREAM_CRAWL = os.environ.get("STREAM_CRAWL", "0") == "1"                # 페이지 단위 스트리밍 처리 + 재개
+CHECKPOINT_SECS = float(os.environ.get("CHECKPOINT_SECS", "30"))         # 스트리밍 체크포인트 저장 간격
+QUALITY_FILTER = os.environ.get("QUALITY_FILTER", "1") != "0"           # 렌더링 전 품질 필터
+MIN_TRUST = int(os.environ.get("MIN_TRUST", "20"))                      # 최소 신뢰도 점수
+TRUST_TOP_K = int(os.environ.get("TRUST_TOP_K", "0"))                   # 신뢰도 상위 k건만 (0=제한 없음)
+MIN_TITLE_LEN = 10
+PREPRINT_TYPES = {"preprint", "posted-content"}
 
 # ------------------ 유틸 ------------------
 def slugify(s: str) -> str:
@@ -117,35 +165,45 @@ def mock_test_data() -> List[Dict]:
         }
     ]
 
-def oa_search(query: str, since: Optional[int], limit: int) -> List[Dict]:
-    res, cursor, fetched = [], "*", 0
-    while fetched < limit and cursor:
-        params = {
-            "search": query,
-            "per_page": min(200, limit - fetched),
-            "cursor": cursor,
-            "sort": "cited_by_count:desc",
-        }
-        if since:
-            params["from_publication_date"] = f"{since}-01-01"
-        import time
-        time.sleep(1)  # API 요청 간격 조절
-        r = requests.get(f"{OA}/works", params=params, headers=HEADERS, timeout=30)
-        if r.status_code == 403:
-            print(f"WARNING: API access limited. Status code: {r.status_code}")
-            print("INFO: Continuing with mock test data...")
-            return mock_test_data()
-        r.raise_for_status()
-        js = r.json()
-        for w in js.get("results", []):
-            res.append(w)
-            fetched += 1
-            if fetched >= limit:
-                break
-        cursor = js.get("meta", {}).get("next_cursor")
-        if not cursor:
-            break
-    return res
+def query_specs() -> List[QuerySpec]:
+    """QUERY_SET_FILE의 쿼리 목록, 없으면 이름 없는 기본 쿼리 하나(허브 섹션 없음)"""
+    if QUERY_SET_FILE:
+        return query_set.load(Path(QUERY_SET_FILE), LIMIT)
+    return [QuerySpec(name="", search=QUERY, limit=LIMIT)]
+
+
+def oa_search(specs: List[QuerySpec], since: Optional[int],
+              updated_since: Optional[str] = None) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    쿼리별 인용수 내림차순 상위 limit건을 동시에 수집해 work ID로 병합 → (works, work 키 → 일치 쿼리).
+    쿼리 안에서는 페이지/연도 슬라이스를 병렬 수집 (oa_client 참고)
+    """
+    years = list(range(since, datetime.now().year + 1)) if since else None
+    try:
+        return query_set.search_merged(specs, since, updated_since, years, headers=HEADERS, cache=http_cache.shared())
+    except AccessLimited:
+        if updated_since:
+            raise  # 델타 필터 거부일 수 있음 → 호출 측이 필터 없이 다시 요청
+        print("WARNING: API access limited. Status code: 403")
+        print("INFO: Continuing with mock test data...")
+        return mock_test_data(), {}
+
+
+def oa_stream(specs: List[QuerySpec], since: Optional[int], cursors: Dict[str, Optional[str]],
+              done: Dict[str, int], updated_since: Optional[str] = None) -> Iterator[Tuple[QuerySpec, List[Dict], Optional[str]]]:
+    """
+    (쿼리, 페이지 결과, 다음 cursor)를 도착하는 대로 반환. 403이면 모의 데이터 한 페이지로 대체
+    (델타 필터를 건 첫 요청의 403은 필터 거부일 수 있으므로 호출 측으로 넘긴다)
+    """
+    try:
+        yield from query_set.stream_all(specs, since, cursors, done, updated_since,
+                                        headers=HEADERS, cache=http_cache.shared())
+    except AccessLimited:
+        if updated_since and not any(done.values()):
+            raise
+        print("WARNING: API access limited. Status code: 403")
+        print("INFO: Continuing with mock test data...")
+        yield specs[0], mock_test_data(), None
 
 # ------------------ 신뢰도 점수 ------------------
 def trust_score(w: Dict) -> Tuple[int, Dict[str, int]]:
@@ -171,6 +229,73 @@ def trust_score(w: Dict) -> Tuple[int, Dict[str, int]]:
     score += rec; parts["recency"] = rec
     return score, parts
 
+
+VENUE_CODE = {"journal": 1, "conference": 2, "repository": 3}
+
+
+def trust_columns(works: List[Dict]) -> Dict[str, "np.ndarray"]:
+    """
+    페이지 단위 배치 점수. work에서 열(venue 유형, 근거 수준 플래그, 인용수, 연도)만 뽑고
+    점수 계산은 NumPy 벡터 연산으로. 결과는 trust_score와 항목별로 정확히 같다.
+    """
+    n = len(works)
+    vt = np.zeros(n, dtype=np.int8)       # 0 기타, 1 journal, 2 conference, 3 repository
+    lvl = np.zeros(n, dtype=np.int8)      # 0 일반, 1 randomized, 2 systematic review, 3 meta-analysis
+    cites = np.zeros(n, dtype=np.int64)
+    years = np.zeros(n, dtype=np.int64)
+    has_year = np.zeros(n, dtype=bool)
+    for i, w in enumerate(works):
+        vt[i] = VENUE_CODE.get((w.get("host_venue", {}).get("type") or "").lower(), 0)
+        title = (w.get("display_name") or "").lower()
+        lvl[i] = 3 if "meta-analysis" in title else 2 if "systematic review" in title else 1 if "randomized" in title else 0
+        cites[i] = int(w.get("cited_by_count", 0))
+        y = w.get("publication_year")
+        if y:
+            years[i], has_year[i] = int(y), True
+
+    venue = np.select([vt == 1, vt == 2], [18, 10], 4)
+    level = np.select([lvl == 3, lvl == 2, lvl == 1, vt == 3], [24, 20, 16, 4], 8)
+    citations = np.minimum(25, np.floor(25 * np.sqrt(np.minimum(cites, 1000) / 1000)).astype(np.int64))
+    age = np.maximum(0, datetime.now().year - years)
+    recency = np.where(has_year, np.select([age <= 5, age <= 10], [10, 7], 4), 0)
+    return {
+        "score": venue + level + citations + recency,
+        "venue": venue, "level": level, "citations": citations, "recency": recency,
+        "repository": vt == 3,
+    }
+
+
+def quality_filter(works: List[Dict], min_score: int = MIN_TRUST, top_k: int = 0) -> List[Dict]:
+    """
+    README 품질 기준(최소 신뢰도, preprint 제외, 제목 길이) 통과 work만, 원래 순서 유지.
+    top_k > 0이면 통과분 중 신뢰도 상위 k건만 (argpartition, 정렬 없음).
+    노트 렌더링/PDF 처리 전에 걸러 비싼 단계에 들어가는 건수를 줄인다.
+    """
+    if not works:
+        return []
+    if np is None:
+        scored = [(i, trust_score(w)[0]) for i, w in enumerate(works)
+                  if (w.get("type") or "") not in PREPRINT_TYPES
+                  and (w.get("host_venue", {}).get("type") or "").lower() != "repository"
+                  and len((w.get("display_name") or "").strip()) >= MIN_TITLE_LEN]
+        scored = [(i, sc) for i, sc in scored if sc >= min_score]
+        if top_k and len(scored) > top_k:
+            keep = {i for i, _ in sorted(scored, key=lambda t: -t[1])[:top_k]}
+            scored = [(i, sc) for i, sc in scored if i in keep]
+        return [works[i] for i, _ in scored]
+
+    cols = trust_columns(works)
+    ok = cols["score"] >= min_score
+    ok &= ~cols["repository"]
+    ok &= np.fromiter(((w.get("type") or "") not in PREPRINT_TYPES
+                       and len((w.get("display_name") or "").strip()) >= MIN_TITLE_LEN for w in works),
+                      dtype=bool, count=len(works))
+    idx = np.flatnonzero(ok)
+    if top_k and len(idx) > top_k:
+        top = np.argpartition(-cols["score"][idx], top_k - 1)[:top_k]
+        idx = np.sort(idx[top])
+    return [works[i] for i in idx]
+
 # ------------------ 규칙 자동 학습 ------------------
 MUSCLE_LEXICON = [
     # 하체/골반
@@ -182,58 +307,227 @@ WEAK_TRIGGERS = ["weakness","deficit","inhibition","reduced activation","decreas
 STRONG_TRIGGERS = ["increased activation","overactivity","dominance","hyperactivity","greater activation","compensatory activation","substitution"]
 
 
+@lru_cache(maxsize=1)
+def lexicon_matcher() -> AhoCorasick:
+    """근육 사전 + 약화/과활성 트리거 + COMP_RULES 키워드를 하나의 오토마톤으로 (프로세스당 1회)"""
+    ac = AhoCorasick(boundary="start")
+    for m in MUSCLE_LEXICON: ac.add(m, ("muscle", m))
+    for t in WEAK_TRIGGERS: ac.add(t, ("weak_trigger", t))
+    for t in STRONG_TRIGGERS: ac.add(t, ("strong_trigger", t))
+    for kw in rule_index().keywords():
+        ac.add(kw, ("rule_kw", kw))
+    return ac.build()
+
+
+MUSCLE_ORDER = {m: i for i, m in enumerate(MUSCLE_LEXICON)}
+SENT_DELIM = re.compile(r"[.!?]")
+
+
 def extract_candidates(text: str) -> List[str]:
-    t = text.lower()
-    return [m for m in MUSCLE_LEXICON if m in t]
+    found = {lab[1] for lab in lexicon_matcher().labels_in(text.lower()) if lab[0] == "muscle"}
+    return sorted(found, key=MUSCLE_ORDER.__getitem__)
 
 
-def mine_rules(works: List[Dict]) -> List[Dict]:
-    from collections import defaultdict
-    pair_counts = defaultdict(int)
-    weak_counts = defaultdict(int)
-    strong_counts = defaultdict(int)
-    evidences = defaultdict(list)
-    for w in works:
+def sentence_hits(txt: str, delims: Optional[List[int]] = None) -> Dict[int, List]:
+    """
+    한 번의 스캔으로 문장별 [근육 집합, 약화 트리거 유무, 과활성 트리거 유무] 수집.
+    문장 번호는 re.split(r"[.!?]", txt)의 인덱스와 같다. delims는 txt 안의 구분자 오프셋(미리 계산된 경우).
+    """
+    if delims is None:
+        delims = [m.start() for m in SENT_DELIM.finditer(txt)]
+    per_sent: Dict[int, List] = {}
+    for h in lexicon_matcher().iter(txt):
+        si = bisect_left(delims, h.start)
+        slot = per_sent.setdefault(si, [set(), False, False])
+        for kind, name in h.labels:
+            if kind == "muscle": slot[0].add(name)
+            elif kind == "weak_trigger": slot[1] = True
+            elif kind == "strong_trigger": slot[2] = True
+    return per_sent
+
+
+class RuleMiner:
+    """
+    work를 하나씩 받아 약화/과활성 근육 동시출현을 누적.
+    - work별 기여분을 내용 해시와 함께 보관 → 이미 반영된 work는 건너뛰고, 바뀌거나 철회된 work는 빼고 다시 반영
+    - 예시 문장은 근육쌍마다 RESERVOIR개까지 저장소 샘플링(reservoir sampling)으로 유지해 메모리 상한 고정
+    """
+    EXAMPLES = 3
+    RESERVOIR = int(os.environ.get("RULE_EVIDENCE_RESERVOIR", "8"))
+
+    def __init__(self, data: Optional[Dict] = None):
+        data = data or {}
+        self.pair_counts: Dict[Tuple[str, str], int] = {
+            tuple(k.split("|")): v for k, v in data.get("pairs", {}).items()}
+        self.weak_counts: Dict[str, int] = dict(data.get("weak", {}))
+        self.strong_counts: Dict[str, int] = dict(data.get("strong", {}))
+        self.evidences: Dict[Tuple[str, str], List[List[str]]] = {
+            tuple(k.split("|")): v for k, v in data.get("examples", {}).items()}
+        self.works: Dict[str, Dict] = data.get("works", {})
+
+    @classmethod
+    def load(cls, path: Path) -> "RuleMiner":
+        try:
+            return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path: Path) -> None:
+        tmp = Path(path).with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_json(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def to_json(self) -> Dict:
+        return {
+            "version": 1,
+            "pairs": {"|".join(k): v for k, v in self.pair_counts.items()},
+            "weak": self.weak_counts,
+            "strong": self.strong_counts,
+            "examples": {"|".join(k): v for k, v in self.evidences.items()},
+            "works": self.works,
+        }
+
+    def _sample(self, key: Tuple[str, str], wkey: str, sent: str) -> None:
+        ev = self.evidences.setdefault(key, [])
+        if len(ev) < self.RESERVOIR:
+            ev.append([wkey, sent])
+            return
+        # 결정적 저장소 샘플링: n번째 관측은 RESERVOIR/n 확률로 임의 슬롯을 대체
+        n = self.pair_counts[key]
+        j = random.Random(f"{key[0]}|{key[1]}|{n}").randrange(n)
+        if j < self.RESERVOIR:
+            ev[j] = [wkey, sent]
+
+    def add(self, w: Dict) -> None:
+        wkey, digest = work_key(w), parsed_doc.inv_digest(w)
+        prev = self.works.get(wkey)
+        if prev is not None and prev.get("d") == digest and not w.get("is_retracted"):
+            return
+        if prev is not None:
+            self.retract(wkey)
+        if w.get("is_retracted"):
+            return
+        contrib = {"d": digest, "w": {}, "s": {}, "p": {}}
+        self.works[wkey] = contrib
+
         title = (w.get("display_name") or "").lower()
-        inv = w.get("abstract_inverted_index")
-        if inv:
-            toks = sorted([(pos, word) for word, poses in inv.items() for pos in poses])
-            abstract = " ".join([word for _, word in toks]).lower()
-        else:
-            abstract = ""
-        txt = title + ". " + abstract
-        muscles = extract_candidates(txt)
-        if not muscles:
-            continue
-        for sent in re.split(r"[.!?]", txt):
-            if not any(m in sent for m in muscles):
+        doc = parsed_doc.shared().for_work(w)
+        txt = title + ". " + doc.lower
+        # 제목 구분자 + 제목 뒤 ". " + 초록 구분자(캐시된 오프셋을 이동)
+        base = len(title) + 2
+        delims = [m.start() for m in SENT_DELIM.finditer(title)] + [len(title)] + [base + d for d in doc.delims]
+        per_sent = sentence_hits(txt, delims)
+        if not any(slot[0] for slot in per_sent.values()):
+            return
+        sents = None
+        for si in sorted(per_sent):
+            found, has_weak, has_strong = per_sent[si]
+            if not found or not (has_weak or has_strong):
                 continue
-            weak_hits = [m for m in muscles if m in sent and any(t in sent for t in WEAK_TRIGGERS)]
-            strong_hits = [m for m in muscles if m in sent and any(t in sent for t in STRONG_TRIGGERS)]
+            muscles = sorted(found, key=MUSCLE_ORDER.__getitem__)
+            weak_hits = muscles if has_weak else []
+            strong_hits = muscles if has_strong else []
             for wmus in weak_hits:
-                weak_counts[wmus] += 1
+                self.weak_counts[wmus] = self.weak_counts.get(wmus, 0) + 1
+                contrib["w"][wmus] = contrib["w"].get(wmus, 0) + 1
             for smus in strong_hits:
-                strong_counts[smus] += 1
-            for wmus in weak_hits:
-                for smus in strong_hits:
-                    if wmus != smus:
-                        key = (wmus, smus)
-                        pair_counts[key] += 1
-                        evidences[key].append(sent.strip())
-    rules = []
-    for (wkey, skey), c in pair_counts.items():
-        score = c * 1.0 / (1 + abs(weak_counts[wkey] - strong_counts[skey]))
-        rules.append({
-            "weak": wkey,
-            "strong": skey,
-            "count": c,
-            "weak_mentions": weak_counts[wkey],
-            "strong_mentions": strong_counts[skey],
-            "score": round(score, 3),
-            "examples": evidences[(wkey, skey)][:3],
-        })
-    rules.sort(key=lambda x: (-x["score"], -x["count"]))
-    return rules
+                self.strong_counts[smus] = self.strong_counts.get(smus, 0) + 1
+                contrib["s"][smus] = contrib["s"].get(smus, 0) + 1
+            if weak_hits and strong_hits:
+                sents = sents or SENT_DELIM.split(txt)
+                for wmus in weak_hits:
+                    for smus in strong_hits:
+                        if wmus != smus:
+                            key = (wmus, smus)
+                            self.pair_counts[key] = self.pair_counts.get(key, 0) + 1
+                            pk = wmus + "|" + smus
+                            contrib["p"][pk] = contrib["p"].get(pk, 0) + 1
+                            self._sample(key, wkey, sents[si].strip())
+
+    def retract(self, wkey: str) -> None:
+        """work의 기여분을 전체 집계에서 제거 (철회/내용 변경)"""
+        contrib = self.works.pop(wkey, None)
+        if not contrib:
+            return
+        for counts, part in ((self.weak_counts, contrib.get("w", {})), (self.strong_counts, contrib.get("s", {}))):
+            for m, n in part.items():
+                counts[m] = counts.get(m, 0) - n
+                if counts[m] <= 0:
+                    del counts[m]
+        for pk, n in contrib.get("p", {}).items():
+            key = tuple(pk.split("|"))
+            self.pair_counts[key] = self.pair_counts.get(key, 0) - n
+            ev = [e for e in self.evidences.get(key, []) if e[0] != wkey]
+            if self.pair_counts[key] <= 0:
+                del self.pair_counts[key]
+                self.evidences.pop(key, None)
+            else:
+                self.evidences[key] = ev
+
+    def rules(self) -> List[Dict]:
+        rules = []
+        for (wkey, skey), c in self.pair_counts.items():
+            score = c * 1.0 / (1 + abs(self.weak_counts.get(wkey, 0) - self.strong_counts.get(skey, 0)))
+            rules.append({
+                "weak": wkey,
+                "strong": skey,
+                "count": c,
+                "weak_mentions": self.weak_counts.get(wkey, 0),
+                "strong_mentions": self.strong_counts.get(skey, 0),
+                "score": round(score, 3),
+                "examples": [sent for _, sent in self.evidences.get((wkey, skey), [])[:self.EXAMPLES]],
+            })
+        rules.sort(key=lambda x: (-x["score"], -x["count"]))
+        return rules
+
+
+def rules_delta(old: List[Dict], new: List[Dict]) -> Dict[str, List]:
+    """이전/현재 rules.json 비교: 신규, 제거, 점수(또는 빈도) 변경"""
+    o = {(r["weak"], r["strong"]): r for r in old}
+    n = {(r["weak"], r["strong"]): r for r in new}
+    return {
+        "added": [r for k, r in n.items() if k not in o],
+        "removed": [r for k, r in o.items() if k not in n],
+        "rescored": [(o[k], r) for k, r in n.items()
+                     if k in o and (o[k]["score"], o[k]["count"]) != (r["score"], r["count"])],
+    }
+
+
+def write_rules_changelog(delta: Dict[str, List], stamp: datetime, rules: List[Dict],
+                          writer: Optional[VaultWriter] = None, keep: int = 100) -> bool:
+    """변경이 있으면 changelog.md 맨 위에 항목을 추가하고 rules_history/ 에 스냅샷 저장"""
+    if not any(delta.values()):
+        return False
+    entry = [f"## {stamp.strftime('%Y-%m-%d %H:%M')} (+{len(delta['added'])} / -{len(delta['removed'])} / ~{len(delta['rescored'])})"]
+    for r in delta["added"]:
+        entry.append(f"- 신규: {r['weak']} → {r['strong']} (점수 {r['score']}, 빈도 {r['count']})")
+    for r in delta["removed"]:
+        entry.append(f"- 제거: {r['weak']} → {r['strong']}")
+    for a, b in delta["rescored"]:
+        entry.append(f"- 변경: {b['weak']} → {b['strong']} 점수 {a['score']} → {b['score']}, 빈도 {a['count']} → {b['count']}")
+    path = VAULT_DIR / "changelog.md"
+    header = "# 규칙 변경 로그\n"
+    try:
+        old = path.read_text(encoding="utf-8")
+    except OSError:
+        old = header
+    body = old[len(header):] if old.startswith(header) else old
+    write_file(path, header + "\n" + "\n".join(entry) + "\n" + body, writer)
+
+    hist = VAULT_DIR / "rules_history"
+    hist.mkdir(exist_ok=True)
+    write_file(hist / f"rules-{stamp.strftime('%Y%m%d-%H%M%S')}.json",
+               json.dumps(rules, ensure_ascii=False, indent=2), writer)
+    for old_snap in sorted(hist.glob("rules-*.json"))[:-keep]:
+        old_snap.unlink()
+    return True
+
+
+def mine_rules(works: Iterable[Dict]) -> List[Dict]:
+    miner = RuleMiner()
+    for w in works:
+        miner.add(w)
+    return miner.rules()
 
 # ------------------ 임상 규칙(핸드크래프트) ------------------
 COMP_RULES = [
@@ -270,26 +564,69 @@ COMP_RULES = [
 ]
 
 
+COMP_RULES_FILE = os.environ.get("COMP_RULES_FILE")  # 추가 규칙(JSON 목록, COMP_RULES와 같은 형식)
+
+
+def norm_kw(s: str) -> str:
+    """규칙 키워드 정규화(소문자 + 공백 정리)"""
+    return " ".join(s.lower().split())
+
+
+class RuleIndex:
+    """
+    규칙 표를 한 번 컴파일한 결과.
+    - 정규화 키워드 → 규칙 ID 목록(약화/보상 각각)
+    - 규칙별 소견 dict와 크로스체크 블록을 미리 만들어 둠
+    추론 비용은 텍스트 1회 스캔 + 매치된 키워드 수에 비례하고 규칙 수와는 무관.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        self.weak_ids: Dict[str, List[int]] = {}
+        self.strong_ids: Dict[str, List[int]] = {}
+        self.findings_weak: List[Dict] = []
+        self.findings_strong: List[Dict] = []
+        self.blocks: Dict[str, List[str]] = {}
+        for i, rule in enumerate(rules):
+            for kw in rule["weak"]:
+                ids = self.weak_ids.setdefault(norm_kw(kw), [])
+                if not ids or ids[-1] != i: ids.append(i)
+            for kw in rule["strong"]:
+                ids = self.strong_ids.setdefault(norm_kw(kw), [])
+                if not ids or ids[-1] != i: ids.append(i)
+            weak, strong, signs = ", ".join(rule["weak"]), ", ".join(rule["strong"]), ", ".join(rule.get("signs", []))
+            self.findings_weak.append({"weak": weak, "strong": strong, "signs": signs, "note": rule.get("note", "")})
+            self.findings_strong.append({"weak": weak + " (의심)", "strong": strong, "signs": signs,
+                                         "note": "보상근 과활성 패턴 → 약화근 역추정"})
+            for f in (self.findings_weak[-1], self.findings_strong[-1]):
+                if f["weak"] not in self.blocks:
+                    self.blocks[f["weak"]] = crosscheck_block(f["weak"])
+
+    def keywords(self) -> List[str]:
+        return list(dict.fromkeys([*self.weak_ids, *self.strong_ids]))
+
+    def match(self, keywords: Iterable[str]) -> List[Dict]:
+        """매치된 키워드 → 소견 목록 (약화 규칙들, 그다음 역추정 규칙들, 각각 규칙 순)"""
+        weak, strong = set(), set()
+        for kw in keywords:
+            weak.update(self.weak_ids.get(kw, ()))
+            strong.update(self.strong_ids.get(kw, ()))
+        return [dict(self.findings_weak[i]) for i in sorted(weak)] + \
+               [dict(self.findings_strong[i]) for i in sorted(strong)]
+
+
+@lru_cache(maxsize=1)
+def rule_index() -> RuleIndex:
+    """COMP_RULES (+ COMP_RULES_FILE) 컴파일 (프로세스당 1회)"""
+    rules = list(COMP_RULES)
+    if COMP_RULES_FILE:
+        rules += json.loads(Path(COMP_RULES_FILE).read_text(encoding="utf-8"))
+    return RuleIndex(rules)
+
+
 def infer_compensations(title: str, abstract: Optional[str], concepts: List[str]) -> List[Dict]:
     text = (title + " " + (abstract or "") + " " + " ".join(concepts)).lower()
-    findings = []
-    for rule in COMP_RULES:
-        if any(kw in text for kw in rule["weak"]):
-            findings.append({
-                "weak": ", ".join(rule["weak"]),
-                "strong": ", ".join(rule["strong"]),
-                "signs": ", ".join(rule["signs"]),
-                "note": rule["note"],
-            })
-    for rule in COMP_RULES:
-        if any(kw.lower() in text for kw in rule["strong"]):
-            findings.append({
-                "weak": ", ".join(rule["weak"]) + " (의심)",
-                "strong": ", ".join(rule["strong"]),
-                "signs": ", ".join(rule["signs"]),
-                "note": "보상근 과활성 패턴 → 약화근 역추정",
-            })
-    return findings
+    found = lexicon_matcher().labels_in(text)
+    return rule_index().match(name for kind, name in found if kind == "rule_kw")
 
 # ------------------ 크로스체크(교차검증) ------------------
 CROSSCHECK_MAP = {
@@ -326,6 +663,21 @@ CROSSCHECK_MAP = {
 }
 
 
+def crosscheck_block(weak: str) -> List[str]:
+    """소견의 weak 문자열 → 크로스체크 블록 줄 목록 (첫 근육으로 CROSSCHECK_MAP 조회)"""
+    key = weak.split(",")[0].replace("(의심)", "").strip()
+    cc = CROSSCHECK_MAP.get(key)
+    lines = [f"### 약화(↓) 추정: {key}"]
+    if cc:
+        if cc.get("MMT"): lines += ["- **MMT**: " + "; ".join(cc["MMT"]) ]
+        if cc.get("Movement"): lines += ["- **Movement**: " + "; ".join(cc["Movement"]) ]
+        if cc.get("ROM"): lines += ["- **ROM**: " + "; ".join(cc["ROM"]) ]
+        if cc.get("Special"): lines += ["- **Special Tests**: " + "; ".join(cc["Special"]) ]
+    else:
+        lines.append("- 표준 체크: 해당 근육 MMT, 연관 움직임 스크린, 연관 ROM/특수검사")
+    return lines
+
+
 def build_crosscheck_md(findings: List[Dict]) -> str:
     if not findings:
         return (
@@ -335,22 +687,15 @@ def build_crosscheck_md(findings: List[Dict]) -> str:
             "- [ ] 관련 ROM/특수검사\n"
         )
     lines = ["## 크로스체크"]
+    blocks = rule_index().blocks
     for f in findings:
-        weak_names = [w.strip() for w in f["weak"].split(",")]
-        key = weak_names[0].replace("(의심)", "").strip()
-        cc = CROSSCHECK_MAP.get(key)
-        lines.append(f"### 약화(↓) 추정: {key}")
-        if cc:
-            if cc.get("MMT"): lines += ["- **MMT**: " + "; ".join(cc["MMT"]) ]
-            if cc.get("Movement"): lines += ["- **Movement**: " + "; ".join(cc["Movement"]) ]
-            if cc.get("ROM"): lines += ["- **ROM**: " + "; ".join(cc["ROM"]) ]
-            if cc.get("Special"): lines += ["- **Special Tests**: " + "; ".join(cc["Special"]) ]
-        else:
-            lines.append("- 표준 체크: 해당 근육 MMT, 연관 움직임 스크린, 연관 ROM/특수검사")
+        block = blocks.get(f["weak"])
+        lines += block if block is not None else crosscheck_block(f["weak"])
     return "\n".join(lines)
 
 # ------------------ Markdown 생성 ------------------
-def make_note(w: Dict, outdir: Path) -> str:
+def render_note(w: Dict) -> Tuple[str, str]:
+    """(파일명, 노트 본문) 렌더링만 수행"""
     title = (w.get("display_name") or "Untitled").strip()
     year = w.get("publication_year")
     doi = (w.get("doi") or "").replace("https://doi.org/", "")
@@ -359,12 +704,8 @@ def make_note(w: Dict, outdir: Path) -> str:
     authors = [a.get("author", {}).get("display_name") for a in w.get("authorships", [])]
     score, parts = trust_score(w)
 
-    # 초록 복원
-    abstract = None
-    inv = w.get("abstract_inverted_index")
-    if inv:
-        toks = sorted([(pos, word) for word, poses in inv.items() for pos in poses])
-        abstract = " ".join([word for _, word in toks])
+    # 초록 복원 (parsed_doc 캐시 공유)
+    abstract = parsed_doc.shared().for_work(w).text or None
 
     # 근육간 보상 규칙 적용
     concepts = [c.get("display_name") for c in w.get("concepts", [])]
@@ -415,21 +756,71 @@ def make_note(w: Dict, outdir: Path) -> str:
     )
 
     fname = slugify(title) + (f"-{year}" if year else "") + ".md"
-    Path(outdir, fname).write_text(yaml + "\n" + body, encoding="utf-8")
+    return fname, yaml + "\n" + body
+
+
+def _init_render_worker() -> None:
+    # 부모의 SQLite 문서 캐시와 경쟁하지 않도록 자식은 메모리 전용 문서 캐시 사용
+    parsed_doc._SHARED = parsed_doc.DocStore(None)
+
+
+def render_pool(workers: int = RENDER_WORKERS):
+    """렌더링용 프로세스 풀 (workers ≤ 1이면 None)"""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # 워커는 첫 map 때 만들어지므로 스트리밍 수집 스레드/HTTP 세션이 도는 중에 fork하지 않도록 forkserver(없으면 spawn)
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, mp_context=ctx)
+
+
+def render_notes(works: List[Dict], workers: int = RENDER_WORKERS, pool=None) -> Iterator[Tuple[str, str]]:
+    """
+    render_note를 works 순서대로 적용. workers > 1이면 프로세스 풀에 청크 단위로 분배.
+    결과 순서와 내용은 직렬 경로와 동일. pool을 넘기면 그 풀을 재사용(스트리밍 모드).
+    """
+    workers = workers or os.cpu_count() or 1
+    if pool is None and (workers <= 1 or len(works) < 2 * workers):
+        yield from map(render_note, works)
+        return
+    chunk = max(1, len(works) // (workers * 4))
+    if pool is not None:
+        yield from pool.map(render_note, works, chunksize=chunk)
+        return
+    with render_pool(workers) as pool:
+        yield from pool.map(render_note, works, chunksize=chunk)
+
+
+def make_note(w: Dict, outdir: Path, writer: Optional[VaultWriter] = None, dedup: Optional[DedupIndex] = None) -> str:
+    fname, text = render_note(w)
+    if dedup is not None:
+        fname = note_name(dedup, w, fname)
+    write_file(Path(outdir, fname), text, writer)
     return fname
 
 # ------------------ 허브 노드 ------------------
-def make_hub(filenames: List[str]) -> None:
+def make_hub(filenames: List[str], writer: Optional[VaultWriter] = None,
+             sections: Optional[List[Tuple[str, List[str]]]] = None) -> None:
+    """filenames: 'papers/<노트>' 링크 대상. sections가 있으면 쿼리별 섹션 + 어느 쿼리에도 없는 노트만 공통 섹션에"""
     hub = Path(VAULT_DIR, "보상작용.md")
-    lines = ["# 보상작용 (Compensation)", "보상작용 연구 허브.", "\n## 연결된 문헌"]
-    for f in filenames:
-        name = f[:-3]
-        lines.append(f"- [[{name}]]")
+    lines = ["# 보상작용 (Compensation)", "보상작용 연구 허브."]
+    if sections:
+        for name, members in sections:
+            lines.append(f"\n## 연결된 문헌: {name}")
+            lines += [f"- [[{f}]]" for f in members]
+        tagged = {f for _, members in sections for f in members}
+        filenames = [f for f in filenames if f not in tagged]
+    if filenames or not sections:
+        lines.append("\n## 연결된 문헌")
+        lines += [f"- [[{f}]]" for f in filenames]
     lines += ["\n## 5WHY 분석 가이드", "- [[5WHY-보상작용-템플릿]]", "\n## 자동 학습 규칙", "- [[보상작용-규칙(자동)]]"]
-    hub.write_text("\n".join(lines), encoding="utf-8")
+    write_file(hub, "\n".join(lines), writer)
 
 # ------------------ 5WHY 템플릿 노드 ------------------
-def make_5why_template() -> None:
+def make_5why_template(writer: Optional[VaultWriter] = None) -> None:
     tpl = Path(VAULT_DIR, "5WHY-보상작용-템플릿.md")
     txt = (
         "# 5WHY 보상작용 템플릿\n\n"
@@ -439,10 +830,10 @@ def make_5why_template() -> None:
         "4. 왜 보상작용이 일어나는가?\n- 예: 중력하 안정성 확보 위한 적응\n\n"
         "5. 왜 패턴이 고착화되는가?\n- 예: 습관화, 근막 긴장 패턴 고정화\n"
     )
-    tpl.write_text(txt, encoding="utf-8")
+    write_file(tpl, txt, writer)
 
 # ------------------ 규칙 요약 파일 ------------------
-def write_rules_summary(rules: List[Dict]) -> None:
+def write_rules_summary(rules: List[Dict], writer: Optional[VaultWriter] = None) -> None:
     summary = [
         "# 보상작용 규칙(자동 학습)",
         "",
@@ -453,33 +844,241 @@ def write_rules_summary(rules: List[Dict]) -> None:
         ex = (r.get("examples") or [])
         ex_str = (ex[0][:100] + "…") if ex else "-"
         summary.append(f"| {r['weak']} | {r['strong']} | {r['count']} | {r['score']} | {ex_str} |")
-    (VAULT_DIR / "보상작용-규칙(자동).md").write_text("\n".join(summary), encoding="utf-8")
+    write_file(VAULT_DIR / "보상작용-규칙(자동).md", "\n".join(summary), writer)
+
+# ------------------ 카탈로그 ------------------
+def catalog_rows(works: List[Dict], notes: List[str], miner: RuleMiner) -> Iterator[Dict]:
+    """카탈로그 upsert 행: 신뢰도 항목, 복원된 초록, 등장 근육, 학습 규칙 근육쌍 기여분"""
+    for w, note in zip(works, notes):
+        score, parts = trust_score(w)
+        doc = parsed_doc.shared().for_work(w)
+        title = (w.get("display_name") or "").lower()
+        yield {
+            "work": w, "note": note, "trust": score, "trust_parts": parts, "abstract": doc.text or None,
+            "muscles": extract_candidates(title + ". " + doc.lower),
+            "rule_hits": (miner.works.get(work_key(w)) or {}).get("p", {}),
+        }
+
+
+def store_catalog(works: List[Dict], notes: List[str], miner: RuleMiner) -> None:
+    """배치 단위 일괄 upsert (CATALOG=0이면 생략)"""
+    cat = catalog.shared()
+    if cat is None or not works:
+        return
+    with metrics.stage("catalog"):
+        metrics.count("catalog_upserts", cat.upsert_many(catalog_rows(works, notes, miner)))
+
+# ------------------ 중복 제거 ------------------
+def dedup_works(works: List[Dict], dedup: DedupIndex) -> List[Dict]:
+    """같은 ID/DOI/제목 지문의 work는 처음 것만 (렌더링/규칙 학습 전, dict 조회만)"""
+    with metrics.stage("dedup"):
+        kept = [w for w in works if dedup.claim(w)]
+    metrics.count("works_duplicate", len(works) - len(kept))
+    return kept
+
+
+def note_name(dedup: DedupIndex, w: Dict, fname: str) -> str:
+    """렌더링된 파일명을 다른 work와 겹치지 않게 배정"""
+    return dedup.slug_for(w, fname[:-3])[0] + ".md"
 
 # ------------------ 실행 ------------------
+def fetch_works(state: CrawlState, full: bool, specs: List[QuerySpec]) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    전체 갱신이면 쿼리별 상위 limit건 전부(거르지 않음 → 전부 렌더링/규칙 학습, 스트리밍 경로와 같음),
+    아니면 워터마크 이후 생성/갱신된 work만 요청
+    """
+    since = None if full else state.since_date()
+    try:
+        works, tags = oa_search(specs, SINCE, updated_since=since)
+    except (requests.HTTPError, AccessLimited) as e:
+        if full:
+            raise
+        # from_updated_date 필터를 쓸 수 없는 경우: 전체를 받아 updated_date로 직접 거른다
+        print("WARNING: Delta filter rejected, falling back to local filtering", e)
+        works, tags = oa_search(specs, SINCE)
+    if full:
+        return works, tags
+    return [w for w in works if state.is_changed(w)], tags
+
+
+def tag_queries(state: CrawlState, dedup: DedupIndex, works: Iterable[Dict], names: Dict[str, List[str]]) -> None:
+    """노트가 있는 work(중복이면 대표 work)에 일치한 쿼리 이름 기록 → 허브 쿼리별 섹션"""
+    cat = catalog.shared()
+    for w in works:
+        key = work_key(w)
+        if names.get(key):
+            owner = dedup.lookup(w) or key
+            state.tag(owner, names[key])
+            if cat is not None and owner in state.seen:
+                cat.tag(owner, names[key])
+
+
+def hub_notes(state: CrawlState) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    허브에 걸 노트 목록과 쿼리별 노트 (카탈로그에서 읽음).
+    CATALOG=0이거나 카탈로그가 볼트보다 늦게 생겨 아직 모르는 노트가 있으면 크롤 상태로 대신한다
+    (델타 실행은 바뀐 work만 카탈로그에 넣으므로 다음 전체 갱신 때 채워진다).
+    """
+    cat = catalog.shared()
+    if cat is not None:
+        notes = cat.notes()
+        if set(notes) >= {s["note"] for s in state.seen.values()}:
+            return notes, cat.notes_by_query()
+        print("INFO: Catalog is missing vault notes; hub built from crawl state until the next full refresh")
+    return state.notes(), state.notes_by_query()
+
+
+def stream_into_vault(state: CrawlState, full: bool, paper_dir: Path, writer: VaultWriter, miner: RuleMiner,
+                      dedup: DedupIndex, specs: List[QuerySpec]) -> int:
+    """
+    페이지가 도착하는 대로 렌더링 → 기록 → 규칙 누적. 메모리는 페이지 크기에만 비례.
+    쿼리가 여럿이면 쿼리별 스트림을 동시에 받아 번갈아 처리(같은 work는 dedup 색인이 한 번만 통과시킨다).
+    CHECKPOINT_SECS마다 쿼리별 다음 cursor와 규칙 누적 상태를 저장하고, 중단되면 다음 실행에서 그 cursor부터 재개.
+    (규칙 누적은 work별 내용 해시로 중복 반영을 막으므로 재개 시 같은 페이지를 다시 받아도 안전)
+    """
+    since = None if full else state.since_date()
+    sig = json.dumps([query_set.signature(specs), SINCE, full, since])
+    ck = state.stream if state.stream and state.stream.get("sig") == sig else None
+    cursors, done = (dict(ck["cursors"]), dict(ck["done"])) if ck else ({}, {})
+    if ck:
+        print(f"INFO: Resuming stream after {sum(done.values())} works")
+
+    def pages():
+        try:
+            yield from oa_stream(specs, SINCE, cursors, done, updated_since=since)
+        except (requests.HTTPError, AccessLimited) as e:
+            if full or any(done.values()):
+                raise
+            print("WARNING: Delta filter rejected, falling back to local filtering", e)
+            yield from oa_stream(specs, SINCE, {}, {})
+
+    rendered, last_ck = 0, time.monotonic()
+    pool = render_pool()
+    try:
+        for spec, page, next_cursor in metrics.timed_iter("fetch", pages()):
+            metrics.count("works_fetched", len(page))
+            batch = page if full else [w for w in page if state.is_changed(w)]
+            if QUALITY_FILTER:
+                with metrics.stage("score"):
+                    batch = quality_filter(batch)
+            batch = dedup_works(batch, dedup)
+            metrics.count("works_kept", len(batch))
+            fns = []
+            for w, (fn, text) in zip(batch, metrics.timed_iter("render", render_notes(batch, pool=pool))):
+                fn = note_name(dedup, w, fn)
+                with metrics.stage("write"):
+                    write_file(paper_dir / fn, text, writer)
+                state.mark(w, fn)
+                fns.append(fn)
+            with metrics.stage("mine"):
+                for w in batch:
+                    miner.add(w)
+            store_catalog(batch, fns, miner)
+            if spec.name:
+                tag_queries(state, dedup, page, {work_key(w): [spec.name] for w in page})
+            done[spec.name] = done.get(spec.name, 0) + len(page)
+            cursors[spec.name] = next_cursor
+            rendered += len(batch)
+            state.stream = {"sig": sig, "cursors": dict(cursors), "done": dict(done)}
+            if time.monotonic() - last_ck >= CHECKPOINT_SECS:
+                parsed_doc.shared().commit()
+                miner.save(RULES_STATE_PATH)
+                dedup.save()
+                state.save()
+                last_ck = time.monotonic()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return rendered
+
+
 def run_once() -> None:
-    works = oa_search(QUERY, SINCE, LIMIT)
+    """1회 실행 + 단계별 계측 로그(볼트 logs/)"""
+    metrics.run("crawler", crawl, log_dir=VAULT_DIR / "logs")
+
+
+def crawl() -> None:
+    started = datetime.utcnow()
+    state = CrawlState.load(STATE_PATH)
+    full = not DELTA_CRAWL or state.needs_full(FULL_REFRESH_HOURS, started)
     paper_dir = VAULT_DIR / "papers"
     paper_dir.mkdir(exist_ok=True)
-    files: List[str] = []
-    for w in works:
-        fn = make_note(w, paper_dir)
-        files.append("papers/" + fn[:-3])
-    make_5why_template()
-    rules = mine_rules(works)
-    (VAULT_DIR / "rules.json").write_text(json.dumps(rules, ensure_ascii=False, indent=2), encoding="utf-8")
-    write_rules_summary(rules)
-    make_hub(files)
-    print(f"COMPLETED! Papers: {len(files)}, Rules: {len(rules)}, Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    writer = VaultWriter(VAULT_DIR)
+    # 규칙 누적 상태: 새/바뀐 work만 더하고 철회된 work는 빼므로 코퍼스 전체를 다시 훑지 않는다
+    miner = RuleMiner.load(RULES_STATE_PATH)
+    dedup = DedupIndex.load(DEDUP_PATH)
+    specs = query_specs()
+    if STREAM_CRAWL:
+        n_new = stream_into_vault(state, full, paper_dir, writer, miner, dedup, specs)
+    else:
+        with metrics.stage("fetch"):
+            works, tags = fetch_works(state, full, specs)
+        fetched = works
+        metrics.count("works_fetched", len(works))
+        if QUALITY_FILTER:
+            with metrics.stage("score"):
+                works = quality_filter(works, top_k=TRUST_TOP_K)
+        works = dedup_works(works, dedup)
+        metrics.count("works_kept", len(works))
+        fns = []
+        for w, (fn, text) in zip(works, metrics.timed_iter("render", render_notes(works))):
+            fn = note_name(dedup, w, fn)
+            with metrics.stage("write"):
+                write_file(paper_dir / fn, text, writer)
+            state.mark(w, fn)
+            fns.append(fn)
+            with metrics.stage("mine"):
+                miner.add(w)
+        store_catalog(works, fns, miner)
+        tag_queries(state, dedup, fetched, tags)
+        n_new = len(works)
+    notes, by_query = hub_notes(state)
+    for fn in notes:
+        writer.keep(paper_dir / fn)
+    files = ["papers/" + fn[:-3] for fn in notes]
+    sections = None
+    if any(s.name for s in specs):
+        sections = [(s.name, ["papers/" + fn[:-3] for fn in by_query.get(s.name, [])]) for s in specs]
+    make_5why_template(writer)
+    try:
+        prev_rules = json.loads((VAULT_DIR / "rules.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        prev_rules = []
+    with metrics.stage("mine"):
+        rules = miner.rules()
+        delta = rules_delta(prev_rules, rules)
+    with metrics.stage("write"):
+        writer.write(VAULT_DIR / "rules.json", json.dumps(rules, ensure_ascii=False, indent=2))
+        write_rules_summary(rules, writer)
+        write_rules_changelog(delta, started, rules, writer)
+        miner.save(RULES_STATE_PATH)
+        dedup.save()
+        make_hub(files, writer, sections)
+        writer.commit()
+        parsed_doc.shared().commit()
+        state.finish(started, full)
+    for k, v in writer.stats.items():
+        metrics.gauge(f"notes_{k}", v)
+    metrics.gauge("notes_total", len(files))
+    metrics.gauge("rules", len(rules))
+    metrics.gauge("full_refresh", int(full))
+    mode = "full" if full else f"delta since {state.since_date()}"
+    print(f"COMPLETED! Papers: {len(files)} (+{n_new} {mode}), Rules: {len(rules)}, Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print(f"INFO: rules +{len(delta['added'])} -{len(delta['removed'])} ~{len(delta['rescored'])}")
+    print("INFO:", writer.report())
+    cache = http_cache.shared()
+    if cache is not None:
+        print("INFO:", cache.report())
+        for k, v in cache.stats.items():
+            metrics.gauge(f"http_cache_{k}", v)
 
 if __name__ == "__main__":
-    run_once()
     interval = os.environ.get("AUTO_LOOP_HOURS")
     if interval:
-        hours = max(1, int(float(interval)))
-        while True:
-            time.sleep(hours * 3600)
-            try:
-                run_once()
-                print("INFO: Auto-refresh completed")
-            except Exception as e:
-                print("WARNING: Error during refresh", e)
\ No newline at end of file
+        # 상주 갱신: 잠금/지터/백오프/놓친 회차 건너뛰기/정상 종료는 scheduler.py가 담당
+        import scheduler
+        sched = scheduler.Scheduler([scheduler.Job("crawl", run_once, scheduler.default_crawl_interval())])
+        sched.install_signal_handlers()
+        sched.run()
+    else:
+        run_once()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+증분 크롤 상태(워터마크)
+
+볼트의 .crawl_state.json 에 저장:
+- last_run  : 마지막 성공 실행 시각(UTC, 이후 실행은 이 날짜 이후 갱신분만 요청)
+- last_full : 마지막 전체 갱신 시각
+- seen      : work 키 → {"updated": updated_date, "note": 파일명, "cited": 인용수, "queries": [일치한 쿼리]}
+- stream    : 스트리밍 실행 중간 체크포인트(쿼리 세트 서명, 쿼리별 다음 cursor와 처리 건수)
+"""
+import os, json
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+
+def work_key(w: Dict) -> str:
+    """OpenAlex ID → DOI → 제목 순으로 work 식별자 결정"""
+    return w.get("id") or w.get("doi") or (w.get("display_name") or "").strip().lower()
+
+
+class CrawlState:
+    def __init__(self, path: Path, data: Optional[Dict] = None):
+        self.path = Path(path)
+        data = data or {}
+        self.last_run: Optional[str] = data.get("last_run")
+        self.last_full: Optional[str] = data.get("last_full")
+        self.seen: Dict[str, Dict] = data.get("seen", {})
+        self.stream: Optional[Dict] = data.get("stream")
+
+    @classmethod
+    def load(cls, path: Path) -> "CrawlState":
+        try:
+            return cls(path, json.loads(Path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return cls(path)
+
+    def save(self) -> None:
+        data = {"version": 1, "last_run": self.last_run, "last_full": self.last_full, "seen": self.seen,
+                "stream": self.stream}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    # ---------- 판단 ----------
+    def needs_full(self, every_hours: float, now: Optional[datetime] = None) -> bool:
+        if not self.last_run or not self.last_full:
+            return True
+        now = now or datetime.utcnow()
+        return now - datetime.fromisoformat(self.last_full) >= timedelta(hours=every_hours)
+
+    def since_date(self) -> Optional[str]:
+        """델타 요청용 날짜(YYYY-MM-DD). 날짜 단위라 하루치가 겹치지만 seen으로 걸러진다."""
+        return self.last_run[:10] if self.last_run else None
+
+    def is_changed(self, w: Dict) -> bool:
+        prev = self.seen.get(work_key(w))
+        return prev is None or prev.get("updated") != w.get("updated_date")
+
+    # ---------- 갱신 ----------
+    def mark(self, w: Dict, note: str) -> None:
+        prev = self.seen.get(work_key(w)) or {}
+        self.seen[work_key(w)] = {
+            "updated": w.get("updated_date"),
+            "note": note,
+            "cited": int(w.get("cited_by_count") or 0),
+        }
+        if prev.get("queries"):
+            self.seen[work_key(w)]["queries"] = prev["queries"]
+
+    def tag(self, key: str, names: List[str]) -> None:
+        """노트가 있는 work에 일치한 쿼리 이름 추가 (노트 없는 work는 무시)"""
+        s = self.seen.get(key)
+        if s is None:
+            return
+        qs = s.setdefault("queries", [])
+        qs += [n for n in names if n not in qs]
+
+    def notes(self) -> List[str]:
+        """볼트에 병합된 전체 노트(인용수 내림차순)"""
+        rows = sorted(self.seen.values(), key=lambda s: -s.get("cited", 0))
+        out, dup = [], set()
+        for s in rows:
+            if s["note"] not in dup:
+                dup.add(s["note"])
+                out.append(s["note"])
+        return out
+
+    def notes_by_query(self) -> Dict[str, List[str]]:
+        """쿼리 이름 → 노트 목록(인용수 내림차순)"""
+        out: Dict[str, List[str]] = {}
+        dup = set()
+        for s in sorted(self.seen.values(), key=lambda s: -s.get("cited", 0)):
+            for q in s.get("queries", ()):
+                if (q, s["note"]) not in dup:
+                    dup.add((q, s["note"]))
+                    out.setdefault(q, []).append(s["note"])
+        return out
+
+    def finish(self, started: datetime, full: bool) -> None:
+        self.last_run = started.isoformat(timespec="seconds")
+        self.stream = None
+        if full:
+            self.last_full = self.last_run
+        self.save()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+work 중복 제거 색인 + 충돌 없는 노트 파일명 (크롤러 + scripts 공용)
+
+- OpenAlex ID / 정규화 DOI / 제목 지문(소문자, 악센트·태그·구두점·불용어 제거) → 대표 work 키, 모두 dict 조회 O(1)
+- 제목 지문은 DOI가 서로 다르거나 연도가 2년 이상 차이나면 같은 work로 보지 않는다(같은 제목의 다른 논문)
+- 파일명: 공용 규칙 paper_slug(제목, 연도). 다른 work가 이미 쓰는 이름이면 OpenAlex ID(없으면 키 해시)를 붙인다
+- 배정한 파일명은 색인에 저장되므로 실행 순서와 관계없이 같은 work는 같은 파일명
+
+저장 위치: 볼트 .dedup_index.json (크롤러), docs/.dedup_index.json (build_site + fetch_and_link 공유)
+"""
+import os, re, json, hashlib, unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from crawl_state import work_key
+
+FP_STOPWORDS = {"a", "an", "the", "of", "and", "in", "on", "for", "to", "with", "by", "at", "from", "vs", "versus"}
+FP_MIN_TOKENS = 3  # 이보다 짧은 제목("Editorial" 등)은 지문으로 합치지 않는다
+
+
+def norm_doi(doi: Optional[str]) -> Optional[str]:
+    """'https://doi.org/10.1/ABC' → '10.1/abc'"""
+    if not doi:
+        return None
+    d = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if d.startswith(prefix):
+            d = d[len(prefix):]
+            break
+    return d or None
+
+
+def title_fingerprint(title: Optional[str]) -> Optional[str]:
+    t = re.sub(r"<[^>]+>", " ", title or "")
+    t = unicodedata.normalize("NFKD", t).encode("ascii", "ignore").decode().lower()
+    toks = [x for x in re.findall(r"[a-z0-9]+", t) if x not in FP_STOPWORDS]
+    return " ".join(toks) if len(toks) >= FP_MIN_TOKENS else None
+
+
+def slug_base(title: Optional[str]) -> str:
+    t = re.sub(r"[^a-z0-9\-]+", "-", (title or "untitled").lower())
+    t = re.sub(r"-+", "-", t).strip("-")
+    return t or "untitled"
+
+
+def paper_slug(title: Optional[str], year: Optional[int]) -> str:
+    """docs/papers 공용 파일명 규칙 (확장자 제외)"""
+    base = slug_base(title)
+    return f"{base}-{year}" if year else base
+
+
+def short_id(key: str) -> str:
+    """'https://openalex.org/W123' → 'w123', 그 외 키는 해시 8자리"""
+    m = re.search(r"/(W\d+)$", key or "")
+    return m.group(1).lower() if m else hashlib.sha1((key or "").encode("utf-8")).hexdigest()[:8]
+
+
+class DedupIndex:
+    def __init__(self, path: Optional[Path] = None, data: Optional[Dict] = None):
+        self.path = Path(path) if path else None
+        data = data or {}
+        self.works: Dict[str, Dict] = data.get("works", {})  # 대표 키 → {"doi", "fp", "year", "updated", "base", "slug"}
+        self.by_id: Dict[str, str] = {}
+        self.by_doi: Dict[str, str] = {}
+        self.by_fp: Dict[str, str] = {}
+        self.owner: Dict[str, str] = {}   # 파일명 → 대표 키
+        for key, e in self.works.items():
+            self._link(key, e)
+        self.aliases: Dict[str, str] = data.get("aliases", {})  # 다른 ID로 들어온 같은 work → 대표 키
+        for alias, key in self.aliases.items():
+            self.by_id.setdefault(alias, key)
+        self.claimed: Set[str] = set()  # 이번 실행에서 이미 처리한 대표 키
+
+    @classmethod
+    def load(cls, path: Path) -> "DedupIndex":
+        try:
+            return cls(path, json.loads(Path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return cls(path)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        data = {"version": 1, "works": self.works, "aliases": self.aliases}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _link(self, key: str, e: Dict) -> None:
+        self.by_id[key] = key
+        if e.get("doi"):
+            self.by_doi.setdefault(e["doi"], key)
+        if e.get("fp"):
+            self.by_fp.setdefault(e["fp"], key)
+        if e.get("slug"):
+            self.owner[e["slug"]] = key
+
+    # ---------- 판정 ----------
+    def lookup(self, w: Dict) -> Optional[str]:
+        """같은 work로 판정되는 등록 work의 대표 키 (OpenAlex ID → DOI → 제목 지문)"""
+        key = self.by_id.get(work_key(w))
+        if key:
+            return key
+        doi = norm_doi(w.get("doi"))
+        if doi and doi in self.by_doi:
+            return self.by_doi[doi]
+        key = self.by_fp.get(title_fingerprint(w.get("display_name")) or "")
+        if key:
+            e = self.works[key]
+            y, ey = w.get("publication_year"), e.get("year")
+            if doi and e.get("doi") and doi != e["doi"]:
+                return None
+            if y and ey and abs(int(y) - int(ey)) > 1:
+                return None
+            return key
+        return None
+
+    def claim(self, w: Dict) -> Optional[str]:
+        """
+        work를 등록하고 대표 키 반환. 이번 실행에서 이미 처리한 work(같은 ID/DOI/제목 지문)이거나
+        다른 ID로 먼저 등록된 work의 사본이면 None → 렌더링/PDF/TF-IDF 대상에서 제외.
+        """
+        wkey = work_key(w)
+        key = self.lookup(w)
+        if key is not None and key != wkey:
+            if wkey not in self.aliases:
+                self.aliases[wkey] = key
+                self.by_id[wkey] = key
+            return None
+        if key in self.claimed:
+            return None
+        e = self.works.setdefault(wkey, {})
+        e.update({"doi": norm_doi(w.get("doi")), "fp": title_fingerprint(w.get("display_name")),
+                  "year": w.get("publication_year")})
+        self._link(wkey, e)
+        self.claimed.add(wkey)
+        return wkey
+
+    def unchanged(self, w: Dict) -> bool:
+        """이전 실행과 updated_date가 같고 파일명이 배정돼 있으면 True"""
+        e = self.works.get(work_key(w)) or {}
+        return bool(e.get("slug")) and e.get("updated") == w.get("updated_date")
+
+    # ---------- 파일명 ----------
+    def slug_for(self, w: Dict, base: str) -> Tuple[str, Optional[str]]:
+        """
+        (파일명, 바뀌기 전 파일명). 같은 work는 base가 그대로면 기존 파일명 유지,
+        base를 다른 work가 쓰고 있으면 '<base>-<OpenAlex ID>'. 두 번째 값은 제목/연도가 바뀌어 이름이 바뀐 경우만.
+        """
+        key = work_key(w)
+        e = self.works.setdefault(key, {})
+        old = e.get("slug")
+        if old and e.get("base") == base:
+            slug = old
+        else:
+            slug = base
+            if self.owner.get(slug, key) != key:
+                slug = f"{base}-{short_id(key)}"
+            if old and self.owner.get(old) == key:
+                del self.owner[old]
+        e.update({"base": base, "slug": slug, "updated": w.get("updated_date")})
+        self.owner[slug] = key
+        return slug, (old if old and old != slug else None)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+디스크 HTTP 응답 캐시 (크롤러 + scripts 공용)
+
+- 본문은 .cache/http/<ab>/<key> 파일, 메타데이터는 SQLite 인덱스
+- 엔드포인트(호스트)별 TTL, 만료 후에는 ETag/Last-Modified 조건부 요청으로 재검증(304면 본문 재사용)
+- 전체 용량 상한 초과 시 최근 사용이 가장 오래된 항목부터 제거(LRU)
+- 적중률 통계: hits(신선) / revalidated(304) / misses(전체 다운로드)
+
+옵션(환경변수):
+  HTTP_CACHE=0                 캐시 끄기
+  HTTP_CACHE_DIR=.cache/http   저장 위치
+  HTTP_CACHE_MAX_MB=512        용량 상한
+  HTTP_CACHE_OA_TTL=3600       OpenAlex API 응답 TTL(초)
+  HTTP_CACHE_PDF_TTL=2592000   그 외(PDF 등) TTL(초)
+"""
+import os, json, time, hashlib, sqlite3, threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CACHE_DIR = Path(os.getenv("HTTP_CACHE_DIR", ".cache/http"))
+MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "512")) * 1024 * 1024)
+TTLS = {
+    "api.openalex.org": int(os.getenv("HTTP_CACHE_OA_TTL", "3600")),
+    "*": int(os.getenv("HTTP_CACHE_PDF_TTL", str(30 * 86400))),
+}
+
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    full = url + ("?" + urlencode(sorted((k, str(v)) for k, v in params.items())) if params else "")
+    return hashlib.sha256(full.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """requests.Response에서 캐시 경로가 쓰는 부분만 흉내낸 응답"""
+
+    def __init__(self, status_code: int, headers: Dict, content: bytes, url: str, source: str):
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.content = content
+        self.url = url
+        self.source = source  # "hit" | "revalidated" | "miss" | "error"
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HTTPCache:
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_BYTES, ttls: Optional[Dict[str, int]] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = ttls or TTLS
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+            " content_type TEXT, size INTEGER, stored_at REAL, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(accessed_at)")
+        self._db.commit()
+
+    # ---------- 내부 ----------
+    def ttl_for(self, url: str) -> int:
+        return self.ttls.get(urlparse(url).netloc, self.ttls["*"])
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _row(self, key: str):
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, content_type, stored_at FROM entries WHERE key=?", (key,)
+            ).fetchone()
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except OSError:
+            return None
+
+    def _drop(self, key: str) -> None:
+        """본문 파일이 없어진 항목(다른 프로세스가 비웠거나 직접 지움)을 색인에서 뺀다"""
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+            self._db.commit()
+
+    def _touch(self, key: str, stored: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if stored:
+                self._db.execute("UPDATE entries SET stored_at=?, accessed_at=? WHERE key=?", (now, now, key))
+            else:
+                self._db.execute("UPDATE entries SET accessed_at=? WHERE key=?", (now, key))
+            self._db.commit()
+
+    def _store(self, key: str, url: str, headers, body: bytes) -> None:
+        p = self._path(key)
+        p.parent.mkdir(exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, p)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?)",
+                (key, url, headers.get("ETag"), headers.get("Last-Modified"), headers.get("Content-Type"),
+                 len(body), now, now),
+            )
+            self._db.commit()
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                if total <= target:
+                    break
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                total -= size
+                self.stats["evicted"] += 1
+            self._db.commit()
+
+    def _receive(self, key: str, url: str, r, max_bytes: Optional[int]) -> CachedResponse:
+        """조건 없는 응답(또는 오류)을 받아 CachedResponse로, 온전한 200 본문만 저장"""
+        if r.status_code != 200:
+            return CachedResponse(r.status_code, dict(r.headers), r.content, r.url, "error")
+        chunks, size, truncated = [], 0, False
+        for chunk in r.iter_content(16384):
+            if not chunk: break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                truncated = True
+                break
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        self.stats["misses"] += 1
+        if not truncated:
+            self._store(key, url, r.headers, body)
+        return CachedResponse(200, dict(r.headers), body, r.url, "miss")
+
+    # ---------- 공개 ----------
+    def fetch(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+              timeout: float = 30, max_bytes: Optional[int] = None,
+              session: Optional[requests.Session] = None) -> CachedResponse:
+        """
+        캐시를 거친 GET. 신선하면 네트워크 없이, 만료됐으면 조건부 요청으로 재검증
+        (본문 파일이 없어진 항목은 색인에서 빼고 조건 없이 요청 → 304를 받아도 돌려줄 본문이 없는 경우 방지).
+        max_bytes가 주어지면 본문을 그 크기까지만 받는다(잘린 본문은 캐시하지 않음 → 다른 호출자가 잘린 본문을 받지 않도록).
+        """
+        key = cache_key(url, params)
+        row = self._row(key)
+        if row and not self._path(key).exists():
+            self._drop(key)
+            row = None
+        if row:
+            etag, last_mod, ctype, stored_at = row
+            if time.time() - stored_at < self.ttl_for(url):
+                body = self._read(key)
+                if body is not None:
+                    self._touch(key)
+                    self.stats["hits"] += 1
+                    return CachedResponse(200, {"Content-Type": ctype or ""}, body[:max_bytes or None], url, "hit")
+                self._drop(key)
+                row = None
+
+        while True:
+            req_headers = dict(headers or {})
+            if row:
+                if etag: req_headers["If-None-Match"] = etag
+                if last_mod: req_headers["If-Modified-Since"] = last_mod
+            with (session or self.session).get(url, params=params, headers=req_headers,
+                                                timeout=timeout, stream=True) as r:
+                if r.status_code == 304 and row:
+                    body = self._read(key)
+                    if body is not None:
+                        self._touch(key, stored=True)
+                        self.stats["revalidated"] += 1
+                        return CachedResponse(200, {"Content-Type": ctype or ""}, body[:max_bytes or None], r.url, "revalidated")
+                    self._drop(key)  # 재검증하는 사이 본문이 사라짐 → 조건 없이 한 번 더
+                    row = None
+                    continue
+                return self._receive(key, url, r, max_bytes)
+
+    def hit_rate(self) -> float:
+        n = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["revalidated"]) / n if n else 0.0
+
+    def report(self) -> str:
+        s = self.stats
+        return (f"cache hit {self.hit_rate():.0%} (fresh {s['hits']}, 304 {s['revalidated']},"
+                f" download {s['misses']}, evicted {s['evicted']})")
+
+
+_SHARED: Optional[HTTPCache] = None
+
+
+def shared() -> Optional[HTTPCache]:
+    """프로세스 공용 캐시 (HTTP_CACHE=0이면 None)"""
+    global _SHARED
+    if os.getenv("HTTP_CACHE", "1") == "0":
+        return None
+    if _SHARED is None:
+        _SHARED = HTTPCache()
+    return _SHARED
+
+
+def get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, timeout: float = 30,
+        max_bytes: Optional[int] = None, session: Optional[requests.Session] = None):
+    """캐시가 꺼져 있으면 일반 requests.get으로 대체되는 편의 함수 (session을 주면 그 커넥션 풀 사용)"""
+    cache = shared()
+    if cache is not None:
+        return cache.fetch(url, params=params, headers=headers, timeout=timeout, max_bytes=max_bytes,
+                           session=session)
+    http = session or requests
+    if not max_bytes:
+        return http.get(url, params=params, headers=headers, timeout=timeout)
+    with http.get(url, params=params, headers=headers, timeout=timeout, stream=True) as r:
+        chunks, size = [], 0
+        for chunk in r.iter_content(16384):
+            if not chunk: break
+            size += len(chunk)
+            if size > max_bytes: break
+            chunks.append(chunk)
+        return CachedResponse(r.status_code, dict(r.headers), b"".join(chunks), r.url, "miss")
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+실행 단위 계측 (크롤러 + scripts 공용)
+
+- stage(name): 구간 타이머(호출 수, 누적/최대 시간). 스레드 안전
+- count(name, n) / gauge(name, value): 카운터와 게이지
+- timed_iter(name, it): 제너레이터의 next() 대기 시간만 누적 (스트리밍 수집 등)
+- observe(name, seconds): 자식 프로세스 등 밖에서 잰 시간을 단계에 더함
+- 실행이 끝나면 볼트 logs/ 에 JSON 실행 로그(run-<job>-<시각>.json)와 Prometheus 텍스트 파일(<job>.prom) 기록
+- 선택: tracemalloc(단계별 할당 피크, 근사), cProfile(.pstats + 상위 함수 요약)
+
+계측이 꺼져 있거나 begin() 전이면 stage()는 공용 no-op 객체를 돌려주므로 비용은 함수 호출 1회 수준.
+
+옵션(환경변수):
+  METRICS=0                                   계측 끄기
+  METRICS_DIR=ObsidianVault/Compensation/logs 로그 위치
+  METRICS_KEEP=200                            보관할 JSON 실행 로그 수(작업별)
+  METRICS_TRACEMALLOC=1                       단계별 메모리 할당 피크
+  METRICS_PROFILE=1                           cProfile 수집
+"""
+import os, io, json, time, threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+METRICS = os.getenv("METRICS", "1") != "0"
+METRICS_DIR = Path(os.getenv("METRICS_DIR", "ObsidianVault/Compensation/logs"))
+METRICS_KEEP = int(os.getenv("METRICS_KEEP", "200"))
+TRACEMALLOC = os.getenv("METRICS_TRACEMALLOC", "0") == "1"
+PROFILE = os.getenv("METRICS_PROFILE", "0") == "1"
+PROM_PREFIX = "compensation"
+
+
+class _Null:
+    """계측이 꺼져 있을 때 쓰는 no-op 컨텍스트"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Stage:
+    __slots__ = ("run", "name", "t0", "mem0")
+
+    def __init__(self, run: "Run", name: str):
+        self.run, self.name = run, name
+
+    def __enter__(self):
+        if self.run.tracemalloc:
+            import tracemalloc
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        peak = None
+        if self.run.tracemalloc:
+            import tracemalloc
+            peak = max(0, tracemalloc.get_traced_memory()[1] - self.mem0)
+        self.run._record(self.name, dt, peak)
+        return False
+
+
+class Run:
+    def __init__(self, job: str, log_dir: Path = METRICS_DIR, tracemalloc: bool = TRACEMALLOC,
+                 profile: bool = PROFILE):
+        self.job = job
+        self.log_dir = Path(log_dir)
+        self.tracemalloc = tracemalloc
+        self.profile = profile
+        self.stages: Dict[str, Dict] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._prof = None
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        if tracemalloc:
+            import tracemalloc as tm
+            tm.start()
+        if profile:
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+
+    # ---------- 수집 ----------
+    def _record(self, name: str, dt: float, peak: Optional[int]) -> None:
+        with self._lock:
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0}
+            s["calls"] += 1
+            s["seconds"] += dt
+            if dt > s["max_seconds"]:
+                s["max_seconds"] = dt
+            if peak is not None and peak > s.get("alloc_peak_bytes", 0):
+                s["alloc_peak_bytes"] = peak
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    # ---------- 출력 ----------
+    def summary(self) -> Dict:
+        out = {
+            "job": self.job,
+            "started": self.started.isoformat(timespec="seconds"),
+            "duration_seconds": round(time.perf_counter() - self._t0, 6),
+            "stages": {k: {kk: (round(vv, 6) if isinstance(vv, float) else vv) for kk, vv in v.items()}
+                       for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+        try:
+            import resource
+            out["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        except ImportError:
+            pass
+        return out
+
+    def prometheus(self, data: Dict) -> str:
+        job = data["job"]
+        lines = []
+
+        def metric(name: str, kind: str, help_: str, rows):
+            lines.append(f"# HELP {PROM_PREFIX}_{name} {help_}")
+            lines.append(f"# TYPE {PROM_PREFIX}_{name} {kind}")
+            for labels, v in rows:
+                lab = ",".join(f'{k}="{str(val)}"' for k, val in [("job", job), *labels])
+                lines.append(f"{PROM_PREFIX}_{name}{{{lab}}} {v}")
+
+        metric("run_duration_seconds", "gauge", "Wall time of the last run.", [((), data["duration_seconds"])])
+        metric("run_success", "gauge", "1 if the last run finished without error.",
+               [((), 1 if data.get("status") == "ok" else 0)])
+        metric("run_timestamp_seconds", "gauge", "Start time of the last run (unix).",
+               [((), int(self.started.timestamp()))])
+        metric("stage_seconds", "gauge", "Time spent per stage in the last run.",
+               [((("stage", k),), v["seconds"]) for k, v in data["stages"].items()])
+        metric("stage_calls", "gauge", "Calls per stage in the last run.",
+               [((("stage", k),), v["calls"]) for k, v in data["stages"].items()])
+        metric("events", "gauge", "Counters from the last run.",
+               [((("name", k),), v) for k, v in data["counters"].items()])
+        metric("value", "gauge", "Gauges from the last run.",
+               [((("name", k),), v) for k, v in data["gauges"].items()])
+        if "peak_rss_mb" in data:
+            metric("peak_rss_megabytes", "gauge", "Peak resident set size.", [((), data["peak_rss_mb"])])
+        return "\n".join(lines) + "\n"
+
+    def finish(self, status: str = "ok", error: Optional[str] = None) -> Optional[Path]:
+        """JSON 실행 로그 + .prom 파일 기록. 기록한 JSON 경로 반환"""
+        data = self.summary()
+        data["status"] = status
+        if error:
+            data["error"] = error
+        if self.tracemalloc:
+            import tracemalloc
+            data["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+        stamp = self.started.strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            if self._prof is not None:
+                import pstats
+                self._prof.disable()
+                prof_path = self.log_dir / f"profile-{self.job}-{stamp}.pstats"
+                self._prof.dump_stats(str(prof_path))
+                buf = io.StringIO()
+                pstats.Stats(self._prof, stream=buf).sort_stats("cumulative").print_stats(25)
+                data["profile"] = {"path": prof_path.name, "top": buf.getvalue().splitlines()[-30:]}
+            path = self.log_dir / f"run-{self.job}-{stamp}.json"
+            path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            prom = self.log_dir / f"{self.job}.prom"
+            tmp = prom.with_suffix(".prom.tmp")
+            tmp.write_text(self.prometheus(data), encoding="utf-8")
+            os.replace(tmp, prom)
+            for old in sorted(self.log_dir.glob(f"run-{self.job}-*.json"))[:-METRICS_KEEP]:
+                old.unlink()
+            return path
+        except OSError as e:
+            print("WARNING: metrics log not written:", e)
+            return None
+
+
+# ------------------ 프로세스 공용 실행 ------------------
+_ACTIVE: Optional[Run] = None
+
+
+def begin(job: str, **kw) -> Optional[Run]:
+    """계측 실행 시작 (METRICS=0이면 None, 이후 호출은 모두 no-op)"""
+    global _ACTIVE
+    _ACTIVE = Run(job, **kw) if METRICS else None
+    return _ACTIVE
+
+
+def end(status: str = "ok", error: Optional[str] = None) -> Optional[Path]:
+    global _ACTIVE
+    run, _ACTIVE = _ACTIVE, None
+    return run.finish(status, error) if run is not None else None
+
+
+def run(job: str, fn: Callable, log_dir: Optional[Path] = None):
+    """fn()을 계측 실행으로 감싸 로그 기록. 예외는 status=error로 남기고 다시 던짐"""
+    begin(job, **({"log_dir": log_dir} if log_dir is not None else {}))
+    try:
+        result = fn()
+    except BaseException as e:
+        end("error", f"{type(e).__name__}: {e}")
+        raise
+    path = end()
+    if path is not None:
+        print("INFO: metrics", path)
+    return result
+
+
+def active() -> Optional[Run]:
+    return _ACTIVE
+
+
+def stage(name: str):
+    run = _ACTIVE
+    return _NULL if run is None else _Stage(run, name)
+
+
+def count(name: str, n: float = 1) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.count(name, n)
+
+
+def gauge(name: str, value: float) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.gauge(name, value)
+
+
+def observe(name: str, seconds: float) -> None:
+    """다른 프로세스/스레드에서 잰 시간을 name 단계로 기록"""
+    if _ACTIVE is not None:
+        _ACTIVE._record(name, seconds, None)
+
+
+def timed_iter(name: str, it: Iterable) -> Iterator:
+    """각 항목을 기다린 시간만 name 단계로 누적 (소비하는 쪽 처리 시간은 제외)"""
+    it = iter(it)
+    while True:
+        with stage(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
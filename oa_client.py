@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAlex 비동기 수집 엔진
+
+- 커넥션 풀을 공유하는 requests.Session (스레드 실행기 위에서 asyncio로 구동)
+- 동시 요청 수 제한(Semaphore) + 토큰 버킷 속도 제한
+- 429 / Retry-After 준수, 스로틀링 시 속도 절반 → 성공할 때마다 서서히 회복(AIMD)
+- 독립 슬라이스(쿼리 × 연도, 페이지 번호) 병렬 수집
+- cache를 넘기면 http_cache 디스크 캐시를 거쳐 요청
+
+옵션(환경변수):
+  OA_CONCURRENCY=4   동시 요청 수
+  OA_RATE=5          초당 최대 요청 수 (OpenAlex 권장 한도 10)
+  OA_MAX_RETRIES=5   429/5xx/네트워크 오류 재시도 횟수
+"""
+import os, math, time, heapq, queue, random, asyncio, functools, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OA_WORKS = "https://api.openalex.org/works"
+CONCURRENCY = int(os.getenv("OA_CONCURRENCY", "4"))
+RATE = float(os.getenv("OA_RATE", "5"))
+MAX_RETRIES = int(os.getenv("OA_MAX_RETRIES", "5"))
+PER_PAGE = 200
+PAGE_CAP = 10_000  # page= 방식 페이지네이션 한도 (그 이상은 cursor만 가능)
+
+
+class AccessLimited(Exception):
+    """403 응답. 호출 측에서 모의 데이터 등으로 대체한다."""
+
+
+# ------------------ 속도 제한 ------------------
+class TokenBucket:
+    """초당 rate개씩 채워지는 토큰 버킷. 429를 받으면 rate를 낮추고 Retry-After 동안 막는다."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: float = 0.2):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock, self._loop = None, None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # asyncio 기본 객체는 이벤트 루프에 묶이므로 루프마다 새로 만든다
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                blocked = self.blocked_until - now
+                if blocked <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(blocked if blocked > 0 else (1 - self.tokens) / self.rate)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def reward(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+def retry_after_seconds(r: requests.Response) -> Optional[float]:
+    val = r.headers.get("Retry-After")
+    if not val:
+        return None
+    try:
+        return max(0.0, float(val))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    return min(cap, base * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+# ------------------ 클라이언트 ------------------
+class OAClient:
+    """풀링된 세션 + 동시성/속도 제한을 갖춘 비동기 JSON 클라이언트"""
+
+    def __init__(self, headers: Optional[Dict] = None, concurrency: int = CONCURRENCY,
+                 rate: float = RATE, max_retries: int = MAX_RETRIES, cache=None):
+        self.cache = cache  # http_cache.HTTPCache (선택)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.bucket = TokenBucket(rate)
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0}
+        self.concurrency = concurrency
+        self._sem, self._loop = None, None
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self.session.close()
+
+    def run(self, coro):
+        return asyncio.run(coro)
+
+    def _get(self, url: str, params: Dict, timeout: float):
+        if self.cache is not None:
+            return self.cache.fetch(url, params=params, timeout=timeout, session=self.session)
+        return self.session.get(url, params=params, timeout=timeout)
+
+    async def get_json(self, url: str, params: Dict, timeout: float = 30) -> Dict:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._sem, self._loop = asyncio.Semaphore(self.concurrency), loop
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            await self.bucket.acquire()
+            async with self._sem:
+                try:
+                    r = await loop.run_in_executor(
+                        self._pool, functools.partial(self._get, url, params, timeout))
+                except (requests.ConnectionError, requests.Timeout):
+                    if last:
+                        raise
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(backoff(attempt))
+                    continue
+            self.stats["requests"] += 1
+            if r.status_code == 403:
+                raise AccessLimited(f"{r.status_code} {r.url}")
+            if r.status_code == 429 or r.status_code >= 500:
+                if last:
+                    r.raise_for_status()
+                wait = retry_after_seconds(r)
+                if r.status_code == 429:
+                    self.stats["throttled"] += 1
+                    self.bucket.penalize(wait)
+                self.stats["retries"] += 1
+                await asyncio.sleep(wait if wait is not None else backoff(attempt))
+                continue
+            r.raise_for_status()
+            self.bucket.reward()
+            return r.json()
+        raise RuntimeError("unreachable")
+
+
+# ------------------ 페이지네이션 ------------------
+@dataclass
+class Slice:
+    """독립적으로 수집 가능한 결과 구간 (쿼리 파라미터 + 최대 건수)"""
+    params: Dict
+    limit: int
+
+
+async def cursor_walk(client: OAClient, sl: Slice, url: Optional[str] = None) -> List[Dict]:
+    """cursor 기반 순차 수집. 한 슬라이스 안에서는 다음 cursor를 알아야 하므로 순차적."""
+    url, res, cursor = url or OA_WORKS, [], "*"
+    while len(res) < sl.limit and cursor:
+        params = dict(sl.params, per_page=min(PER_PAGE, sl.limit - len(res)), cursor=cursor)
+        js = await client.get_json(url, params)
+        res.extend(js.get("results", [])[: sl.limit - len(res)])
+        cursor = js.get("meta", {}).get("next_cursor")
+    return res
+
+
+async def page_walk(client: OAClient, sl: Slice, url: Optional[str] = None) -> List[Dict]:
+    """page 번호 기반 수집. 첫 페이지로 전체 건수를 확인한 뒤 나머지 페이지를 동시에 요청."""
+    url, per_page = url or OA_WORKS, min(PER_PAGE, sl.limit)
+    first = await client.get_json(url, dict(sl.params, per_page=per_page, page=1))
+    total = min(sl.limit, first.get("meta", {}).get("count") or 0, PAGE_CAP)
+    pages = math.ceil(total / per_page) if total else 1
+    rest = await asyncio.gather(*[
+        client.get_json(url, dict(sl.params, per_page=per_page, page=p)) for p in range(2, pages + 1)
+    ])
+    res = []
+    for js in [first, *rest]:
+        res.extend(js.get("results", []))
+    return res[: sl.limit]
+
+
+async def fetch_slices(client: OAClient, slices: List[Slice], url: Optional[str] = None) -> List[List[Dict]]:
+    """서로 독립인 슬라이스들을 병렬로 수집 (슬라이스 순서대로 결과 반환)"""
+    return await asyncio.gather(*[
+        (page_walk if s.limit <= PAGE_CAP else cursor_walk)(client, s, url) for s in slices
+    ])
+
+
+async def ranked_walk(client: OAClient, slices: List[Slice], limit: int, url: Optional[str] = None) -> List[List[Dict]]:
+    """
+    인용수 내림차순 슬라이스들을 cursor로 한 페이지씩 병렬 수집해 전체 상위 limit건에 필요한 만큼만 받는다.
+    지금까지 모은 상위 limit번째 인용수 이하로 내려간 슬라이스는 멈춘다(남은 work는 더 높을 수 없으므로).
+    """
+    url, top = url or OA_WORKS, []  # top: 모은 인용수 상위 limit개 (min-heap)
+    chunks: List[List[Dict]] = [[] for _ in slices]
+
+    async def walk(i: int, sl: Slice) -> None:
+        cursor = "*"
+        while cursor and len(chunks[i]) < sl.limit:
+            js = await client.get_json(url, dict(sl.params, per_page=min(PER_PAGE, sl.limit - len(chunks[i])), cursor=cursor))
+            res = js.get("results", [])[: sl.limit - len(chunks[i])]
+            chunks[i].extend(res)
+            for w in res:
+                c = int(w.get("cited_by_count") or 0)
+                if len(top) < limit:
+                    heapq.heappush(top, c)
+                elif c > top[0]:
+                    heapq.heapreplace(top, c)
+            cursor = js.get("meta", {}).get("next_cursor")
+            if not res or (len(top) >= limit and int(res[-1].get("cited_by_count") or 0) <= top[0]):
+                break
+
+    await asyncio.gather(*[walk(i, s) for i, s in enumerate(slices)])
+    return chunks
+
+
+def merge_by_citations(chunks: List[List[Dict]], limit: int) -> List[Dict]:
+    """슬라이스 결과를 인용수 내림차순으로 병합하고 중복 ID 제거"""
+    seen, out = set(), []
+    for w in sorted((w for ch in chunks for w in ch), key=lambda w: -int(w.get("cited_by_count") or 0)):
+        wid = w.get("id")
+        if wid and wid in seen:
+            continue
+        seen.add(wid)
+        out.append(w)
+        if len(out) >= limit:
+            break
+    return out
+
+
+async def search_works(client: OAClient, params: Dict, limit: int,
+                       years: Optional[List[int]] = None) -> List[Dict]:
+    """
+    인용수 내림차순 상위 limit건.
+    limit ≤ PAGE_CAP이면 페이지 병렬 수집, 그보다 크면 연도별 cursor 슬라이스를 병렬로 돌려 병합
+    (슬라이스마다 limit건씩 받지 않고 상위 limit건이 확정되면 멈춘다, ranked_walk).
+    """
+    if limit <= PAGE_CAP or not years:
+        (res,) = await fetch_slices(client, [Slice(params, limit)])
+        return res
+    base = {k: v for k, v in params.items() if k != "from_publication_date"}
+    extra = base.pop("filter", None)
+    slices = [Slice(dict(base, filter=",".join(filter(None, [extra, f"publication_year:{y}"]))), limit)
+              for y in years]
+    return merge_by_citations(await ranked_walk(client, slices, limit), limit)
+
+
+# ------------------ 스트리밍 ------------------
+_DONE = object()
+
+
+def stream_pages(params: Dict, limit: int, cursor: str = "*", headers: Optional[Dict] = None,
+                 cache=None, prefetch: int = 2, url: Optional[str] = None) -> Iterator[Tuple[List[Dict], Optional[str]]]:
+    """
+    cursor 순서대로 (페이지 결과, 다음 cursor)를 도착하는 즉시 반환하는 동기 제너레이터.
+    백그라운드 스레드가 최대 prefetch 페이지만큼만 앞서 받으므로 메모리는 페이지 수와 무관하게 일정.
+    소비 측이 중단(break/예외)하면 수집도 멈춘다.
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def walk(client: OAClient) -> None:
+        loop, cur, fetched = asyncio.get_running_loop(), cursor, 0
+        while fetched < limit and cur and not stop.is_set():
+            js = await client.get_json(url or OA_WORKS, dict(params, per_page=min(PER_PAGE, limit - fetched), cursor=cur))
+            res = js.get("results", [])[: limit - fetched]
+            fetched += len(res)
+            cur = js.get("meta", {}).get("next_cursor")
+            if not await loop.run_in_executor(None, put, (res, cur)) or not res:
+                break
+
+    def produce() -> None:
+        try:
+            with OAClient(headers=headers, cache=cache) as client:
+                client.run(walk(client))
+            put(_DONE)
+        except BaseException as e:  # 소비 측에서 다시 발생시킨다
+            put(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
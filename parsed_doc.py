@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+work별 파싱 문서 캐시 (크롤러 + scripts 공용)
+
+- ParsedDoc: 초록 원문 / 소문자 텍스트 / 문장 구분자([.!?]) 오프셋을 한 번만 계산해 보관
+- 초록은 abstract_inverted_index를 위치 배열에 바로 채워 선형 시간에 복원 (정렬 없음)
+- DocStore: work ID + 내용 해시로 메모이즈, .cache/docs.sqlite 에 저장해 실행 간 재사용
+
+옵션(환경변수):
+  DOC_CACHE=0                     디스크 저장 끄기(프로세스 내 메모만)
+  DOC_CACHE_PATH=.cache/docs.sqlite
+"""
+import os, re, json, hashlib, sqlite3, threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Tuple
+
+import metrics
+
+DOC_CACHE_PATH = Path(os.getenv("DOC_CACHE_PATH", ".cache/docs.sqlite"))
+SENT_DELIM = re.compile(r"[.!?]")
+
+
+def reconstruct(inv: Optional[Dict[str, List[int]]]) -> str:
+    """abstract_inverted_index → 원문. 위치 배열을 미리 잡아 채우므로 O(n)"""
+    if not inv:
+        return ""
+    size = 1 + max((p for poses in inv.values() for p in poses), default=-1)
+    slots: List[Optional[str]] = [None] * size
+    for word, poses in inv.items():
+        for p in poses:
+            slots[p] = word
+    return " ".join(w for w in slots if w is not None)
+
+
+def inv_digest(w: Dict) -> str:
+    """work 내용 해시. OpenAlex updated_date가 있으면 그것으로 충분"""
+    if w.get("updated_date"):
+        return "u:" + w["updated_date"]
+    raw = json.dumps(w.get("abstract_inverted_index"), ensure_ascii=False)
+    return "h:" + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class ParsedDoc:
+    __slots__ = ("key", "digest", "text", "lower", "delims")
+
+    def __init__(self, key: str, digest: str, text: str, delims: Optional[array] = None):
+        self.key = key
+        self.digest = digest
+        self.text = text
+        self.lower = text.lower()
+        self.delims = delims if delims is not None else array("I", (m.start() for m in SENT_DELIM.finditer(self.lower)))
+
+    def sentences(self) -> List[str]:
+        """re.split(r"[.!?]", lower)와 같은 결과를 저장된 오프셋으로 생성"""
+        out, prev = [], 0
+        for d in self.delims:
+            out.append(self.lower[prev:d])
+            prev = d + 1
+        out.append(self.lower[prev:])
+        return out
+
+    def spans(self, pattern: Pattern) -> List[Tuple[int, int]]:
+        """임의의 분리 정규식 기준 문장 구간 (빈 구간 제외)"""
+        out, prev = [], 0
+        for m in pattern.finditer(self.text):
+            if m.start() > prev:
+                out.append((prev, m.start()))
+            prev = m.end()
+        if prev < len(self.text):
+            out.append((prev, len(self.text)))
+        return out
+
+
+class DocStore:
+    def __init__(self, path: Optional[Path] = DOC_CACHE_PATH, capacity: int = 4096):
+        self.capacity = capacity
+        self._mem: "OrderedDict[str, ParsedDoc]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._pending: List[Tuple] = []
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS docs (key TEXT PRIMARY KEY, digest TEXT, text TEXT, delims BLOB)")
+            self._db.commit()
+
+    def _remember(self, doc: ParsedDoc) -> ParsedDoc:
+        self._mem[doc.key] = doc
+        self._mem.move_to_end(doc.key)
+        while len(self._mem) > self.capacity:
+            self._mem.popitem(last=False)
+        return doc
+
+    def get(self, key: str, digest: str, build) -> ParsedDoc:
+        """key/digest가 일치하는 캐시가 있으면 재사용, 없으면 build()로 원문을 만들어 저장"""
+        with self._lock:
+            doc = self._mem.get(key)
+            if doc is not None and doc.digest == digest:
+                self._mem.move_to_end(key)
+                metrics.count("doc_cache_hit")
+                return doc
+            if self._db is not None:
+                row = self._db.execute("SELECT digest, text, delims FROM docs WHERE key=?", (key,)).fetchone()
+                if row and row[0] == digest:
+                    metrics.count("doc_cache_hit")
+                    return self._remember(ParsedDoc(key, digest, row[1], array("I", row[2])))
+            metrics.count("doc_cache_miss")
+            with metrics.stage("parse"):
+                doc = ParsedDoc(key, digest, build())
+            if self._db is not None:
+                self._pending.append((key, digest, doc.text, doc.delims.tobytes()))
+                if len(self._pending) >= 500:
+                    self._flush()
+            return self._remember(doc)
+
+    def for_work(self, w: Dict) -> ParsedDoc:
+        """OpenAlex work의 초록 문서"""
+        key = w.get("id") or w.get("doi") or (w.get("display_name") or "")
+        return self.get(key, inv_digest(w), lambda: reconstruct(w.get("abstract_inverted_index")))
+
+    def for_text(self, key: str, text: str) -> ParsedDoc:
+        """임의 텍스트(예: docs/papers/*.md 본문) 문서"""
+        digest = "t:" + hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+        return self.get(key, digest, lambda: text)
+
+    def _flush(self) -> None:
+        if self._db is not None and self._pending:
+            self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?,?,?,?)", self._pending)
+            self._db.commit()
+        self._pending = []
+
+    def commit(self) -> None:
+        with self._lock:
+            self._flush()
+
+
+_SHARED: Optional[DocStore] = None
+
+
+def shared() -> DocStore:
+    """프로세스 공용 문서 캐시"""
+    global _SHARED
+    if _SHARED is None:
+        _SHARED = DocStore(None if os.getenv("DOC_CACHE", "1") == "0" else DOC_CACHE_PATH)
+    return _SHARED
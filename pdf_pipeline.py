@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+OA PDF 다운로드 → 텍스트 추출 2단계 파이프라인 (build_site + fetch_and_link 공용)
+
+- 다운로드: 스레드 풀 + 커넥션 풀 세션, 호스트별 동시 요청 상한(느린 호스트 하나가 배치 전체를 막지 않게)
+- 다운로드는 메모리에 모으지 않고 임시 파일로 바로 기록(해시도 받으면서 계산), 추출 프로세스에는 경로만 넘긴다
+- 서버가 Range 요청을 받으면 MAX_BYTES를 넘는 PDF는 앞부분 + 끝부분(xref/trailer)만 받아 원래 위치에 기록
+  → 잘린 PDF도 앞쪽 페이지 본문을 얻는다. Range를 모르는 서버는 앞부분만(pdfminer가 객체를 훑어 복구 시도)
+- 추출: 임시 파일을 mmap으로 열어 페이지 단위로 pdfminer 처리, 프로세스 풀에서 (CPU 바운드라 GIL 밖으로).
+  앞 N쪽까지만(PDF_MAX_PAGES) 또는 참고문헌 같은 절 제목(PDF_STOP_SECTION)이 나오면 거기서 멈춘다
+- 추출 단계(PDF_TIER): fast = 레이아웃 분석 없이 문자열만 디코딩(pypdfium2가 설치돼 있으면 그것으로),
+  full = pdfminer LAParams 레이아웃 분석, auto = fast로 뽑고 결과가 깨져 보일 때만 full로 다시
+  (기본 full = 지금까지와 같은 본문. auto/fast는 빠르지만 줄바꿈·띄어쓰기가 달라 본문이 조금 바뀔 수 있음)
+- 문서별 기한(다운로드 + 추출 합계). 넘기면 실패로 돌려주고 기다리지 않는다
+- 결과는 끝나는 순서대로 반환. 카탈로그/본문 캐시(pdf_text_cache.py)에 있는 본문은 다운로드 없이 먼저 반환,
+  받은 PDF의 내용 해시가 캐시에 있으면 추출 생략. 최근 실패한 URL은 retry_after까지 건너뜀
+
+옵션(환경변수):
+  PDF_WORKERS=8      동시 다운로드 수
+  PDF_PROCS=0        추출 프로세스 수 (0=CPU 수, 1=별도 프로세스 없이 스레드 하나)
+  PDF_PER_HOST=2     호스트별 동시 다운로드 수
+  PDF_DEADLINE=120   문서당 기한(초)
+  PDF_TIMEOUT=45     요청 타임아웃(초, 연결/읽기 각각)
+  PDF_MAX_BYTES=6000000 문서당 최대 다운로드 바이트
+  PDF_MAX_PAGES=0      앞에서부터 추출할 최대 쪽수 (0=전부)
+  PDF_STOP_SECTION=    이 정규식과 일치하는 줄(절 제목)부터는 버림, 예) "references|bibliography"
+  PDF_SPOOL_DIR=       임시 파일 위치 (기본 시스템 임시 디렉터리)
+  PDF_TIER=full        full | auto | fast
+"""
+import io, os, re, mmap, time, shutil, hashlib, tempfile, threading, multiprocessing
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+
+import catalog, metrics, pdf_text_cache
+from pdf_text_cache import PDFTextCache
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "8"))
+PDF_PROCS = int(os.getenv("PDF_PROCS", "0"))
+PDF_PER_HOST = int(os.getenv("PDF_PER_HOST", "2"))
+PDF_DEADLINE = float(os.getenv("PDF_DEADLINE", "120"))
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "45"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", "6000000"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_STOP_SECTION = os.getenv("PDF_STOP_SECTION", "")
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+PDF_TIER = os.getenv("PDF_TIER", "full")
+TAIL_BYTES = 512 * 1024  # Range로 따로 받는 끝부분(xref 테이블/스트림 + trailer)
+CHUNK = 64 * 1024
+
+
+def _stop_re(stop_section: str):
+    return re.compile(rf"(?im)^\s*(?:\d+\.?\s*)?(?:{stop_section})\s*$") if stop_section else None
+
+
+def _cut(out: io.StringIO, mark: int, stop) -> bool:
+    """방금 쓴 페이지(mark 이후)에 멈출 절 제목이 있으면 그 앞까지로 자르고 True"""
+    hit = stop.search(out.getvalue()[mark:]) if stop is not None else None
+    if hit:
+        out.seek(mark + hit.start())
+        out.truncate()
+    return bool(hit)
+
+
+class PlainTextDevice(PDFDevice):
+    """
+    글자 위치/레이아웃 객체를 만들지 않고 텍스트 연산자의 문자열만 디코딩해 쓰는 장치.
+    기준선(y)이 바뀌면 줄바꿈, Tj 사이와 TJ의 큰 음수 간격은 띄어쓰기로 본다.
+    """
+    WORD_GAP = 200  # TJ 간격(1/1000 em)이 이보다 크면 단어 경계
+
+    def __init__(self, rsrcmgr, outfp: io.StringIO):
+        super().__init__(rsrcmgr)
+        self.outfp = outfp
+        self._y: Optional[float] = None
+
+    def render_string(self, textstate, seq, ncs, graphicstate) -> None:
+        font = textstate.font
+        if font is None:
+            return
+        y = round(textstate.matrix[5] + textstate.linematrix[1], 1)
+        parts = [("\n" if y != self._y else " ") if self._y is not None else ""]
+        self._y = y
+        for obj in seq:
+            if isinstance(obj, (int, float)):
+                if -obj > self.WORD_GAP:
+                    parts.append(" ")
+                continue
+            for cid in font.decode(obj):
+                try:
+                    parts.append(font.to_unichr(cid))
+                except PDFUnicodeNotDefined:
+                    parts.append(f"(cid:{cid})")
+        self.outfp.write("".join(parts))
+
+    def end_page(self, page) -> None:
+        self.outfp.write("\n\f")
+        self._y = None
+
+
+def _pdfminer_text(m, laparams, max_pages: int, stop) -> str:
+    """laparams가 None이면 PlainTextDevice(레이아웃 분석 없음), 있으면 TextConverter"""
+    from pdfminer.converter import TextConverter
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    out = io.StringIO()
+    rsrc = PDFResourceManager(caching=True)
+    device = TextConverter(rsrc, out, laparams=laparams) if laparams else PlainTextDevice(rsrc, out)
+    interp = PDFPageInterpreter(rsrc, device)
+    pages = PDFPage.get_pages(m, maxpages=max_pages, caching=True)
+    try:
+        while True:
+            try:
+                page = next(pages)
+            except StopIteration:
+                break
+            except Exception:
+                if out.tell() == 0:
+                    raise
+                break  # 받지 못한 구간의 페이지 → 여기까지
+            mark = out.tell()
+            interp.process_page(page)
+            if _cut(out, mark, stop):
+                break
+    finally:
+        device.close()
+    return out.getvalue()
+
+
+def _pdfium_text(path: str, max_pages: int, stop) -> str:
+    import pypdfium2 as pdfium
+    out = io.StringIO()
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for i in range(min(len(pdf), max_pages) if max_pages else len(pdf)):
+            mark = out.tell()
+            out.write(pdf[i].get_textpage().get_text_range() + "\n\f")
+            if _cut(out, mark, stop):
+                break
+    finally:
+        pdf.close()
+    return out.getvalue()
+
+
+def fast_text(path: str, m, max_pages: int = 0, stop=None) -> str:
+    """레이아웃 분석 없이 글자만 (pypdfium2가 있으면 그것, 없으면 PlainTextDevice)"""
+    try:
+        return _pdfium_text(path, max_pages, stop)
+    except ImportError:
+        return _pdfminer_text(m, None, max_pages, stop)
+
+
+def looks_garbled(text: str) -> bool:
+    """
+    fast 결과를 그대로 써도 되는지: 띄어쓰기가 빠져 단어가 붙었거나(평균 단어 길이),
+    (cid:n)/대체 문자/제어 문자가 많거나, 글자 비율이 낮으면 True
+    """
+    sample = text[:20000]
+    if len(sample.strip()) < 200:
+        return True
+    words = sample.split()
+    if sum(map(len, words)) / len(words) > 12:
+        return True
+    junk = sample.count("(cid:") * 6 + sample.count("\ufffd")
+    junk += sum(1 for ch in sample if ch < " " and ch not in "\n\r\t\f")
+    if junk > len(sample) * 0.05:
+        return True
+    letters = sum(1 for ch in sample if ch.isalpha())
+    return letters < len(sample.replace(" ", "").replace("\n", "")) * 0.5
+
+
+def extract_text(path: str, max_pages: int = 0, stop_section: str = "", tier: str = PDF_TIER) -> Tuple[str, float, str]:
+    """
+    PDF 파일 → (텍스트, 걸린 초, 실제 쓴 단계 "fast"|"full"|"fast+full"). 프로세스 풀에서 실행되므로 모듈 최상위 함수.
+    중간이 비어 있는(Range로 받은) 파일은 읽히는 페이지까지만 반환.
+    """
+    from pdfminer.layout import LAParams
+    t0 = time.perf_counter()
+    stop = _stop_re(stop_section)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("empty PDF")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            used = tier
+            if tier in ("fast", "auto"):
+                try:
+                    text = fast_text(path, m, max_pages, stop)
+                except Exception:
+                    if tier == "fast":
+                        raise
+                    text = ""
+                if tier == "auto":
+                    used = "fast"
+                    if looks_garbled(text):
+                        m.seek(0)
+                        text, used = _pdfminer_text(m, LAParams(), max_pages, stop), "fast+full"
+            else:
+                text = _pdfminer_text(m, LAParams(), max_pages, stop)
+    return text, time.perf_counter() - t0, used
+
+
+class PDFPipeline:
+    def __init__(self, headers: Optional[Dict] = None, workers: int = PDF_WORKERS, procs: int = PDF_PROCS,
+                 per_host: int = PDF_PER_HOST, deadline: float = PDF_DEADLINE, timeout: float = PDF_TIMEOUT,
+                 max_bytes: int = PDF_MAX_BYTES, store: Optional[PDFTextCache] = None,
+                 max_pages: int = PDF_MAX_PAGES, stop_section: str = PDF_STOP_SECTION, tier: str = PDF_TIER):
+        self.headers = headers or {}
+        self.store = store
+        self.workers = max(1, workers)
+        self.procs = procs or os.cpu_count() or 1
+        self.per_host = max(1, per_host)
+        self.deadline = deadline
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.stop_section = stop_section
+        if tier not in ("fast", "full", "auto"):
+            raise ValueError(f"PDF_TIER must be fast, full or auto: {tier!r}")
+        self.tier = tier
+        self.spool: Optional[str] = None  # run() 동안의 임시 디렉터리
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._hosts: Dict[str, threading.Semaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._hosts_lock:
+            sem = self._hosts.get(host)
+            if sem is None:
+                sem = self._hosts[host] = threading.Semaphore(self.per_host)
+            return sem
+
+    def download(self, url: str, due: float) -> Tuple[str, str]:
+        """PDF를 임시 파일로 받아 (경로, 받은 바이트의 sha256) 반환"""
+        with self._host_slot(url):
+            left = due - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"deadline passed before download: {url}")
+            fd, path = tempfile.mkstemp(suffix=".pdf", dir=self.spool)
+            try:
+                with metrics.stage("pdf_fetch"), os.fdopen(fd, "wb") as f:
+                    sha = self._fetch_to(url, f, min(self.timeout, left))
+            except BaseException:
+                os.unlink(path)
+                raise
+            return path, sha
+
+    def _fetch_to(self, url: str, f, timeout: float) -> str:
+        h = hashlib.sha256()
+        tail = min(TAIL_BYTES, self.max_bytes // 4)
+        head = self.max_bytes - tail
+        # 처음부터 Range로 요청: 206이면 전체 크기를 알고 끝부분도 따로 받을 수 있다, 200이면 앞부분만
+        headers = dict(self.headers, Range=f"bytes=0-{head - 1}")
+        with self.session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            total = _range_total(r) if r.status_code == 206 else None
+            self._copy(r, f, h, head if total else self.max_bytes)
+        if total and total > head:
+            start = max(head, total - tail)
+            with self.session.get(url, headers=dict(self.headers, Range=f"bytes={start}-"),
+                                  timeout=timeout, stream=True) as r:
+                if r.status_code == 206:
+                    f.seek(start)  # 가운데는 비워 둔다(sparse) → 오프셋이 원본과 같아 xref가 맞는다
+                    self._copy(r, f, h, total - start)
+                    if start > head:
+                        metrics.count("pdf_partial")
+        return h.hexdigest()
+
+    @staticmethod
+    def _copy(r, f, h, limit: int) -> int:
+        size = 0
+        for chunk in r.iter_content(CHUNK):
+            if not chunk:
+                break
+            chunk = chunk[:limit - size]
+            f.write(chunk)
+            h.update(chunk)
+            size += len(chunk)
+            if size >= limit:
+                break
+        return size
+
+    def _fail(self, url: str, err: BaseException) -> None:
+        if self.store:
+            self.store.fail(url, err)
+
+    def _extractor(self):
+        if self.procs <= 1:
+            return ThreadPoolExecutor(max_workers=1)
+        # 다운로드 스레드가 도는 중에 fork하지 않도록 forkserver(없으면 spawn)
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=self.procs, mp_context=ctx)
+
+    def run(self, jobs: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Optional[str], Optional[BaseException]]]:
+        """(키, PDF URL) → (키, 텍스트 또는 None, 예외 또는 None)를 끝나는 순서대로"""
+        pending: Dict[Future, Tuple[str, str, float]] = {}  # future → (키, 단계, 기한)
+        urls: Dict[str, str] = {}
+        shas: Dict[str, str] = {}
+        files: Dict[str, str] = {}
+        self.spool = tempfile.mkdtemp(prefix="pdf-", dir=PDF_SPOOL_DIR)
+        dl, ex = ThreadPoolExecutor(max_workers=self.workers), self._extractor()
+        stuck = False  # 기한을 넘긴 추출이 아직 돌고 있으면 종료 시 프로세스를 끊는다
+        try:
+            for key, url in jobs:
+                due = time.monotonic() + self.deadline
+                pending[dl.submit(self.download, url, due)] = (key, "fetch", due)
+                urls[key] = url
+            while pending:
+                nearest = min(due for _, _, due in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, nearest - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for f in done:
+                    key, stage, due = pending.pop(f)
+                    err = f.exception()
+                    if stage == "extract" or err is not None:
+                        _unlink(files.pop(key, None))
+                    if err is not None:
+                        self._fail(urls[key], err)
+                        yield key, None, err
+                    elif stage == "fetch":
+                        files[key], shas[key] = f.result()
+                        text = self.store.by_hash(urls[key], shas[key]) if self.store else None
+                        if text is not None:
+                            _unlink(files.pop(key))
+                            metrics.count("pdf_same_content")
+                            yield key, text, None
+                            continue
+                        try:
+                            pending[ex.submit(extract_text, files[key], self.max_pages, self.stop_section,
+                                              self.tier)] = (key, "extract", due)
+                        except BrokenExecutor as e:  # 추출 프로세스가 죽은 경우: 남은 문서는 실패로
+                            yield key, None, e
+                    else:
+                        text, seconds, used = f.result()
+                        metrics.observe("pdf_extract", seconds)
+                        metrics.count(f"pdf_tier_{used.replace('+', '_')}")
+                        if self.store:
+                            self.store.put(urls[key], shas[key], text)
+                        yield key, text, None
+                now = time.monotonic()
+                for f, (key, stage, due) in list(pending.items()):
+                    if now >= due:
+                        del pending[f]
+                        err = TimeoutError(f"{stage} exceeded {self.deadline:g}s")
+                        if stage == "extract":  # 추출이 기한을 넘기는 PDF는 다음 실행에서 바로 재시도하지 않음
+                            self._fail(urls[key], err)
+                            stuck = stuck or not f.cancel()
+                        else:
+                            f.cancel()
+                        yield key, None, err
+        finally:
+            # 기한을 넘긴 다운로드는 요청 타임아웃까지 백그라운드에서 끝나게 두고 기다리지 않는다
+            dl.shutdown(wait=False, cancel_futures=True)
+            if stuck and isinstance(ex, ProcessPoolExecutor):
+                for proc in list((getattr(ex, "_processes", None) or {}).values()):
+                    proc.terminate()
+            ex.shutdown(wait=not stuck, cancel_futures=True)
+            self.session.close()
+            shutil.rmtree(self.spool, ignore_errors=True)  # 아직 받는 중인 파일도 함께(열린 핸들은 그대로 끝난다)
+            self.spool = None
+
+def _range_total(r) -> Optional[int]:
+    """'Content-Range: bytes 0-99/12345' → 12345"""
+    m = re.search(r"/(\d+)\s*$", r.headers.get("Content-Range", ""))
+    return int(m.group(1)) if m else None
+
+
+def _unlink(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def pdf_texts(items: List[Tuple[Dict, str]], headers: Optional[Dict] = None,
+              pipeline: Optional[PDFPipeline] = None) -> Iterator[Tuple[Dict, str]]:
+    """
+    (work, PDF URL) 목록 → (work, 본문)을 끝나는 순서대로. 실패/기한 초과/재시도 대기는 빈 문자열(호출 측이 초록으로 대체).
+    카탈로그나 본문 캐시에 있는 본문은 바로 반환하고, 새로 얻은 본문은 카탈로그에 저장.
+    """
+    store = pipeline.store if pipeline else pdf_text_cache.shared()
+    jobs, by_key = [], {}
+    for i, (w, url) in enumerate(items):
+        text = catalog.lookup_pdf_text(w)
+        if text is None and store is not None:
+            if store.blocked(url):
+                metrics.count("pdf_retry_later")
+                yield w, ""
+                continue
+            text = store.by_url(url)
+            if text is not None:
+                metrics.count("pdf_text_cached")
+                catalog.save_pdf_text(w, text)
+        if text is not None:
+            yield w, text
+            continue
+        by_key[str(i)] = w
+        jobs.append((str(i), url))
+    if not jobs:
+        return
+    pipe = pipeline or PDFPipeline(headers, store=store)
+    for key, text, err in pipe.run(jobs):
+        w = by_key[key]
+        if err is not None:
+            metrics.count("pdf_failed")
+            yield w, ""
+            continue
+        catalog.save_pdf_text(w, text)
+        yield w, text
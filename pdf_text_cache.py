@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+추출한 PDF 본문 디스크 캐시 (build_site + fetch_and_link 공용, pdf_pipeline에서 사용)
+
+- 본문은 PDF 바이트의 sha256으로 저장(zlib 압축 .cache/pdf_text/<ab>/<sha>.z), 메타데이터는 SQLite 인덱스
+- URL → 마지막으로 받은 내용 해시. URL_TTL 안이면 다운로드도 추출도 없이 본문 반환,
+  지나면 다시 받되 내용 해시가 같으면 추출은 건너뛴다(다른 URL의 같은 PDF도 한 번만 추출)
+- 다운로드/추출 실패는 URL별로 기록하고 retry_after까지 다시 시도하지 않음(실패할수록 2배, 최대 7일)
+- 전체 용량(압축 후) 상한 초과 시 최근 사용이 가장 오래된 본문부터 제거(LRU)
+
+옵션(환경변수):
+  PDF_TEXT_CACHE=0                   캐시 끄기
+  PDF_TEXT_CACHE_DIR=.cache/pdf_text
+  PDF_TEXT_CACHE_MAX_MB=256          용량 상한(압축 후)
+  PDF_TEXT_URL_TTL=2592000           URL → 내용 해시를 믿는 기간(초, 기본 HTTP_CACHE_PDF_TTL)
+  PDF_RETRY_AFTER=21600              첫 실패 후 재시도까지(초)
+"""
+import os, time, zlib, sqlite3, threading
+from pathlib import Path
+from typing import Optional
+
+CACHE_DIR = Path(os.getenv("PDF_TEXT_CACHE_DIR", ".cache/pdf_text"))
+MAX_BYTES = int(float(os.getenv("PDF_TEXT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+URL_TTL = int(os.getenv("PDF_TEXT_URL_TTL", os.getenv("HTTP_CACHE_PDF_TTL", str(30 * 86400))))
+RETRY_AFTER = int(os.getenv("PDF_RETRY_AFTER", str(6 * 3600)))
+RETRY_MAX = 7 * 86400
+
+
+class PDFTextCache:
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_BYTES, url_ttl: int = URL_TTL,
+                 retry_after: int = RETRY_AFTER):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.url_ttl = url_ttl
+        self.retry_after = retry_after
+        self.stats = {"url_hits": 0, "hash_hits": 0, "misses": 0, "skipped": 0, "failed": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS texts (sha TEXT PRIMARY KEY, size INTEGER, raw_size INTEGER,
+                                              stored_at REAL, accessed_at REAL);
+            CREATE INDEX IF NOT EXISTS texts_lru ON texts(accessed_at);
+            CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha TEXT, checked_at REAL);
+            CREATE TABLE IF NOT EXISTS failures (url TEXT PRIMARY KEY, error TEXT, attempts INTEGER,
+                                                 failed_at REAL, retry_after REAL);
+        """)
+        self._db.commit()
+
+    # ---------- 내부 ----------
+    def _path(self, sha: str) -> Path:
+        return self.root / sha[:2] / f"{sha}.z"
+
+    def _read(self, sha: str) -> Optional[str]:
+        try:
+            text = zlib.decompress(self._path(sha).read_bytes()).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+        with self._lock:
+            self._db.execute("UPDATE texts SET accessed_at=? WHERE sha=?", (time.time(), sha))
+            self._db.commit()
+        return text
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            for sha, size in self._db.execute("SELECT sha, size FROM texts ORDER BY accessed_at").fetchall():
+                if total <= target:
+                    break
+                try:
+                    self._path(sha).unlink()
+                except OSError:
+                    pass
+                self._db.execute("DELETE FROM texts WHERE sha=?", (sha,))
+                total -= size
+                self.stats["evicted"] += 1
+            self._db.commit()
+
+    # ---------- 공개 ----------
+    def by_url(self, url: str) -> Optional[str]:
+        """URL_TTL 안에 이 URL에서 받아 추출한 본문 (없으면 None → 다운로드 필요)"""
+        with self._lock:
+            row = self._db.execute("SELECT sha, checked_at FROM urls WHERE url=?", (url,)).fetchone()
+        if not row or time.time() - row[1] >= self.url_ttl:
+            return None
+        text = self._read(row[0])
+        if text is not None:
+            self.stats["url_hits"] += 1
+        return text
+
+    def by_hash(self, url: str, sha: str) -> Optional[str]:
+        """받은 PDF의 내용 해시로 조회. 적중하면 URL → 해시도 갱신"""
+        text = self._read(sha)
+        if text is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hash_hits"] += 1
+        self._link(url, sha)
+        return text
+
+    def put(self, url: str, sha: str, text: str) -> None:
+        body = zlib.compress(text.encode("utf-8"), 6)
+        p = self._path(sha)
+        p.parent.mkdir(exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, p)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO texts VALUES (?,?,?,?,?)", (sha, len(body), len(text), now, now))
+            self._db.commit()
+        self._link(url, sha)
+        self._evict()
+
+    def _link(self, url: str, sha: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?,?,?)", (url, sha, time.time()))
+            self._db.execute("DELETE FROM failures WHERE url=?", (url,))
+            self._db.commit()
+
+    def blocked(self, url: str) -> bool:
+        """최근 실패해 retry_after 전이면 True (이번 실행에서는 시도하지 않음)"""
+        with self._lock:
+            row = self._db.execute("SELECT retry_after FROM failures WHERE url=?", (url,)).fetchone()
+        if row and time.time() < row[0]:
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def fail(self, url: str, err: BaseException) -> None:
+        """실패 기록. 연속 실패 n번째면 retry_after * 2^(n-1) 뒤에 재시도(최대 7일)"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM failures WHERE url=?", (url,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            wait = min(self.retry_after * 2 ** (attempts - 1), RETRY_MAX)
+            self._db.execute("INSERT OR REPLACE INTO failures VALUES (?,?,?,?,?)",
+                             (url, f"{type(err).__name__}: {err}"[:500], attempts, now, now + wait))
+            self._db.commit()
+        self.stats["failed"] += 1
+
+    def report(self) -> str:
+        s = self.stats
+        return (f"pdf text cache: url {s['url_hits']}, same content {s['hash_hits']}, extracted {s['misses']},"
+                f" failed {s['failed']}, retry later {s['skipped']}, evicted {s['evicted']}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_SHARED: Optional[PDFTextCache] = None
+
+
+def shared() -> Optional[PDFTextCache]:
+    """프로세스 공용 캐시 (PDF_TEXT_CACHE=0이면 None)"""
+    global _SHARED
+    if os.getenv("PDF_TEXT_CACHE", "1") == "0":
+        return None
+    if _SHARED is None:
+        _SHARED = PDFTextCache()
+    return _SHARED
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+쿼리 세트: 여러 검색어/개념 필터를 동시에 수집해 work ID로 병합 (크롤러 + scripts 공용)
+
+- 쿼리마다 자기 limit, 결과는 work ID로 합치고 work별로 일치한 쿼리 이름을 기록
+- 목록 수집은 한 OAClient 위에서 쿼리들을 asyncio.gather로 동시에 (속도 제한/동시성은 oa_client 공유)
+- 스트리밍은 쿼리별 cursor 스트림을 동시에 열어 도착하는 대로 번갈아 꺼낸다(쿼리별 cursor로 재개)
+
+QUERY_SET_FILE=queries.json 형식:
+  [{"name": "어깨", "search": "serratus anterior compensation", "concepts": ["C2778023681"], "limit": 40},
+   {"name": "고관절", "search": "gluteus medius weakness", "limit": 80},
+   {"name": "족부", "filter": "concepts.id:C2776960227", "limit": 40}]
+  - name    : 허브 섹션 이름 (생략 시 search)
+  - search / concepts(OpenAlex concept ID, 하나라도 일치) / filter(OpenAlex filter 원문) 중 하나 이상
+  - limit   : 쿼리별 최대 건수 (생략 시 기본 LIMIT)
+"""
+import json, asyncio
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from crawl_state import work_key
+from oa_client import OAClient, search_works, stream_pages
+
+
+@dataclass
+class QuerySpec:
+    name: str
+    search: str = ""
+    concepts: List[str] = field(default_factory=list)
+    filter: str = ""
+    limit: int = 0
+
+    def params(self, since: Optional[int], updated_since: Optional[str] = None) -> Dict:
+        params = {"search": self.search} if self.search else {}
+        params["sort"] = "cited_by_count:desc"
+        if since:
+            params["from_publication_date"] = f"{since}-01-01"
+        filters = [self.filter] if self.filter else []
+        if self.concepts:
+            filters.append("concepts.id:" + "|".join(self.concepts))
+        if updated_since:
+            filters.append(f"from_updated_date:{updated_since}")
+        if filters:
+            params["filter"] = ",".join(filters)
+        return params
+
+
+def load(path: Path, default_limit: int) -> List[QuerySpec]:
+    """QUERY_SET_FILE → QuerySpec 목록 (이름 중복/빈 쿼리는 ValueError)"""
+    specs = []
+    for item in json.loads(Path(path).read_text(encoding="utf-8")):
+        spec = QuerySpec(name=item.get("name") or item.get("search") or "", search=item.get("search", ""),
+                         concepts=list(item.get("concepts", [])), filter=item.get("filter", ""),
+                         limit=int(item.get("limit") or default_limit))
+        if not (spec.search or spec.concepts or spec.filter):
+            raise ValueError(f"query {spec.name!r} has no search, concepts or filter")
+        specs.append(spec)
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate query names in {path}")
+    return specs
+
+
+def signature(specs: List[QuerySpec]) -> List[Dict]:
+    """스트리밍 체크포인트 서명용"""
+    return [asdict(s) for s in specs]
+
+# ------------------ 병합 ------------------
+def merge(specs: List[QuerySpec], chunks: List[List[Dict]]) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    쿼리별 결과를 work ID로 병합(인용수 내림차순, 같으면 먼저 나온 순)하고
+    work 키 → 일치한 쿼리 이름 목록(쿼리 순서) 반환
+    """
+    tags: Dict[str, List[str]] = {}
+    first: Dict[str, Dict] = {}
+    order: List[str] = []
+    for spec, chunk in zip(specs, chunks):
+        for w in chunk:
+            key = work_key(w)
+            if key not in first:
+                first[key] = w
+                order.append(key)
+                tags[key] = []
+            if spec.name not in tags[key]:
+                tags[key].append(spec.name)
+    works = [first[k] for k in order]
+    if len(chunks) > 1:
+        works.sort(key=lambda w: -int(w.get("cited_by_count") or 0))
+    return works, tags
+
+# ------------------ 수집 ------------------
+async def search_all(client: OAClient, specs: List[QuerySpec], since: Optional[int],
+                     updated_since: Optional[str] = None, years: Optional[List[int]] = None) -> List[List[Dict]]:
+    """쿼리들을 동시에 수집 (쿼리 순서대로 결과 반환)"""
+    return await asyncio.gather(*[
+        search_works(client, s.params(since, updated_since), s.limit, years) for s in specs
+    ])
+
+
+def search_merged(specs: List[QuerySpec], since: Optional[int] = None, updated_since: Optional[str] = None,
+                  years: Optional[List[int]] = None, headers: Optional[Dict] = None,
+                  cache=None) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """동시 수집 + 병합 (동기 호출용)"""
+    with OAClient(headers=headers, cache=cache) as client:
+        chunks = client.run(search_all(client, specs, since, updated_since, years))
+    return merge(specs, chunks)
+
+
+def stream_all(specs: List[QuerySpec], since: Optional[int], cursors: Dict[str, Optional[str]],
+               done: Dict[str, int], updated_since: Optional[str] = None, headers: Optional[Dict] = None,
+               cache=None) -> Iterator[Tuple[QuerySpec, List[Dict], Optional[str]]]:
+    """
+    쿼리별 cursor 스트림을 모두 열고 (쿼리, 페이지, 다음 cursor)를 번갈아 반환.
+    각 스트림은 백그라운드에서 미리 받아 두므로 수집은 쿼리 수만큼 동시에 진행된다.
+    cursors[name]이 None이면 이미 끝난 쿼리, 없으면 처음부터.
+    """
+    streams = []
+    for s in specs:
+        cursor = cursors.get(s.name, "*")
+        left = s.limit - done.get(s.name, 0)
+        if cursor and left > 0:
+            streams.append((s, stream_pages(s.params(since, updated_since), left, cursor,
+                                            headers=headers, cache=cache)))
+    try:
+        while streams:
+            for item in list(streams):
+                spec, it = item
+                page = next(it, None)
+                if page is None:
+                    streams.remove(item)
+                    continue
+                yield (spec, *page)
+    finally:
+        for _, it in streams:
+            it.close()
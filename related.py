@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+관련 논문 top-k 엔진 (summarize_cluster + fetch_and_link 공용)
+
+- N×N 유사도 행렬을 만들지 않고 행 블록 단위로 X[블록] · Xᵀ → 블록별 argpartition으로 top-k만 남긴다
+  (블록 크기는 RELATED_BLOCK_MB에 맞춰 정하므로 메모리는 문서 수에 대해 선형)
+- 동점은 기존 정렬과 같게: 점수 내림차순, 같으면 뒤 문서 먼저
+- RELATED_MODE=lsa: TruncatedSVD로 차원을 줄인 벡터에서 찾는다(근사, 대형 코퍼스용)
+- 결과는 코퍼스 서명(문서 ID + 본문 해시 + k/모드 + 벡터화 설정)과 함께 RELATED_DIR/<이름>.npz에 저장 → 문서가 그대로면 다음 실행은 계산 없이 재사용
+
+옵션(환경변수):
+  RELATED_MODE=exact               exact | lsa
+  RELATED_DIM=128                  lsa 차원
+  RELATED_BLOCK_MB=64              블록당 유사도 행렬 메모리 상한
+  RELATED_DIR=.cache/related
+"""
+import os, hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+RELATED_MODE = os.getenv("RELATED_MODE", "exact")
+RELATED_DIM = int(os.getenv("RELATED_DIM", "128"))
+RELATED_BLOCK_MB = float(os.getenv("RELATED_BLOCK_MB", "64"))
+RELATED_DIR = Path(os.getenv("RELATED_DIR", ".cache/related"))
+
+
+def corpus_signature(ids: List[str], texts: List[str], k: int, mode: str, params: str = "") -> str:
+    h = hashlib.sha1(f"{mode}:{k}:{RELATED_DIM if mode == 'lsa' else 0}:{params}".encode())
+    for i, t in zip(ids, texts):
+        h.update(i.encode("utf-8", "ignore") + b"\0")
+        h.update(hashlib.sha1(t.encode("utf-8", "ignore")).digest())
+    return h.hexdigest()
+
+
+def _block_rows(n: int, block_mb: float) -> int:
+    return max(1, min(n, int(block_mb * 2 ** 20 // (8 * max(n, 1)))))
+
+
+def top_k(X, k: int = 5, block_mb: float = RELATED_BLOCK_MB) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    행이 L2 정규화된 X(희소 또는 밀집)에서 행마다 자신을 뺀 코사인 유사도 top-k.
+    반환: (이웃 인덱스 n×k, 점수 n×k). 문서가 k+1개 미만이면 k가 줄어든다.
+    """
+    n = X.shape[0]
+    k = max(0, min(k, n - 1))
+    nbrs = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return nbrs, scores
+    XT = X.T.tocsr() if hasattr(X, "tocsr") else X.T
+    step = _block_rows(n, block_mb)
+    for a in range(0, n, step):
+        b = min(n, a + step)
+        S = X[a:b] @ XT
+        S = S.toarray() if hasattr(S, "toarray") else np.asarray(S)
+        S[np.arange(b - a), np.arange(a, b)] = -np.inf  # 자기 자신 제외
+        part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        kth = S[np.arange(b - a)[:, None], part].min(axis=1)
+        for r in range(b - a):
+            row = S[r]
+            cand = np.flatnonzero(row >= kth[r])  # k번째 점수와 동점인 후보까지 포함해 기존 순서대로 자른다
+            order = cand[np.lexsort((-cand, -row[cand]))][:k]
+            nbrs[a + r] = order
+            scores[a + r] = row[order]
+    return nbrs, scores
+
+
+def lsa_vectors(X, dim: int = RELATED_DIM) -> np.ndarray:
+    """TruncatedSVD로 줄이고 다시 L2 정규화한 밀집 벡터 (n×dim)"""
+    from sklearn.decomposition import TruncatedSVD
+    dim = max(1, min(dim, X.shape[1] - 1, X.shape[0] - 1))
+    Z = TruncatedSVD(n_components=dim, random_state=42).fit_transform(X).astype(np.float32)
+    norms = np.linalg.norm(Z, axis=1, keepdims=True)
+    return Z / np.where(norms == 0, 1, norms)
+
+
+def neighbours(X, ids: List[str], texts: List[str], k: int = 5, mode: str = RELATED_MODE,
+               name: Optional[str] = "default", params: str = "") -> Dict[str, List[str]]:
+    """
+    문서 ID → 관련 문서 ID 목록(유사도 내림차순). 같은 name으로 저장된 결과가 지금 코퍼스와 같으면 재사용
+    (name=None이면 저장하지 않음). texts는 X를 만든 본문, params는 X를 만든 벡터화 설정(TfidfModel.params) — 둘 다 서명용.
+    """
+    if mode not in ("exact", "lsa"):
+        raise ValueError(f"RELATED_MODE must be exact or lsa: {mode!r}")
+    sig = corpus_signature(ids, texts, k, mode, params)
+    index_path = RELATED_DIR / f"{name}.npz" if name else None
+    nbrs = None
+    if index_path is not None:
+        try:
+            with np.load(index_path, allow_pickle=False) as z:
+                if str(z["sig"]) == sig:
+                    nbrs = z["nbrs"]
+        except (OSError, KeyError, ValueError):
+            pass
+    if nbrs is None:
+        M = lsa_vectors(X) if mode == "lsa" and X.shape[0] > 2 else X
+        nbrs, scores = top_k(M, k)
+        if index_path is not None:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = index_path.with_name(index_path.stem + ".tmp.npz")
+            np.savez_compressed(tmp, sig=np.array(sig), nbrs=nbrs, scores=scores)
+            os.replace(tmp, index_path)
+    return {ids[i]: [ids[j] for j in row] for i, row in enumerate(nbrs)}
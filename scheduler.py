@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+프로세스 상주 스케줄러 (크롤 + PDF 보강 + 사이트 빌드 + 클러스터링)
+
+- 작업마다 주기 + 지터(주기의 일정 비율 이내 무작위 지연, 앞당기지는 않음)
+- 작업별 잠금 파일(.cache/locks/<작업>.lock)로 다른 프로세스와의 중복 실행 방지
+- 실행이 주기보다 오래 걸리거나 절전 등으로 놓친 회차는 몰아서 돌리지 않고 건너뜀
+- 실패 시 지수 백오프(최대 주기까지, 주기가 SCHED_BACKOFF_BASE보다 짧으면 그 값까지), 성공하면 원래 주기로 복귀
+- 주기는 0보다 커야 하고, 크롤 주기는 SCHED_CRAWL_MIN(초) 아래로 내려가지 않는다(OpenAlex 과호출 방지)
+- SIGINT/SIGTERM: 진행 중인 작업은 끝내고 종료 (두 번째 신호는 즉시 중단)
+- 한 프로세스에 상주하므로 매 회차 인터프리터/sklearn/pdfminer import 비용이 없다
+
+실행:
+  python scheduler.py
+옵션(환경변수):
+  SCHED_JOBS=crawl=6h,enrich=1m,site=1m,cluster=10m   작업=주기(s/m/h/d) 목록, 주기 생략 시 기본값
+  SCHED_JITTER=0.1            주기 대비 최대 지터 비율
+  SCHED_BACKOFF_BASE=30       첫 재시도 지연(초), 실패할 때마다 2배
+  SCHED_CRAWL_MIN=900         크롤 주기 하한(초, AUTO_LOOP_HOURS와 SCHED_JOBS의 crawl 모두)
+  SCHED_LOCK_DIR=.cache/locks
+"""
+import os, sys, time, random, signal, threading, importlib, traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl  # 유닉스: flock (프로세스가 죽으면 잠금 자동 해제)
+except ImportError:
+    fcntl = None
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import metrics
+
+JITTER = float(os.getenv("SCHED_JITTER", "0.1"))
+BACKOFF_BASE = float(os.getenv("SCHED_BACKOFF_BASE", "30"))
+CRAWL_MIN = float(os.getenv("SCHED_CRAWL_MIN", "900"))
+LOCK_DIR = Path(os.getenv("SCHED_LOCK_DIR", ".cache/locks"))
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(s: str) -> float:
+    """'90' / '90s' / '5m' / '1.5h' / '1d' → 초 (0 이하면 ValueError)"""
+    s = s.strip().lower()
+    secs = float(s[:-1]) * UNITS[s[-1]] if s and s[-1] in UNITS else float(s)
+    if not 0 < secs < float("inf"):
+        raise ValueError(f"interval must be positive: {s!r}")
+    return secs
+
+
+def crawl_interval(secs: float) -> float:
+    """크롤 주기에 하한(CRAWL_MIN) 적용"""
+    if secs < CRAWL_MIN:
+        print(f"WARNING: Crawl interval {secs:g}s is below SCHED_CRAWL_MIN, using {CRAWL_MIN:g}s")
+        return CRAWL_MIN
+    return secs
+
+# ------------------ 잠금 ------------------
+class JobLock:
+    """작업별 잠금 파일. 이미 다른 프로세스가 잡고 있으면 acquire()가 False"""
+
+    def __init__(self, name: str, lock_dir: Path = LOCK_DIR):
+        self.path = Path(lock_dir) / f"{name}.lock"
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd = fd
+            return True
+        # flock이 없는 플랫폼: 배타 생성 + 죽은 프로세스의 잠금은 회수
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            if self._stale():
+                self.path.unlink(missing_ok=True)
+                return self.acquire()
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def _stale(self) -> bool:
+        try:
+            pid = int(self.path.read_text().strip() or 0)
+            os.kill(pid, 0)
+            return False
+        except (OSError, ValueError):
+            return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            self.path.unlink(missing_ok=True)
+        self._fd = None
+
+# ------------------ 작업 ------------------
+@dataclass
+class Job:
+    name: str
+    fn: Callable[[], None]
+    interval: float
+    jitter: float = JITTER
+    next_run: float = 0.0          # time.time() 기준 (절전 중 흐른 시간도 반영)
+    slot: float = 0.0              # 지터를 뺀 예정 시각(놓친 회차 계산 기준)
+    failures: int = 0
+    stats: Dict[str, int] = field(default_factory=lambda: {"runs": 0, "failed": 0, "skipped": 0, "locked": 0})
+
+    def __post_init__(self) -> None:
+        if not self.interval > 0:
+            raise ValueError(f"{self.name}: interval must be positive: {self.interval!r}")
+
+    def schedule_after_success(self, now: float) -> None:
+        self.failures = 0
+        slot = self.slot + self.interval
+        if slot <= now:  # 놓친 회차는 건너뛰고 다음 미래 슬롯으로
+            missed = int((now - slot) // self.interval) + 1
+            self.stats["skipped"] += missed
+            slot += missed * self.interval
+        self.slot = slot
+        self.next_run = slot + random.uniform(0, self.jitter * self.interval)
+
+    def schedule_after_failure(self, now: float) -> float:
+        self.failures += 1
+        delay = min(max(self.interval, BACKOFF_BASE), BACKOFF_BASE * 2 ** (self.failures - 1))
+        self.slot = now + delay
+        self.next_run = self.slot
+        return delay
+
+
+class Scheduler:
+    def __init__(self, jobs: List[Job], lock_dir: Path = LOCK_DIR):
+        self.jobs = jobs
+        self.lock_dir = lock_dir
+        self.stop = threading.Event()
+
+    def _on_signal(self, signum, frame) -> None:
+        if self.stop.is_set():
+            raise KeyboardInterrupt
+        print(f"INFO: Signal {signum} received, stopping after the current job")
+        self.stop.set()
+
+    def install_signal_handlers(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(sig, self._on_signal)
+            except (ValueError, OSError):  # 메인 스레드가 아니거나 지원하지 않는 신호
+                pass
+
+    def run_job(self, job: Job) -> None:
+        lock = JobLock(job.name, self.lock_dir)
+        now = time.time()
+        if not lock.acquire():
+            # 다른 프로세스가 실행 중: 이번 회차는 건너뜀
+            job.stats["locked"] += 1
+            print(f"INFO: [{job.name}] already running elsewhere, skipped")
+            job.schedule_after_success(now)
+            return
+        try:
+            t0 = time.time()
+            job.fn()
+            job.stats["runs"] += 1
+            job.schedule_after_success(time.time())
+            print(f"INFO: [{job.name}] done in {time.time() - t0:.1f}s, next in {job.next_run - time.time():.0f}s")
+        except Exception as e:
+            job.stats["failed"] += 1
+            delay = job.schedule_after_failure(time.time())
+            traceback.print_exc()
+            print(f"WARNING: [{job.name}] failed ({e}), retry #{job.failures} in {delay:.0f}s")
+        finally:
+            lock.release()
+
+    def run(self, run_now: bool = True) -> None:
+        """stop이 설정될 때까지 가장 이른 작업부터 하나씩 실행"""
+        now = time.time()
+        for job in self.jobs:
+            job.slot = now if run_now else now + job.interval
+            job.next_run = job.slot
+        while not self.stop.is_set():
+            job = min(self.jobs, key=lambda j: j.next_run)
+            wait = job.next_run - time.time()
+            if wait > 0:
+                if self.stop.wait(wait):
+                    break
+                continue  # 대기 중 시계가 바뀌었을 수 있으니 다시 고른다
+            self.run_job(job)
+        for job in self.jobs:
+            print(f"INFO: [{job.name}] {job.stats}")
+
+# ------------------ 작업 목록 ------------------
+def _crawl() -> None:
+    import compensation_crawler_bot
+    compensation_crawler_bot.run_once()
+
+
+def _script(module: str, job: str) -> Callable[[], None]:
+    def fn() -> None:
+        mod = importlib.import_module(module)  # 첫 회차에만 import, 이후는 상주 모듈 재사용
+        log_dir = getattr(mod, "VAULT", None)
+        metrics.run(job, mod.main, log_dir=log_dir / "logs" if log_dir is not None else None)
+    return fn
+
+
+def default_crawl_interval() -> float:
+    """AUTO_LOOP_HOURS(소수 시간 가능, 기본 6) → 초, 하한 적용"""
+    hours = os.getenv("AUTO_LOOP_HOURS") or "6"
+    try:
+        return crawl_interval(parse_interval(hours + "h"))
+    except ValueError:
+        raise ValueError(f"AUTO_LOOP_HOURS must be a positive number of hours: {hours!r}") from None
+
+
+JOBS: Dict[str, Callable[[], Job]] = {
+    "crawl": lambda: Job("crawl", _crawl, default_crawl_interval()),
+    "enrich": lambda: Job("enrich", _script("fetch_and_link", "fetch_and_link"), 60),
+    "site": lambda: Job("site", _script("build_site", "build_site"), 60),
+    "cluster": lambda: Job("cluster", _script("summarize_cluster", "summarize_cluster"), 600),
+}
+
+
+def jobs_from_spec(spec: str) -> List[Job]:
+    """'crawl=6h,site=1m,cluster' → Job 목록"""
+    jobs = []
+    for part in spec.split(","):
+        name, _, every = part.strip().partition("=")
+        if not name:
+            continue
+        if name not in JOBS:
+            raise ValueError(f"unknown job {name!r} (known: {', '.join(JOBS)})")
+        job = JOBS[name]()
+        if every:
+            job.interval = parse_interval(every)
+            if name == "crawl":
+                job.interval = crawl_interval(job.interval)
+        jobs.append(job)
+    return jobs
+
+
+def main() -> None:
+    sched = Scheduler(jobs_from_spec(os.getenv("SCHED_JOBS", "crawl,enrich,site,cluster")))
+    sched.install_signal_handlers()
+    print("INFO: Scheduler started:", ", ".join(f"{j.name}/{j.interval:g}s" for j in sched.jobs))
+    sched.run()
+
+
+if __name__ == "__main__":
+    main()
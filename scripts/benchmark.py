@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+파이프라인 단계별 합성 코퍼스 벤치마크
+
+- 시드 고정 생성기로 OpenAlex 형태의 work(역색인 초록, 저자, 개념, 근육/트리거 삽입 비율 조절)를 100 ~ 100k건 생성
+- 단계별 처리량(docs/s), 지연 백분위(p50/p95/p99, 문서 단위 단계만), 최대 RSS를 측정
+- 단계마다 fork한 자식 프로세스에서 돌려 RSS가 단계별로 분리되도록
+- 결과는 JSON으로 저장하고, 기준선(baseline)과 비교해 회귀가 있으면 종료 코드 1
+
+실행:
+  python scripts/benchmark.py
+옵션(환경변수):
+  BENCH_SIZES=100,1000,10000          문서 수 목록 (100000까지)
+  BENCH_STAGES=trust_score,mine_rules  일부 단계만 (기본 전체)
+  BENCH_SEED=42                       생성기 시드
+  BENCH_MUSCLE_RATE=0.3               문장당 근육명 삽입 확률
+  BENCH_TRIGGER_RATE=0.2              문장당 약화/과활성 트리거 삽입 확률
+  BENCH_QUADRATIC_MAX=20000           O(n²) 시간 단계(related_map, 블록 단위 전수 비교) 상한, 초과 크기는 건너뜀
+  BENCH_PDF_DIR=                      PDF 추출 단계(pdf_fast/pdf_full/pdf_auto)에 쓸 PDF 폴더 (기본: 합성 PDF 생성)
+  BENCH_PDF_MAX=50                    PDF 추출 단계 문서 수 상한
+  BENCH_PDF_PAGES=6                   합성 PDF 쪽수
+  BENCH_OUT=.cache/bench/latest.json  결과 저장 위치
+  BENCH_BASELINE=.cache/bench/baseline.json
+  BENCH_SAVE_BASELINE=1               이번 결과를 기준선으로 저장
+  BENCH_TOLERANCE=0.2                 처리량 하락/메모리 증가 허용 비율
+"""
+import os, sys, json, time, random, shutil, tempfile, platform, multiprocessing
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource  # 유닉스 전용
+except ImportError:
+    resource = None
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))  # 저장소 루트의 공용 모듈
+sys.path.insert(0, str(REPO / "scripts"))
+
+SIZES = [int(x) for x in os.getenv("BENCH_SIZES", "100,1000,10000").split(",") if x.strip()]
+STAGE_FILTER = [s.strip() for s in os.getenv("BENCH_STAGES", "").split(",") if s.strip()]
+SEED = int(os.getenv("BENCH_SEED", "42"))
+MUSCLE_RATE = float(os.getenv("BENCH_MUSCLE_RATE", "0.3"))
+TRIGGER_RATE = float(os.getenv("BENCH_TRIGGER_RATE", "0.2"))
+QUADRATIC_MAX = int(os.getenv("BENCH_QUADRATIC_MAX", "20000"))
+PDF_DIR = os.getenv("BENCH_PDF_DIR")
+PDF_MAX = int(os.getenv("BENCH_PDF_MAX", "50"))
+PDF_PAGES = int(os.getenv("BENCH_PDF_PAGES", "6"))
+OUT = Path(os.getenv("BENCH_OUT", ".cache/bench/latest.json")).resolve()
+BASELINE = Path(os.getenv("BENCH_BASELINE", ".cache/bench/baseline.json")).resolve()
+SAVE_BASELINE = os.getenv("BENCH_SAVE_BASELINE", "0") == "1"
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.2"))
+
+# ------------------ 합성 코퍼스 ------------------
+FILLER = ("the of and in with during for patients subjects running gait task load control group trial "
+          "muscle activity electromyography knee hip ankle shoulder pelvis trunk landing squat "
+          "significant difference between healthy injured athletes pain function strength analysis "
+          "compared measured results showed associated increased decreased test phase stance").split()
+TITLE_HEADS = ["Effects of", "Association between", "Electromyographic analysis of", "A randomized trial of",
+               "A systematic review of", "A meta-analysis of", "Biomechanics of", "Compensation patterns in"]
+CONCEPTS = ["Biomechanics", "Physical therapy", "Electromyography", "Gait", "Rehabilitation",
+            "Running", "Shoulder", "Hip", "Ankle", "Physical medicine and rehabilitation"]
+VENUES = [("journal", 0.7), ("conference", 0.1), ("repository", 0.15), (None, 0.05)]
+
+
+def _weighted(rnd: random.Random, pairs):
+    x, acc = rnd.random(), 0.0
+    for v, p in pairs:
+        acc += p
+        if x < acc:
+            return v
+    return pairs[-1][0]
+
+
+def gen_works(n: int, seed: int = SEED, muscle_rate: float = MUSCLE_RATE,
+              trigger_rate: float = TRIGGER_RATE) -> List[Dict]:
+    """같은 시드면 같은 코퍼스. 근육명/트리거는 문장 단위로 주어진 확률로 삽입"""
+    from compensation_crawler_bot import MUSCLE_LEXICON, WEAK_TRIGGERS, STRONG_TRIGGERS
+    rnd = random.Random(seed)
+    this_year = datetime.now().year
+    works = []
+    for i in range(n):
+        muscle = rnd.choice(MUSCLE_LEXICON)
+        title = f"{rnd.choice(TITLE_HEADS)} {muscle} {' '.join(rnd.choices(FILLER, k=rnd.randint(3, 8)))}"
+        words: List[str] = []
+        for _ in range(rnd.randint(4, 12)):
+            sent = rnd.choices(FILLER, k=rnd.randint(8, 22))
+            if rnd.random() < muscle_rate:
+                sent.insert(rnd.randrange(len(sent)), rnd.choice(MUSCLE_LEXICON))
+            if rnd.random() < trigger_rate:
+                sent.insert(rnd.randrange(len(sent)), rnd.choice(WEAK_TRIGGERS + STRONG_TRIGGERS))
+            if rnd.random() < muscle_rate / 2:
+                sent.insert(rnd.randrange(len(sent)), rnd.choice(MUSCLE_LEXICON))
+            sent[-1] += "."
+            words += " ".join(sent).split()
+        inv: Dict[str, List[int]] = {}
+        for pos, word in enumerate(words):
+            inv.setdefault(word, []).append(pos)
+        venue = _weighted(rnd, VENUES)
+        year = rnd.randint(this_year - 25, this_year)
+        works.append({
+            "id": f"https://openalex.org/W{900000000 + i}",
+            "doi": f"https://doi.org/10.5555/bench.{seed}.{i}",
+            "display_name": title[0].upper() + title[1:],
+            "publication_year": year,
+            "updated_date": f"{year}-01-01T00:00:00",
+            "type": "preprint" if venue == "repository" else "article",
+            "cited_by_count": int(rnd.paretovariate(1.2)) - 1,
+            "host_venue": {"type": venue},
+            "primary_location": {"landing_page_url": f"https://example.org/w{i}",
+                                 "pdf_url": f"https://example.org/w{i}.pdf" if rnd.random() < 0.4 else None},
+            "authorships": [{"author": {"display_name": f"Author {rnd.randint(1, 5000)}"}}
+                            for _ in range(rnd.randint(1, 8))],
+            "concepts": [{"display_name": c} for c in rnd.sample(CONCEPTS, 3)],
+            "abstract_inverted_index": inv,
+        })
+    return works
+
+
+def _pdf_bytes(pages: List[List[str]]) -> bytes:
+    """줄 목록의 목록 → 최소 PDF (Helvetica, 쪽당 한 콘텐츠 스트림)"""
+    objs = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, lines in enumerate(pages):
+        pid, cid = 4 + 2 * i, 5 + 2 * i
+        kids.append(b"%d 0 R" % pid)
+        text = " ".join("(%s) Tj T*" % ln.replace("\\", "").replace("(", "").replace(")", "") for ln in lines)
+        ops = ("BT /F1 10 Tf 12 TL 50 760 Td " + text + " ET").encode("latin-1", "replace")
+        objs[cid] = b"<< /Length %d >>\nstream\n" % len(ops) + ops + b"\nendstream"
+        objs[pid] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R"
+                     b" /Resources << /Font << /F1 3 0 R >> >> >>" % cid)
+    objs[2] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(pages)
+    out, offs = bytearray(b"%PDF-1.4\n"), {}
+    for k in sorted(objs):
+        offs[k] = len(out)
+        out += b"%d 0 obj\n" % k + objs[k] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offs[k] for k in sorted(objs))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+def sample_pdfs(works: List[Dict], abstracts: Dict[str, str], tmp: str) -> List[str]:
+    """BENCH_PDF_DIR의 PDF, 없으면 초록 문장으로 채운 합성 PDF (최대 BENCH_PDF_MAX개)"""
+    if PDF_DIR:
+        return [str(p) for p in sorted(Path(PDF_DIR).glob("*.pdf"))[:PDF_MAX]]
+    out = Path(tmp) / "pdfs"
+    out.mkdir(exist_ok=True)
+    paths = []
+    for w in works[:PDF_MAX]:
+        words = (w["display_name"] + ". " + abstracts[w["id"]]).split()
+        lines = [" ".join(words[i:i + 14]) for i in range(0, len(words), 14)]
+        pages = [(lines * (1 + 55 // max(1, len(lines))))[:55] for _ in range(PDF_PAGES)]
+        p = out / f"{w['id'].rsplit('/', 1)[-1]}.pdf"
+        p.write_bytes(_pdf_bytes(pages))
+        paths.append(str(p))
+    return paths
+
+
+def paper_items(works: List[Dict]) -> List[Dict]:
+    """docs/papers/*.md를 읽은 것과 같은 형태의 항목 (summarize_cluster 입력)"""
+    import parsed_doc
+    items = []
+    for w in works:
+        body = "## 초록\n" + parsed_doc.reconstruct(w["abstract_inverted_index"]) + "\n\n## 메모\n- 자동 생성"
+        name = f"{w['id'].rsplit('/', 1)[-1]}.md"
+        items.append({"path": None, "id": name, "title": w["display_name"], "text": body,
+                      "doc": parsed_doc.ParsedDoc("docs/papers/" + name, "", body)})
+    return items
+
+# ------------------ 단계 정의 ------------------
+# 각 단계: (ctx) → 문서별 지연(초) 목록 또는 None(배치 단계). ctx는 부모에서 준비한 입력.
+
+def _per_doc(fn: Callable, seq) -> List[float]:
+    lat, clock = [], time.perf_counter
+    for x in seq:
+        t = clock()
+        fn(x)
+        lat.append(clock() - t)
+    return lat
+
+
+def st_trust_score(ctx):
+    import compensation_crawler_bot as c
+    return _per_doc(c.trust_score, ctx["works"])
+
+
+def st_trust_batch(ctx):
+    import compensation_crawler_bot as c
+    if c.np is None:
+        raise ImportError("numpy")
+    c.quality_filter(ctx["works"], top_k=max(1, len(ctx["works"]) // 10))
+
+
+def st_infer_compensations(ctx):
+    import compensation_crawler_bot as c
+    return _per_doc(lambda w: c.infer_compensations(w["display_name"], ctx["abstracts"][w["id"]],
+                                                    [x["display_name"] for x in w["concepts"]]), ctx["works"])
+
+
+def st_mine_rules(ctx):
+    import compensation_crawler_bot as c
+    c.mine_rules(ctx["works"])
+
+
+def st_dedup(ctx):
+    from dedup import DedupIndex
+    idx = DedupIndex()
+    return _per_doc(idx.claim, ctx["works"])
+
+
+def st_make_note(ctx):
+    import compensation_crawler_bot as c
+    out = Path(ctx["tmp"]) / "notes"
+    out.mkdir(exist_ok=True)
+    return _per_doc(lambda w: c.make_note(w, out), ctx["works"])
+
+
+def st_summarize(ctx):
+    import fetch_and_link as fl
+    return _per_doc(lambda w: fl.summarize(w["display_name"], ctx["abstracts"][w["id"]], ""), ctx["works"])
+
+
+def st_extractive_summary(ctx):
+    import summarize_cluster as sc
+    return _per_doc(lambda it: sc.extractive_summary(it["text"], 3, it["doc"]), ctx["items"])
+
+
+def st_tfidf_matrix(ctx):
+    import summarize_cluster as sc
+    sc.tfidf_matrix(ctx["items"])
+
+
+def st_tfidf_incremental(ctx):
+    import summarize_cluster as sc, tfidf_index
+    items = [dict(it) for it in ctx["items"]]
+    tfidf_index.TFIDF_DIR = Path(ctx["tmp"]) / f"tfidf-{len(items)}"
+    sc.tfidf_matrix(items, name="bench")  # 저장된 빈도 행렬 준비(측정 제외)
+    for it in items[:3]:  # 매분 실행처럼 3편만 바뀐 상태
+        it["text"] += " revised"
+        it.pop("doc", None)
+    t = time.perf_counter()
+    sc.tfidf_matrix(items, name="bench")
+    return None, time.perf_counter() - t
+
+
+def st_related_map(ctx):
+    import summarize_cluster as sc, related
+    related.RELATED_DIR = Path(ctx["tmp"]) / f"related-{len(ctx['items'])}"  # 저장된 이웃 없음 → 계산 시간
+    _, X = sc.tfidf_matrix(ctx["items"])
+    t = time.perf_counter()
+    sc.related_map(X, ctx["items"], topk=5)
+    return None, time.perf_counter() - t
+
+
+def st_write_clusters(ctx):
+    import summarize_cluster as sc
+    vec, X = sc.tfidf_matrix(ctx["items"])
+    sc.CLUSTERS_DIR = Path(ctx["tmp"]) / "clusters"
+    sc.CLUSTERS_DIR.mkdir(exist_ok=True)
+    t = time.perf_counter()
+    sc.write_clusters(vec, X, ctx["items"])
+    return None, time.perf_counter() - t
+
+
+def st_cluster_incremental(ctx):
+    import summarize_cluster as sc, clustering
+    _, X = sc.tfidf_matrix(ctx["items"])
+    ids = [it["id"] for it in ctx["items"]]
+    k = sc.auto_k(len(ids))
+    clustering.CLUSTER_DIR = Path(ctx["tmp"]) / f"clusters-{len(ids)}"
+    clustering.cluster_labels(X[:-3], ids[:-3], k, name="bench", mode="incremental")  # 지난 실행(측정 제외)
+    t = time.perf_counter()
+    clustering.cluster_labels(X, ids, k, name="bench", mode="incremental")  # 새 논문 3편
+    return None, time.perf_counter() - t
+
+
+def st_vault_graph(ctx):
+    import build_site as bs
+    rnd = random.Random(SEED)
+    n = len(ctx["works"])
+    bs.VAULT = Path(ctx["tmp"]) / f"vault-{n}"
+    bs.LINK_CACHE = Path(ctx["tmp"]) / f"vault_links-{n}.json"  # 비어 있는 캐시 → 첫 실행(전부 읽기) 시간
+    names = [(rnd.choice(["papers", "hubs", ""]), w["id"].rsplit("/", 1)[-1]) for w in ctx["works"]]
+    for folder, name in names:
+        links = " ".join(f"[[{rnd.choice(names)[1]}]]" for _ in range(rnd.randint(0, 8)))
+        p = bs.VAULT / folder / f"{name}.md"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(f"# {name}\n{links} [[missing-{rnd.randint(0, 99)}]]\n", encoding="utf-8")
+    t = time.perf_counter()
+    bs.scan_vault_graph()
+    return None, time.perf_counter() - t
+
+
+def _pdf_stage(tier: str):
+    def run(ctx):
+        from pdf_pipeline import extract_text
+        return _per_doc(lambda p: extract_text(p, 0, "", tier), ctx["pdfs"])
+    return run
+
+
+STAGES = {
+    "trust_score": (st_trust_score, None),
+    "trust_batch": (st_trust_batch, None),
+    "infer_compensations": (st_infer_compensations, None),
+    "mine_rules": (st_mine_rules, None),
+    "dedup": (st_dedup, None),
+    "make_note": (st_make_note, None),
+    "summarize": (st_summarize, None),
+    "extractive_summary": (st_extractive_summary, None),
+    "tfidf_matrix": (st_tfidf_matrix, None),
+    "tfidf_incremental": (st_tfidf_incremental, None),
+    "related_map": (st_related_map, QUADRATIC_MAX),
+    "write_clusters": (st_write_clusters, None),
+    "cluster_incremental": (st_cluster_incremental, None),
+    "vault_graph": (st_vault_graph, None),
+    "pdf_full": (_pdf_stage("full"), None),
+    "pdf_fast": (_pdf_stage("fast"), None),
+    "pdf_auto": (_pdf_stage("auto"), None),
+}
+
+# ------------------ 측정 ------------------
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _pct(sorted_lat: List[float], q: float) -> float:
+    i = min(len(sorted_lat) - 1, max(0, int(round(q * (len(sorted_lat) - 1)))))
+    return sorted_lat[i] * 1000
+
+
+def measure(stage: str, ctx: Dict) -> Dict:
+    fn, _ = STAGES[stage]
+    start_rss = _rss_mb()
+    t = time.perf_counter()
+    out = fn(ctx)
+    elapsed = time.perf_counter() - t
+    if isinstance(out, tuple):  # 준비(TF-IDF 등)를 뺀 본 단계 시간
+        out, elapsed = out
+    n = len(out) if out else len(ctx["works"])  # PDF 단계는 표본 PDF 수
+    res = {"n": n, "seconds": round(elapsed, 6), "docs_per_sec": round(n / elapsed, 2) if elapsed else None}
+    if out:
+        lat = sorted(out)
+        res.update({"p50_ms": round(_pct(lat, 0.50), 4), "p95_ms": round(_pct(lat, 0.95), 4),
+                    "p99_ms": round(_pct(lat, 0.99), 4)})
+    peak = _peak_mb()
+    if peak is not None:
+        res["peak_rss_mb"] = round(peak, 1)
+        if start_rss is not None:
+            res["rss_delta_mb"] = round(max(0.0, peak - start_rss), 1)
+    return res
+
+
+def _child(stage: str, ctx: Dict, conn) -> None:
+    try:
+        conn.send(measure(stage, ctx))
+    except ImportError as e:
+        conn.send({"skipped": f"missing dependency: {e.name or e}"})
+    except Exception as e:  # 벤치마크는 계속 진행
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_stage(stage: str, ctx: Dict) -> Dict:
+    """fork 가능하면 자식 프로세스에서(단계별 RSS 분리), 아니면 현재 프로세스에서"""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        try:
+            return measure(stage, ctx)
+        except ImportError as e:
+            return {"skipped": f"missing dependency: {e.name or e}"}
+    mp = multiprocessing.get_context("fork")
+    parent, child = mp.Pipe(duplex=False)
+    p = mp.Process(target=_child, args=(stage, ctx, child))
+    p.start()
+    child.close()
+    try:
+        res = parent.recv()
+    except EOFError:
+        res = {"error": f"worker exited with code {p.exitcode}"}
+    p.join()
+    return res
+
+# ------------------ 기준선 비교 ------------------
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tol: float = TOLERANCE) -> List[str]:
+    """처리량이 tol 이상 떨어졌거나 RSS 증가분이 tol 이상(+5MB) 늘어난 항목"""
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base or "docs_per_sec" not in cur or "docs_per_sec" not in base:
+            continue
+        if base["docs_per_sec"] and cur["docs_per_sec"] < base["docs_per_sec"] * (1 - tol):
+            regressions.append(f"{key}: throughput {base['docs_per_sec']} → {cur['docs_per_sec']} docs/s")
+        b_rss, c_rss = base.get("rss_delta_mb"), cur.get("rss_delta_mb")
+        if b_rss is not None and c_rss is not None and c_rss > b_rss * (1 + tol) + 5:
+            regressions.append(f"{key}: memory {b_rss} → {c_rss} MB")
+    return regressions
+
+
+def main() -> int:
+    stages = [s for s in STAGES if not STAGE_FILTER or s in STAGE_FILTER]
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    # 크롤러/스크립트는 import 시 cwd에 출력 폴더를 만들므로 임시 폴더에서 실행
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    os.environ.setdefault("DOC_CACHE", "0")
+    os.environ.setdefault("HTTP_CACHE", "0")
+    results: Dict[str, Dict] = {}
+    try:
+        import parsed_doc
+        # import/오토마톤 컴파일 비용이 단계 시간에 섞이지 않도록 미리 (fork된 자식이 물려받음)
+        for mod in ("compensation_crawler_bot", "summarize_cluster", "fetch_and_link"):
+            try:
+                __import__(mod)
+            except ImportError as e:
+                print(f"WARNING: {mod} unavailable ({e})")
+        sys.modules["compensation_crawler_bot"].lexicon_matcher()
+        for n in SIZES:
+            t = time.perf_counter()
+            works = gen_works(n)
+            ctx = {"works": works, "tmp": tmp,
+                   "abstracts": {w["id"]: parsed_doc.reconstruct(w["abstract_inverted_index"]) for w in works},
+                   "items": paper_items(works)}
+            if any(s.startswith("pdf_") for s in stages):
+                ctx["pdfs"] = sample_pdfs(works, ctx["abstracts"], tmp)
+            print(f"== n={n} (corpus {time.perf_counter() - t:.1f}s)")
+            for stage in stages:
+                cap = STAGES[stage][1]
+                res = {"skipped": f"n > BENCH_QUADRATIC_MAX ({cap})"} if cap and n > cap else run_stage(stage, ctx)
+                results[f"{stage}@{n}"] = res
+                if "docs_per_sec" in res:
+                    lat = f" p50 {res['p50_ms']}ms p95 {res['p95_ms']}ms p99 {res['p99_ms']}ms" if "p50_ms" in res else ""
+                    print(f"  {stage:<22} {res['docs_per_sec']:>12} docs/s{lat}  peak {res.get('peak_rss_mb')}MB"
+                          f" (+{res.get('rss_delta_mb')})")
+                else:
+                    print(f"  {stage:<22} {res.get('skipped') or res.get('error')}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "seed": SEED, "sizes": SIZES,
+                 "muscle_rate": MUSCLE_RATE, "trigger_rate": TRIGGER_RATE},
+        "results": results,
+    }
+    OUT.parent.mkdir(parents=True, exist_ok=True)
+    OUT.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Saved {OUT}")
+
+    status = 0
+    if SAVE_BASELINE:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline saved {BASELINE}")
+    elif BASELINE.exists():
+        regressions = compare(results, json.loads(BASELINE.read_text(encoding="utf-8"))["results"])
+        for r in regressions:
+            print("REGRESSION:", r)
+        print(f"Baseline {BASELINE}: {len(regressions)} regression(s)")
+        status = 1 if regressions else 0
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
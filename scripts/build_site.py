@@ -1,22 +1,33 @@
 # -*- coding: utf-8 -*-
-import os, re, json, datetime, io, requests
+import os, re, sys, json, datetime
 from pathlib import Path
 from typing import Dict, List, Optional
-from pdfminer.high_level import extract_text_to_fp
-from pdfminer.layout import LAParams
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # 저장소 루트의 공용 모듈
+import catalog, http_cache, parsed_doc, metrics, pdf_text_cache
+from dedup import DedupIndex, paper_slug
+import query_set
+from pdf_pipeline import pdf_texts
 
 DOCS = Path("docs"); DOCS.mkdir(exist_ok=True, parents=True)
 PAPERS = DOCS/"papers"; PAPERS.mkdir(exist_ok=True, parents=True)
 VAULT = Path("ObsidianVault/Compensation")  # 그래프용(있으면 사용)
+DEDUP_PATH = DOCS/".dedup_index.json"  # fetch_and_link.py와 공유 (같은 work → 같은 파일명)
 
 API = "https://api.openalex.org/works"
-LIMIT = int(os.getenv("LIMIT", "8"))  # 1회 최대 처리 논문 수
+LIMIT = int(os.getenv("LIMIT", "8"))  # 1회 최대 처리 논문 수 (PDF는 pdf_pipeline.py로 동시 처리하므로 수백 건도 가능)
 QUERY = {
     "search": "compensation muscle weakness biomechanics rehabilitation",
     "per_page": LIMIT,
     "sort": "cited_by_count:desc",
 }
 
+QUERY_SET_FILE = os.getenv("QUERY_SET_FILE")  # 여러 쿼리 동시 수집 (query_set.py 참고, 쿼리별 limit 생략 시 LIMIT)
+
+VAULT_GRAPH = os.getenv("VAULT_GRAPH", "0") == "1"  # 볼트 링크로 docs/graph.json 갱신 (기본은 summarize_cluster.py가 갱신)
+LINK_CACHE = Path(os.getenv("LINK_CACHE", ".cache/vault_links.json"))  # 노트별 링크 목록 (mtime/크기 기준 재사용)
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "0") == "1"  # updated_date가 같고 파일이 있으면 다시 렌더링하지 않음 (PDF도 건너뜀)
+
 UA = {"User-Agent": "compensation-wiki/0.2 (+mailto:you@example.com)"}
 LINK_RE = re.compile(r"\[\[([^\]]+)\]\]")
 
@@ -29,31 +40,9 @@ def get_best_pdf_url(w: Dict) -> Optional[str]:
         if cand.get("is_oa") and cand.get("pdf_url"): return cand["pdf_url"]
     return None
 
-def stream_pdf_text(url: str, max_bytes: int = 6_000_000) -> str:
-    """PDF를 파일로 저장하지 않고 스트림으로 텍스트만 추출."""
-    with requests.get(url, headers=UA, stream=True, timeout=45) as r:
-        r.raise_for_status()
-        buf = io.BytesIO()
-        size = 0
-        for chunk in r.iter_content(16384):
-            if not chunk: break
-            size += len(chunk)
-            if size > max_bytes: break  # 너무 큰 PDF는 앞부분만
-            buf.write(chunk)
-        buf.seek(0)
-        out = io.StringIO()
-        extract_text_to_fp(buf, outfp=out, laparams=LAParams(), codec=None)
-        return out.getvalue()
-
 def restore_abstract(inv_idx: Dict) -> str:
-    if not inv_idx: return ""
-    # OpenAlex abstract_inverted_index 복원
-    idx = []
-    for token, poss in inv_idx.items():
-        for pos in poss:
-            idx.append((pos, token))
-    idx.sort()
-    return " ".join(tok for _, tok in idx)
+    # OpenAlex abstract_inverted_index 복원 (선형 시간, parsed_doc 참고)
+    return parsed_doc.reconstruct(inv_idx)
 
 def brief_summary(title: str, abstract: str, body: str) -> List[str]:
     """초간단 3줄 요약(추출식)."""
@@ -70,29 +59,19 @@ def brief_summary(title: str, abstract: str, body: str) -> List[str]:
     scored.sort(key=lambda x:(-x[0], x[1]))
     return [s for _,_,s in scored[:3]] or [text[:180]]
 
-def paper_slug(title: str, year: Optional[int]) -> str:
-    t = re.sub(r"[^a-z0-9\-]+","-", (title or "untitled").lower())
-    t = re.sub(r"-+","-", t).strip("-")
-    return f"{t}-{year or ''}".strip("-")
-
-def make_md_from_work(w: Dict) -> str:
+def make_md_from_work(w: Dict, body: str = "") -> str:
     title = (w.get("display_name") or "Untitled").strip()
     year = w.get("publication_year")
     doi = (w.get("doi") or "").replace("https://doi.org/", "")
     url = f"https://doi.org/{doi}" if doi else (w.get("primary_location") or {}).get("landing_page_url","")
 
-    # 텍스트 확보: 1) PDF → 2) Abstract
+    # 텍스트 확보: 1) PDF 본문(pdf_pipeline) → 2) Abstract
+    abstract = parsed_doc.shared().for_work(w).text
     pdf_url = get_best_pdf_url(w)
-    body = ""
-    if pdf_url:
-        try:
-            body = stream_pdf_text(pdf_url)
-        except Exception:
-            body = ""
     if not body:
-        body = restore_abstract(w.get("abstract_inverted_index") or "")
+        body = abstract
 
-    lines = brief_summary(title, restore_abstract(w.get("abstract_inverted_index") or ""), body)
+    lines = brief_summary(title, abstract, body)
     summary_md = "\n".join(f"- {s}" for s in lines)
 
     meta = [
@@ -112,7 +91,10 @@ def make_md_from_work(w: Dict) -> str:
     return "\n".join(meta)
 
 def fetch_openalex() -> List[Dict]:
-    r = requests.get(API, params=QUERY, headers=UA, timeout=40)
+    if QUERY_SET_FILE:
+        specs = query_set.load(Path(QUERY_SET_FILE), LIMIT)
+        return query_set.search_merged(specs, headers=UA, cache=http_cache.shared())[0]
+    r = http_cache.get(API, params=QUERY, headers=UA, timeout=40)
     r.raise_for_status()
     return r.json().get("results", [])
 
@@ -156,52 +138,142 @@ def write_index(papers_md_files: List[str]):
     lines += ["", "## 노드 그래프", "- 그래프 보기: [graph.html](graph.html)"]
     (DOCS/"index.md").write_text("\n".join(lines), encoding="utf-8")
 
+def _read_links(path: str) -> List[str]:
+    """노트의 [[링크]] 대상 (별칭 |, 제목 # 제거)"""
+    try:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            txt = f.read()
+    except OSError:
+        return []
+    out = []
+    for tgt in LINK_RE.findall(txt):
+        tgt = tgt.split("|", 1)[0].split("#", 1)[0].strip()
+        if tgt:
+            out.append(tgt if tgt.endswith(".md") else tgt + ".md")
+    return out
+
 def scan_vault_graph():
-    nodes, edges = {}, []
-    if not VAULT.exists(): return {"nodes": [], "links": []}
-    md_files = list(VAULT.rglob("*.md"))
-    for p in md_files:
-        nid = str(p.relative_to(VAULT)).replace("\\","/")
-        nodes.setdefault(nid, {"id": nid})
-        try:
-            txt = p.read_text(encoding="utf-8", errors="ignore")
-        except:
-            continue
-        for tgt in LINK_RE.findall(txt):
-            cand = tgt if tgt.endswith(".md") else tgt + ".md"
-            local = p.parent / cand
-            target = None
-            if local.exists():
-                target = str(local.relative_to(VAULT)).replace("\\","/")
-            else:
-                hits = list(VAULT.rglob(cand))
-                if hits:
-                    target = str(hits[0].relative_to(VAULT)).replace("\\","/")
+    """
+    볼트 [[링크]] 그래프. 디렉터리는 한 번만 훑어 파일명 → 경로 색인을 만들고 링크는 색인으로 해석
+    (같은 폴더 → 볼트 기준 경로 → 파일명 순). 노트별 링크 목록은 (mtime, 크기)로 LINK_CACHE에 저장해
+    바뀐 노트만 다시 읽는다. 해석되지 않은 링크는 "unresolved"로 반환.
+    """
+    if not VAULT.exists(): return {"nodes": [], "links": [], "unresolved": []}
+    files: Dict[str, os.stat_result] = {}
+    for root, dirs, names in os.walk(VAULT):
+        dirs.sort()
+        rel_root = os.path.relpath(root, VAULT).replace("\\", "/")
+        for name in sorted(names):
+            if name.endswith(".md"):
+                rel = name if rel_root == "." else f"{rel_root}/{name}"
+                files[rel] = os.stat(os.path.join(root, name))
+    by_name: Dict[str, List[str]] = {}
+    for rel in files:
+        by_name.setdefault(rel.rsplit("/", 1)[-1], []).append(rel)
+    for hits in by_name.values():  # 같은 파일명이 여러 개면 얕은 경로, 그다음 사전순
+        hits.sort(key=lambda r: (r.count("/"), r))
+
+    try:
+        cache = json.loads(LINK_CACHE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+    fresh, reread = {}, 0
+    for rel, st in files.items():
+        e = cache.get(rel)
+        if not e or e["m"] != st.st_mtime_ns or e["s"] != st.st_size:
+            e = {"m": st.st_mtime_ns, "s": st.st_size, "links": _read_links(str(VAULT / rel))}
+            reread += 1
+        fresh[rel] = e
+    if reread or len(fresh) != len(cache):
+        LINK_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = LINK_CACHE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(fresh, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, LINK_CACHE)
+    metrics.count("vault_notes_reread", reread)
+
+    nodes = {rel: {"id": rel} for rel in files}
+    edges, unresolved = [], []
+    for rel, e in fresh.items():
+        folder = rel.rsplit("/", 1)[0] + "/" if "/" in rel else ""
+        for cand in e["links"]:
+            local = os.path.normpath(folder + cand).replace("\\", "/")
+            if local in files:
+                target = local
+            else:  # [[이름]]은 파일명으로, [[폴더/이름]]은 경로 끝이 같은 노트로
+                target = next((h for h in by_name.get(cand.rsplit("/", 1)[-1], ())
+                               if h == cand or h.endswith("/" + cand)), None)
             if target:
-                nodes.setdefault(target, {"id": target})
-                edges.append({"source": nid, "target": target})
-    return {"nodes": list(nodes.values()), "links": edges}
+                edges.append({"source": rel, "target": target})
+            else:
+                unresolved.append({"source": rel, "target": cand[:-3]})
+    metrics.count("links_unresolved", len(unresolved))
+    return {"nodes": list(nodes.values()), "links": edges, "unresolved": unresolved}
 
 def main():
     ensure_graph_assets()
     works = []
     try:
-        works = fetch_openalex()
+        with metrics.stage("fetch"):
+            works = fetch_openalex()
     except Exception as e:
         print("OpenAlex fetch failed:", e)
+    metrics.count("works_fetched", len(works))
+    catalog.store_works(works)
 
-    created = []
+    dedup = DedupIndex.load(DEDUP_PATH)
+    created, todo = [], []
     for w in works:
+        # 중복(같은 ID/DOI/제목 지문)은 렌더링/PDF 전에 제외, SKIP_UNCHANGED=1이면 바뀌지 않은 work는 기존 파일 유지
+        if not dedup.claim(w):
+            metrics.count("works_duplicate")
+            continue
+        fresh = dedup.unchanged(w)
         title = (w.get("display_name") or "Untitled").strip()
-        slug = paper_slug(title, w.get("publication_year"))
+        slug, old = dedup.slug_for(w, paper_slug(title, w.get("publication_year")))
         mdpath = PAPERS/f"{slug}.md"
-        md = make_md_from_work(w)
-        mdpath.write_text(md, encoding="utf-8")
+        if old:
+            (PAPERS/f"{old}.md").unlink(missing_ok=True)
+        elif SKIP_UNCHANGED and fresh and mdpath.exists():
+            metrics.count("works_unchanged")
+            created.append(mdpath.name)
+            continue
+        todo.append((w, mdpath))
         created.append(mdpath.name)
 
-    write_index(created)
-    # 그래프 JSON은 summarize_cluster.py에서 갱신(여기선 Vault 기반만 업데이트 원하면 아래 라인 활성화)
-    # (DOCS/"graph.json").write_text(json.dumps(scan_vault_graph(), ensure_ascii=False), encoding="utf-8")
+    # PDF 다운로드/추출은 동시에, 렌더링은 끝나는 순서대로 (목차는 위 created 순서 유지)
+    paths = {id(w): p for w, p in todo}
+    def render(w: Dict, body: str = "") -> None:
+        with metrics.stage("render"):
+            md = make_md_from_work(w, body)
+        with metrics.stage("write"):
+            paths[id(w)].write_text(md, encoding="utf-8")
+    pdf_jobs = []
+    for w, _ in todo:
+        pdf_url = get_best_pdf_url(w)
+        if pdf_url:
+            pdf_jobs.append((w, pdf_url))
+        else:
+            render(w)
+    for w, body in pdf_texts(pdf_jobs, headers=UA):
+        render(w, body)
+
+    with metrics.stage("write"):
+        write_index(created)
+    dedup.save()
+    parsed_doc.shared().commit()
+    cache = http_cache.shared()
+    if cache is not None:
+        print("INFO:", cache.report())
+    texts = pdf_text_cache.shared()
+    if texts is not None:
+        print("INFO:", texts.report())
+    # 그래프 JSON은 summarize_cluster.py에서 갱신(Vault 링크 기반으로 갱신하려면 VAULT_GRAPH=1)
+    if VAULT_GRAPH:
+        with metrics.stage("graph"):
+            graph = scan_vault_graph()
+            (DOCS/"graph.json").write_text(json.dumps(graph, ensure_ascii=False), encoding="utf-8")
+        print(f"INFO: vault graph {len(graph['nodes'])} notes, {len(graph['links'])} links,"
+              f" {len(graph['unresolved'])} unresolved")
 
 if __name__ == "__main__":
-    main()
+    metrics.run("build_site", main, log_dir=VAULT / "logs")
@@ -3,39 +3,42 @@
 매분 실행:
 1) OpenAlex에서 OA(무료 전문) 논문 N편 스트리밍 수집 (PDF 저장 X)
 2) 3줄 쟁점 요약 생성(추출식)
-3) TF-IDF 유사도 → 관련 논문 링크(상위 5)
-4) 간단 KMeans 클러스터 페이지 생성
+3) TF-IDF 유사도 → 관련 논문 링크(상위 5, 바뀐 문서만 다시 벡터화)
+4) 간단 KMeans 클러스터 페이지 생성(실행 간 클러스터 번호 유지)
 5) /docs/index.md 갱신 + /docs/graph.json & graph.html 생성
 """
-import os, re, io, json, datetime, requests
+import os, re, sys, json, datetime
 from pathlib import Path
 from typing import Dict, List, Optional
-from pdfminer.high_level import extract_text_to_fp
-from pdfminer.layout import LAParams
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # 저장소 루트의 공용 모듈
+import catalog, http_cache, parsed_doc, metrics, pdf_text_cache, related, tfidf_index, clustering
+from crawl_state import work_key
+from dedup import DedupIndex, paper_slug
+import query_set
+from pdf_pipeline import pdf_texts
 
 # ----------------- 설정 -----------------
 DOCS = Path("docs"); DOCS.mkdir(parents=True, exist_ok=True)
 PAPERS = DOCS/"papers"; PAPERS.mkdir(parents=True, exist_ok=True)
 CLUST  = DOCS/"clusters"; CLUST.mkdir(parents=True, exist_ok=True)
+DEDUP_PATH = DOCS/".dedup_index.json"  # build_site.py와 공유 (같은 work → 같은 파일명)
 
-BATCH = int(os.getenv("BATCH", "3"))               # 1회 수집 수
+BATCH = int(os.getenv("BATCH", "3"))               # 1회 수집 수 (PDF는 pdf_pipeline.py로 동시 처리)
 QUERY = os.getenv("QUERY", "compensation biomechanics")
+QUERY_SET_FILE = os.getenv("QUERY_SET_FILE")       # 여러 쿼리 동시 수집 (query_set.py 참고)
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "0") == "1"  # 이미 받아 둔(바뀌지 않은) work는 건너뛰고 다음 후보로
 API   = "https://api.openalex.org/works"
 UA    = {"User-Agent":"compensation-wiki/0.3 (+contact@example.com)"}
 
 # ----------------- 유틸 -----------------
-def slugify(s: str) -> str:
-    s = (s or "untitled").lower()
-    s = re.sub(r"[^a-z0-9\-]+","-", s)
-    s = re.sub(r"-+","-", s).strip("-")
-    return s or "untitled"
-
 def openalex_search(q: str, n: int) -> List[Dict]:
+    if QUERY_SET_FILE:
+        # 쿼리별 limit 생략 시 단일 쿼리와 같은 후보 수
+        specs = query_set.load(Path(QUERY_SET_FILE), max(1, min(25, n*4)))
+        return query_set.search_merged(specs, headers=UA, cache=http_cache.shared())[0]
     params = {"search": q, "per_page": max(1, min(25, n*4)), "sort":"cited_by_count:desc"}
-    r = requests.get(API, params=params, headers=UA, timeout=40); r.raise_for_status()
+    r = http_cache.get(API, params=params, headers=UA, timeout=40); r.raise_for_status()
     return r.json().get("results", [])
 
 def best_pdf_url(w: Dict) -> Optional[str]:
@@ -46,26 +49,8 @@ def best_pdf_url(w: Dict) -> Optional[str]:
         if loc.get("is_oa") and loc.get("pdf_url"): return loc["pdf_url"]
     return None
 
-def stream_pdf_text(url: str, max_bytes=6_000_000) -> str:
-    with requests.get(url, headers=UA, stream=True, timeout=45) as r:
-        r.raise_for_status()
-        buf, size = io.BytesIO(), 0
-        for ch in r.iter_content(16384):
-            if not ch: break
-            size += len(ch)
-            if size > max_bytes: break
-            buf.write(ch)
-        buf.seek(0); out = io.StringIO()
-        extract_text_to_fp(buf, outfp=out, laparams=LAParams(), codec=None)
-        return out.getvalue()
-
 def restore_abs(inv):
-    if not inv: return ""
-    pairs = []
-    for tok, pos in inv.items():
-        for p in pos: pairs.append((p, tok))
-    pairs.sort()
-    return " ".join(t for _,t in pairs)
+    return parsed_doc.reconstruct(inv)
 
 def summarize(title: str, abstract: str, body: str, k=3) -> List[str]:
     text = " ".join([title or "", abstract or "", body or ""])
@@ -109,27 +94,43 @@ fetch("graph.json").then(r=>r.json()).then(({nodes,links})=>{
 def main():
     write_graph_html_once()
 
-    works = openalex_search(QUERY, BATCH)
-    picked = []
+    with metrics.stage("fetch"):
+        works = openalex_search(QUERY, BATCH)
+    metrics.count("works_fetched", len(works))
+    catalog.store_works(works)
+    dedup = DedupIndex.load(DEDUP_PATH)
+    # 후보를 먼저 BATCH개 고르고(파일명도 이 순서로 배정) PDF는 한꺼번에 동시 처리
+    jobs, slugs = [], {}
     for w in works:
-        if len(picked) >= BATCH: break
+        if len(jobs) >= BATCH: break
         pdf = best_pdf_url(w)
         if not pdf: continue
+        # 중복은 PDF 전에 건너뛰고 다음 후보로 (SKIP_UNCHANGED=1이면 바뀌지 않은 work도)
+        key = dedup.claim(w)
+        if not key:
+            metrics.count("works_duplicate"); continue
+        if SKIP_UNCHANGED and dedup.unchanged(w) and (PAPERS/f"{dedup.works[key]['slug']}.md").exists():
+            metrics.count("works_unchanged"); continue
+        slug, old = dedup.slug_for(w, paper_slug((w.get("display_name") or "Untitled").strip(), w.get("publication_year")))
+        if old: (PAPERS/f"{old}.md").unlink(missing_ok=True)
+        slugs[key] = slug
+        jobs.append((w, pdf))
+
+    picked = []
+    for w, body in pdf_texts(jobs, headers=UA):  # 끝나는 순서대로
         title = (w.get("display_name") or "Untitled").strip()
         year  = w.get("publication_year")
         doi   = (w.get("doi") or "").replace("https://doi.org/","")
         url   = f"https://doi.org/{doi}" if doi else (w.get("primary_location") or {}).get("landing_page_url","")
+        pdf   = best_pdf_url(w)
 
         # 텍스트 확보(가능하면 PDF, 아니면 초록)
-        body = ""
-        try:
-            body = stream_pdf_text(pdf)
-        except Exception:
-            body = ""
+        abstract = parsed_doc.shared().for_work(w).text
         if not body:
-            body = restore_abs(w.get("abstract_inverted_index"))
+            body = abstract
 
-        lines = summarize(title, restore_abs(w.get("abstract_inverted_index")), body, k=3)
+        with metrics.stage("summarize"):
+            lines = summarize(title, abstract, body, k=3)
         md = [
             f"# {title}",
             "",
@@ -141,9 +142,10 @@ def main():
             *[f"- {s}" for s in lines],
             "",
         ]
-        fn = f"{slugify(title)}-{year or ''}.md".strip("-")
+        fn = f"{slugs[work_key(w)]}.md"
         (PAPERS/fn).write_text("\n".join(md), encoding="utf-8")
         picked.append({"id": fn, "title": title})
+    dedup.save()
 
     # ----- 유사도 기반 링크 & 클러스터 -----
     paper_files = sorted(PAPERS.glob("*.md"))
@@ -155,24 +157,27 @@ def main():
             ids.append(p.name)
             texts.append(t.lower())
 
-        vec = TfidfVectorizer(max_df=0.9, min_df=1, ngram_range=(1,2))
-        X = vec.fit_transform(texts)
-        sim = cosine_similarity(X)
+        with metrics.stage("tfidf"):
+            vec, X = tfidf_index.fit(ids, texts, name="fetch_and_link", max_df=0.9)
+        metrics.gauge("papers", len(paper_files))
+        # 상위 5개 이웃은 한 번만 계산해 링크 섹션과 graph.json이 같이 쓴다 (related.py)
+        with metrics.stage("related"):
+            rel = related.neighbours(X, ids, texts, k=5, name="fetch_and_link", params=vec.params)
+        title_of = dict(zip(ids, titles))
 
         # 각 문서 상위 5개 링크 섹션 갱신
         for i, p in enumerate(paper_files):
-            order = sorted(((sim[i,j], j) for j in range(len(paper_files)) if j!=i), reverse=True)[:5]
-            related = [f"- [{titles[j]}](./{ids[j]})" for _, j in order]
+            links_md = [f"- [{title_of[j]}](./{j})" for j in rel[ids[i]]]
             md = p.read_text(encoding="utf-8", errors="ignore")
             md = re.sub(r"(?s)\n## 관련 논문\n.*?(?=\n## |\Z)", "", md)  # 기존 섹션 제거
             if not md.endswith("\n"): md += "\n"
-            md += "\n## 관련 논문\n" + "\n".join(related) + "\n"
+            md += "\n## 관련 논문\n" + "\n".join(links_md) + "\n"
             p.write_text(md, encoding="utf-8")
 
         # 간단 클러스터 페이지
         k = max(2, min(10, len(paper_files)//5 or 2))
-        km = KMeans(n_clusters=k, n_init=10, random_state=42).fit(X)
-        labels = km.labels_
+        with metrics.stage("kmeans"):
+            labels = clustering.cluster_labels(X, ids, k, name="fetch_and_link")
         CLUST.mkdir(exist_ok=True, parents=True)
         idx = ["# 논문 클러스터", ""]
         for lab in sorted(set(labels)):
@@ -188,9 +193,8 @@ def main():
         nodes = [{"id": ids[i], "title": titles[i]} for i in range(len(ids))]
         links = []
         for i in range(len(ids)):
-            order = sorted(((sim[i,j], j) for j in range(len(ids)) if j!=i), reverse=True)[:5]
-            for _, j in order:
-                links.append({"source": ids[i], "target": ids[j]})
+            for j in rel[ids[i]]:
+                links.append({"source": ids[i], "target": j})
         (DOCS/"graph.json").write_text(json.dumps({"nodes":nodes,"links":links}, ensure_ascii=False), encoding="utf-8")
 
     # ----- index 갱신 -----
@@ -206,5 +210,13 @@ def main():
     lines += ["", "## 노드 그래프", "- 그래프 보기: [graph.html](graph.html)", "", "## 클러스터", "- [논문 클러스터](clusters/index.md)"]
     (DOCS/"index.md").write_text("\n".join(lines), encoding="utf-8")
 
+    parsed_doc.shared().commit()
+    cache = http_cache.shared()
+    if cache is not None:
+        print("INFO:", cache.report())
+    texts = pdf_text_cache.shared()
+    if texts is not None:
+        print("INFO:", texts.report())
+
 if __name__ == "__main__":
-    main()
+    metrics.run("fetch_and_link", main)
@@ -3,15 +3,16 @@
 docs/papers/*.md 를 읽어:
 - '쟁점 요약' 생성(추출식 3문장)
 - TF-IDF 코사인 유사도 기반 '관련 논문' 상위 5편 링크
-- KMeans 클러스터 페이지 생성(docs/clusters/*.md)
+  (tfidf_index.py: 바뀐 문서만 다시 벡터화, related.py: 블록 단위 top-k + 이웃 캐시)
+- KMeans 클러스터 페이지 생성(docs/clusters/*.md, clustering.py: 실행 간 클러스터 번호 유지)
 요구: pip install scikit-learn nltk
 """
-import re, collections
+import re, sys, collections
 from pathlib import Path
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import List, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # 저장소 루트의 공용 모듈
+import parsed_doc, metrics, related, tfidf_index, clustering
 
 ROOT = Path("docs")
 PAPERS_DIR = ROOT / "papers"
@@ -23,25 +24,32 @@ SENT_SPLIT = re.compile(r"(?<=[.!?。])\s+|[\n]+")
 def read_papers() -> List[Dict]:
     items = []
     if not PAPERS_DIR.exists(): return items
+    docs = parsed_doc.shared()
     for p in sorted(PAPERS_DIR.glob("*.md")):
         txt = p.read_text(encoding="utf-8", errors="ignore")
         title = (txt.splitlines()[0].strip("# ").strip()
                  if txt.strip() else p.stem.replace("-", " "))
         body = "\n".join(txt.splitlines()[1:]).strip()
-        items.append({"path": p, "id": p.name, "title": title, "text": body})
+        items.append({"path": p, "id": p.name, "title": title, "text": body,
+                      "doc": docs.for_text("docs/papers/" + p.name, body)})
     return items
 
-def extractive_summary(text: str, k: int = 3) -> str:
+def extractive_summary(text: str, k: int = 3, doc: Optional[parsed_doc.ParsedDoc] = None) -> str:
     if not text: return "데이터 부족으로 요약 불가."
-    sents = [s.strip() for s in SENT_SPLIT.split(text) if s.strip()]
-    if not sents: return (text[:200] + "…") if len(text) > 200 else text
+    # 소문자 변환은 문서당 한 번(doc.lower), 문장은 오프셋 구간으로만 다룬다
+    doc = doc or parsed_doc.ParsedDoc("", "", text)
+    lower = doc.lower if len(doc.lower) == len(text) else None
+    spans = [(a, b) for a, b in doc.spans(SENT_SPLIT) if text[a:b].strip()]
+    if not spans: return (text[:200] + "…") if len(text) > 200 else text
     keywords = ["compensation","weakness","overactivity","biomechanics",
                 "rehabilitation","activation","dysfunction","gait",
                 "gluteus","tfl","hamstring","serratus","trapezius",
                 "tibialis","peroneal","valgus","runner"]
     scored = []
-    for i, s in enumerate(sents):
-        key = sum(s.lower().count(kw) for kw in keywords)
+    for i, (a, b) in enumerate(spans):
+        s = text[a:b].strip()
+        low = lower[a:b] if lower is not None else s.lower()
+        key = sum(low.count(kw) for kw in keywords)
         len_score = min(len(s)/80.0, 2.0)  # 너무 짧/김 보정
         scored.append((key + len_score, i, s))
     scored.sort(key=lambda x: (-x[0], x[1]))
@@ -60,41 +68,37 @@ def ensure_section(md: str, header: str, content_md: str) -> str:
     new_tail = ("\n" + content_md.strip() + "\n" + tail[nxt.start():]) if nxt else ("\n" + content_md.strip() + "\n")
     return head + marker + new_tail
 
-def tfidf_matrix(items: List[Dict]):
-    texts = [ (it["title"] + "\n" + it["text"]).lower() for it in items ]
-    vec = TfidfVectorizer(max_df=0.9, min_df=1, ngram_range=(1,2))
-    X = vec.fit_transform(texts)
-    return vec, X
-
-def related_map(X, items: List[Dict], topk=5):
-    sim = cosine_similarity(X)
-    rel = {}
-    n = len(items)
-    for i in range(n):
-        order = sorted(((sim[i,j], j) for j in range(n) if j!=i), reverse=True)
-        rel[items[i]["id"]] = [items[j]["id"] for _, j in order[:topk]]
-    return rel
+def tfidf_matrix(items: List[Dict], name: Optional[str] = None):
+    # name이 있으면 빈도 행렬을 저장해 두고 다음 실행엔 바뀐 문서만 다시 분석 (tfidf_index.py)
+    texts = [ (it["title"].lower() + "\n" + it["doc"].lower) if "doc" in it
+              else (it["title"] + "\n" + it["text"]).lower() for it in items ]
+    return tfidf_index.fit([it["id"] for it in items], texts, name=name, max_df=0.9)
+
+def related_map(X, items: List[Dict], topk=5, params: str = ""):
+    # 블록 단위 top-k (related.py), 문서와 벡터화 설정이 그대로면 지난 결과 재사용
+    return related.neighbours(X, [it["id"] for it in items], [it["title"] + "\n" + it["text"] for it in items],
+                              k=topk, name="summarize_cluster", params=params)
 
 def auto_k(n: int) -> int:
     return max(2, min(10, n//5 or 2))
 
-def write_clusters(vec, X, items: List[Dict]):
+def write_clusters(vec, X, items: List[Dict], name: Optional[str] = None):
     if len(items) < 3: return
     k = auto_k(len(items))
-    km = KMeans(n_clusters=k, n_init=10, random_state=42)
-    labels = km.fit_predict(X)
+    # name이 있으면 지난 실행의 번호를 이어받는다 (clustering.py, CLUSTER_MODE)
+    labels = clustering.cluster_labels(X, [it["id"] for it in items], k, name=name)
     groups = collections.defaultdict(list)
     for it, lab in zip(items, labels): groups[int(lab)].append(it)
 
     # 키워드 레이블
     import numpy as np
-    terms = vec.get_feature_names_out()
+    terms = vec.get_feature_names_out()  # TFIDF_MODE=hashing이면 None
     label_terms = {}
     for lab in sorted(groups.keys()):
         idx = [i for i,(it,l) in enumerate(zip(items, labels)) if l==lab]
         centroid = X[idx].mean(axis=0).A1
         tops = centroid.argsort()[::-1][:6]
-        label_terms[lab] = ", ".join(terms[t] for t in tops)
+        label_terms[lab] = ", ".join(terms[t] for t in tops) if terms is not None else f"Cluster {lab}"
 
     # 인덱스
     lines = ["# 논문 클러스터", ""]
@@ -110,19 +114,26 @@ def write_clusters(vec, X, items: List[Dict]):
         (CLUSTERS_DIR/f"cluster-{lab}.md").write_text("\n".join(page), encoding="utf-8")
 
 def main():
-    items = read_papers()
+    with metrics.stage("read"):
+        items = read_papers()
+    metrics.gauge("papers", len(items))
     if not items:
         print("No papers in docs/papers/*.md")
         return
 
     # 요약
-    for it in items:
-        it["summary"] = extractive_summary(it["text"], 3)
+    with metrics.stage("summarize"):
+        for it in items:
+            it["summary"] = extractive_summary(it["text"], 3, it["doc"])
+    parsed_doc.shared().commit()
 
     # 벡터화/유사도/클러스터
-    vec, X = tfidf_matrix(items)
-    rel = related_map(X, items, topk=5)
-    write_clusters(vec, X, items)
+    with metrics.stage("tfidf"):
+        vec, X = tfidf_matrix(items, name="summarize_cluster")
+    with metrics.stage("related"):
+        rel = related_map(X, items, topk=5, params=vec.params)
+    with metrics.stage("kmeans"):
+        write_clusters(vec, X, items, name="summarize_cluster")
 
     # 각 논문 md 갱신: 쟁점 요약 + 관련 논문
     for it in items:
@@ -145,4 +156,4 @@ def main():
     print(f"OK: {len(items)} papers processed.")
 
 if __name__ == "__main__":
-    main()
+    metrics.run("summarize_cluster", main)
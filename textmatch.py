@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Aho-Corasick 다중 패턴 매처
+
+근육 사전/트리거/규칙 키워드를 하나의 오토마톤으로 컴파일해 텍스트를 한 번만 훑는다.
+비용은 텍스트 길이 + 매치 수에 비례하고 패턴 수와는 무관.
+
+경계 처리(boundary):
+  "start" (기본) 매치 시작이 단어 경계여야 함. 복수형(weaknesses)이나 한국어 조사(중둔근의)는 허용
+  "word"          앞뒤 모두 단어 경계
+  None            순수 부분 문자열
+
+pyahocorasick(C 구현)이 설치돼 있으면 스캔에 사용하고, 없으면 순수 파이썬 오토마톤으로 동작.
+"""
+from collections import deque
+from typing import Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import ahocorasick as _native  # pip install pyahocorasick (선택)
+except ImportError:
+    _native = None
+
+
+class Hit(NamedTuple):
+    start: int
+    end: int
+    pattern: str
+    labels: Tuple[Hashable, ...]
+
+
+class AhoCorasick:
+    def __init__(self, boundary: Optional[str] = "start", native: bool = True):
+        self.boundary = boundary
+        self.native = native and _native is not None
+        self._auto = None
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[str] = []
+        self._labels: List[List[Hashable]] = []
+        self._index: Dict[str, int] = {}
+        self._built = False
+
+    def add(self, pattern: str, label: Hashable) -> None:
+        """패턴 추가(소문자로 정규화). 같은 패턴에 여러 라벨을 붙일 수 있다."""
+        pattern = pattern.lower()
+        if not pattern:
+            return
+        pid = self._index.get(pattern)
+        if pid is None:
+            pid = self._index[pattern] = len(self._patterns)
+            self._patterns.append(pattern)
+            self._labels.append([])
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+        if label not in self._labels[pid]:
+            self._labels[pid].append(label)
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """BFS로 실패 링크 계산 + 출력 집합 병합"""
+        q = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            q.append(nxt)
+        while q:
+            state = q.popleft()
+            for ch, nxt in self._goto[state].items():
+                q.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._labels_t = [tuple(l) for l in self._labels]
+        if self.native:
+            self._auto = _native.Automaton()
+            for pid, p in enumerate(self._patterns):
+                self._auto.add_word(p, pid)
+            if self._patterns:
+                self._auto.make_automaton()
+            else:
+                self._auto = None
+        self._built = True
+        return self
+
+    def _raw(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(끝 위치, 패턴 ID) 쌍"""
+        if self.native:
+            if self._auto is not None:
+                for last, pid in self._auto.iter(text):
+                    yield last + 1, pid
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in out[state]:
+                yield i + 1, pid
+
+    def iter(self, text: str) -> Iterator[Hit]:
+        """text(이미 소문자라고 가정)에서 모든 매치를 끝 위치 순으로 반환"""
+        if not self._built:
+            self.build()
+        pats, labels, boundary = self._patterns, self._labels_t, self.boundary
+        n = len(text)
+        for end, pid in self._raw(text):
+            p = pats[pid]
+            start = end - len(p)
+            if boundary:
+                if start > 0 and text[start - 1].isalnum() and p[0].isalnum():
+                    continue
+                if boundary == "word" and end < n and text[end].isalnum() and p[-1].isalnum():
+                    continue
+            yield Hit(start, end, p, labels[pid])
+
+    def labels_in(self, text: str) -> set:
+        """text에 등장한 라벨 집합"""
+        found = set()
+        for h in self.iter(text):
+            found.update(h.labels)
+        return found
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+증분 TF-IDF (summarize_cluster + fetch_and_link 공용)
+
+- 문서별 단어 빈도(1~2-gram, TfidfVectorizer와 같은 분석기)를 희소 행렬 counts.npz + 어휘 vocab.txt로 저장
+- 다음 실행에서는 본문 해시가 바뀐 문서만 다시 분석하고, 나머지는 저장된 행을 그대로 쓴다
+- df/idf/max_df 가지치기/L2 정규화는 빈도 행렬에서 매번 다시 계산(O(nnz)) → 결과는 전체 재학습과 같다
+  (열 순서도 TfidfVectorizer처럼 단어 사전순)
+- 어휘는 새 단어만 vocab.txt에 덧붙이고, 사라진 단어 비율이 TFIDF_REFIT_DEAD를 넘거나
+  TFIDF_REFIT_EVERY번 실행마다 전체를 다시 분석(재학습)해 정리
+- TFIDF_MODE=hashing: HashingVectorizer로 열 수를 고정해 어휘가 아예 자라지 않는다
+  (단어 이름이 없으므로 클러스터 키워드는 생략, 해시 충돌만큼 근사)
+
+옵션(환경변수):
+  TFIDF_MODE=vocab                 vocab | hashing
+  TFIDF_HASH_FEATURES=1048576      hashing 열 수
+  TFIDF_REFIT_EVERY=1440           이 횟수만큼 실행하면 전체 재학습(매분 실행 기준 하루)
+  TFIDF_REFIT_DEAD=0.2             사라진 단어가 어휘의 이 비율을 넘으면 전체 재학습
+  TFIDF_DIR=.cache/tfidf
+"""
+import os, json, hashlib, collections
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+import metrics
+
+TFIDF_MODE = os.getenv("TFIDF_MODE", "vocab")
+HASH_FEATURES = int(os.getenv("TFIDF_HASH_FEATURES", str(2 ** 20)))
+REFIT_EVERY = int(os.getenv("TFIDF_REFIT_EVERY", "1440"))
+REFIT_DEAD = float(os.getenv("TFIDF_REFIT_DEAD", "0.2"))
+TFIDF_DIR = Path(os.getenv("TFIDF_DIR", ".cache/tfidf"))
+
+NGRAM = (1, 2)
+_analyze = CountVectorizer(ngram_range=NGRAM).build_analyzer()
+
+
+class TfidfModel:
+    """fit 결과의 열 이름과 X를 만든 설정 (TfidfVectorizer 대신 넘기는 객체, hashing 모드면 이름 없음)"""
+
+    def __init__(self, terms: Optional[np.ndarray], params: str = ""):
+        self.terms = terms
+        self.params = params  # 모드/n-gram/열 수/max_df → related.py 이웃 캐시 서명에 포함
+
+    def get_feature_names_out(self) -> Optional[np.ndarray]:
+        return self.terms
+
+
+# ------------------ 빈도 행렬 ------------------
+def _sig(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()
+
+
+def _params(mode: str) -> str:
+    return f"{mode}:{NGRAM[0]}-{NGRAM[1]}:{HASH_FEATURES if mode == 'hashing' else 0}"
+
+
+def _count_rows(texts: List[str], mode: str, vocab: List[str], index: dict) -> sp.csr_matrix:
+    """texts의 단어 빈도 행. vocab 모드에서는 처음 보는 단어를 vocab/index에 덧붙인다"""
+    if mode == "hashing":
+        if not texts:
+            return sp.csr_matrix((0, HASH_FEATURES), dtype=np.float64)
+        hv = HashingVectorizer(ngram_range=NGRAM, n_features=HASH_FEATURES, alternate_sign=False, norm=None)
+        return hv.transform(texts).tocsr()
+    indptr, indices, data = [0], [], []
+    for t in texts:
+        for term, n in collections.Counter(_analyze(t)).items():
+            j = index.get(term)
+            if j is None:
+                j = index[term] = len(vocab)
+                vocab.append(term)
+            indices.append(j)
+            data.append(n)
+        indptr.append(len(indices))
+    return sp.csr_matrix((np.array(data, dtype=np.int64), np.array(indices, dtype=np.int64), indptr),
+                         shape=(len(texts), len(vocab)))
+
+
+def _widen(C: sp.csr_matrix, width: int) -> sp.csr_matrix:
+    return sp.csr_matrix((C.data, C.indices, C.indptr), shape=(C.shape[0], width))
+
+
+# ------------------ 저장 ------------------
+def _load(root: Path, mode: str) -> Optional[dict]:
+    try:
+        meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("params") != _params(mode):
+            return None
+        C = sp.load_npz(root / "counts.npz").tocsr()
+        vocab: List[str] = []
+        if mode == "vocab":
+            vocab = (root / "vocab.txt").read_text(encoding="utf-8").split("\n")[:-1]
+            if len(vocab) != meta["vocab"]:
+                return None  # 어휘 덧붙인 뒤 meta 저장 전에 멈춘 경우
+        if C.shape[0] != len(meta["ids"]):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    meta["counts"], meta["vocab_list"] = C, vocab
+    return meta
+
+
+def _save(root: Path, mode: str, ids: List[str], sigs: List[str], C: sp.csr_matrix, vocab: List[str],
+          written: int, runs: int) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    if mode == "vocab":
+        if written:
+            with open(root / "vocab.txt", "a", encoding="utf-8") as f:  # 새 단어만 덧붙임
+                f.writelines(t + "\n" for t in vocab[written:])
+        else:
+            tmp = root / "vocab.txt.tmp"
+            tmp.write_text("".join(t + "\n" for t in vocab), encoding="utf-8")
+            os.replace(tmp, root / "vocab.txt")
+    tmp = root / "counts.tmp.npz"
+    sp.save_npz(tmp, C, compressed=False)
+    os.replace(tmp, root / "counts.npz")
+    meta = {"params": _params(mode), "ids": ids, "sigs": sigs, "vocab": len(vocab), "runs": runs}
+    tmp = root / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, root / "meta.json")
+
+
+# ------------------ 공개 ------------------
+def fit(ids: List[str], texts: List[str], name: Optional[str] = None, mode: str = TFIDF_MODE,
+        max_df: float = 0.9) -> Tuple[TfidfModel, sp.csr_matrix]:
+    """
+    TfidfVectorizer(max_df, min_df=1, ngram_range=(1,2)).fit_transform(texts)와 같은 (모델, X).
+    name이 있으면 TFIDF_DIR/<name>/에 빈도 행렬을 저장해 두고, 바뀐 문서만 다시 분석한다.
+    """
+    if mode not in ("vocab", "hashing"):
+        raise ValueError(f"TFIDF_MODE must be vocab or hashing: {mode!r}")
+    root = TFIDF_DIR / name if name else None
+    state = _load(root, mode) if root is not None else None
+    sigs = [_sig(t) for t in texts]
+
+    for attempt in ("incremental", "refit"):
+        if attempt == "refit" or state is None or state["runs"] + 1 >= REFIT_EVERY:
+            state, attempt = None, "refit"
+        vocab: List[str] = state["vocab_list"] if state else []
+        written = len(vocab)
+        old_rows = {i: r for r, i in enumerate(state["ids"])} if state else {}
+        old_sigs = dict(zip(state["ids"], state["sigs"])) if state else {}
+        todo = [r for r, (i, s) in enumerate(zip(ids, sigs)) if old_sigs.get(i) != s]
+        index = dict(zip(vocab, range(len(vocab)))) if todo and mode == "vocab" else {}
+        new = _count_rows([texts[r] for r in todo], mode, vocab, index)
+        width = HASH_FEATURES if mode == "hashing" else len(vocab)
+        old = _widen(state["counts"], width) if state else sp.csr_matrix((0, width), dtype=np.int64)
+        # 현재 문서 순서대로: 그대로인 문서는 저장된 행, 바뀐/새 문서는 방금 분석한 행
+        pick = np.empty(len(ids), dtype=np.int64)
+        pick[todo] = old.shape[0] + np.arange(len(todo))
+        keep = np.setdiff1d(np.arange(len(ids)), todo)
+        pick[keep] = [old_rows[ids[r]] for r in keep]
+        C = sp.vstack([old, _widen(new, width)], format="csr")[pick]
+        df = np.bincount(C.indices, minlength=width)
+        dead = int((df == 0).sum()) if mode == "vocab" else 0
+        if attempt == "incremental" and dead > REFIT_DEAD * max(width, 1):
+            continue  # 사라진 단어가 많으면 전체 재학습으로 어휘 정리
+        break
+    metrics.count("tfidf_docs_vectorized", len(todo))
+    if attempt == "refit":
+        metrics.count("tfidf_refit")
+        if mode == "vocab":  # 재학습 때는 어휘를 사전순으로 저장(다음 정렬이 거의 공짜)
+            order = np.array(sorted(range(len(vocab)), key=vocab.__getitem__), dtype=np.int64)
+            vocab = [vocab[j] for j in order]
+            remap = np.empty_like(order)
+            remap[order] = np.arange(len(order))
+            C = sp.csr_matrix((C.data, remap[C.indices], C.indptr), shape=C.shape)
+            C.sort_indices()
+            df = df[order]
+            written = 0
+    if root is not None:
+        _save(root, mode, ids, sigs, C, vocab, written, 0 if attempt == "refit" else state["runs"] + 1)
+
+    # ---------- TF-IDF (sklearn TfidfVectorizer와 같은 식) ----------
+    n = len(ids)
+    cols = np.flatnonzero((df > 0) & (df <= max_df * n))
+    if not len(cols):
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    if mode == "vocab":
+        cols = np.array(sorted(cols, key=vocab.__getitem__), dtype=np.int64)
+    X = C[:, cols].astype(np.float64)
+    X.sort_indices()
+    X.data *= (np.log((1 + n) / (1 + df[cols])) + 1)[X.indices]
+    normalize(X, copy=False)
+    terms = np.array([vocab[j] for j in cols], dtype=object) if mode == "vocab" else None
+    return TfidfModel(terms, f"{_params(mode)}:max_df={max_df}"), X
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+내용 기반(content-addressed) 볼트 기록기
+
+- 렌더링 결과의 sha256을 이전 실행 매니페스트(.vault_manifest.json)와 비교해 바뀐 파일만 기록
+- 기록은 임시 파일 + os.replace 로 원자적으로 (Obsidian이 반쯤 쓰인 파일을 읽지 않도록)
+- 관리 대상 폴더(기본 papers/)에서 이번 실행에 쓰이지도 유지되지도 않은 노트는 고아로 보고 삭제
+- 매니페스트는 commit() 때 한 번만 저장
+"""
+import os, json, hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class VaultWriter:
+    def __init__(self, root: Path, managed: Iterable[str] = ("papers/",), manifest_name: str = ".vault_manifest.json"):
+        self.root = Path(root)
+        self.managed = tuple(managed)
+        self.manifest_path = self.root / manifest_name
+        try:
+            self.prev: Dict[str, str] = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.prev = {}
+        self.cur: Dict[str, str] = {}
+        self.stats = {"written": 0, "skipped": 0, "removed": 0}
+
+    def _rel(self, path: Path) -> str:
+        return Path(path).relative_to(self.root).as_posix()
+
+    def write(self, path: Path, text: str) -> bool:
+        """내용이 바뀐 경우에만 원자적으로 기록. 기록했으면 True"""
+        path = Path(path)
+        rel, h = self._rel(path), content_hash(text)
+        self.cur[rel] = h
+        old = self.prev.get(rel)
+        if old is None and path.exists():  # 매니페스트 도입 전 파일은 디스크 내용과 비교
+            try:
+                old = content_hash(path.read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                old = None
+        if old == h and path.exists():
+            self.stats["skipped"] += 1
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+        self.stats["written"] += 1
+        return True
+
+    def keep(self, path: Path) -> None:
+        """이번 실행에서 다시 렌더링하지 않았지만 유효한 파일(증분 크롤의 기존 노트)"""
+        rel = self._rel(path)
+        if rel in self.cur:
+            return
+        if rel in self.prev:
+            self.cur[rel] = self.prev[rel]
+        elif Path(path).exists():
+            self.cur[rel] = content_hash(Path(path).read_text(encoding="utf-8", errors="ignore"))
+
+    def commit(self) -> Dict[str, int]:
+        """고아 노트 삭제 + 매니페스트 저장. 통계 반환"""
+        for rel in self.prev:
+            if rel in self.cur or not rel.startswith(self.managed):
+                continue
+            try:
+                (self.root / rel).unlink()
+                self.stats["removed"] += 1
+            except FileNotFoundError:
+                pass
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.cur, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+        return dict(self.stats)
+
+    def report(self) -> str:
+        s = self.stats
+        return f"notes written {s['written']}, unchanged {s['skipped']}, removed {s['removed']}"
+
+
+def write_file(path: Path, text: str, writer: Optional[VaultWriter] = None) -> None:
+    """writer가 없으면 기존처럼 그대로 덮어쓰기"""
+    if writer is None:
+        Path(path).write_text(text, encoding="utf-8")
+    else:
+        writer.write(path, text)